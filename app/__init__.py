@@ -33,16 +33,51 @@ def create_app():
     from app.routes.trainings import trainings_bp
     from app.routes.tests import tests_bp
     from app.routes.models import models_bp
+    from app.routes.sweeps import sweeps_bp
     
     app.register_blueprint(ui_bp)
     app.register_blueprint(datasets_bp, url_prefix='/api')
     app.register_blueprint(trainings_bp, url_prefix='/api')
     app.register_blueprint(tests_bp, url_prefix='/api')
     app.register_blueprint(models_bp, url_prefix='/api')
+    app.register_blueprint(sweeps_bp, url_prefix='/api')
     
     # Create database tables
     with app.app_context():
-        from app.models import Dataset, Class, DatasetFile, Training, TrainingMetric, Checkpoint
+        from app.models import Dataset, Class, DatasetFile, Blob, Training, TrainingMetric, Checkpoint, Sweep
         db.create_all()
+        _add_missing_columns()
     
     return app
+
+
+def _add_missing_columns():
+    """Add columns introduced after a table was created (MVP-friendly, no migration tool)"""
+    from sqlalchemy import inspect, text
+    
+    inspector = inspect(db.engine)
+    statements = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            statement = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+            default = column.default.arg if column.default is not None and column.default.is_scalar else None
+            if isinstance(default, bool):
+                statement += f' DEFAULT {int(default)}'
+            elif isinstance(default, (int, float)):
+                statement += f' DEFAULT {default}'
+            elif isinstance(default, str):
+                statement += " DEFAULT '{}'".format(default.replace("'", "''"))
+            statements.append(statement)
+    
+    if statements:
+        with db.engine.begin() as connection:
+            for statement in statements:
+                connection.execute(text(statement))
@@ -11,8 +11,23 @@ class Dataset(db.Model):
     path = db.Column(db.String(500), nullable=False)
     nc = db.Column(db.Integer, default=0)
     yaml_file = db.Column(db.String(500))
+    task_type = db.Column(db.String(50), default='detect')  # Label format: detect, segment, pose
+    kpt_shape = db.Column(db.String(50))  # Pose keypoints as 'keypoints,dims', e.g. '17,3'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Upload ingestion: processing, ready, failed
+    ingest_status = db.Column(db.String(50), default='ready')
+    ingest_total = db.Column(db.Integer, default=0)
+    ingest_done = db.Column(db.Integer, default=0)
+    ingest_rejected = db.Column(db.Integer, default=0)
+    ingest_error = db.Column(db.Text)
+    ingest_rejections_json = db.Column(db.Text)  # First rejected files with the reason
+    
+    # Per-split image counts and bytes, kept by ingestion and the reconciliation scan
+    split_stats_json = db.Column(db.Text)  # {split: {'images': n, 'bytes': b}}
+    split_mtimes_json = db.Column(db.Text)  # images/<split> directory mtimes at the last scan
+    stats_checked_at = db.Column(db.DateTime)
+    
     # Relationships
     classes = db.relationship('Class', backref='dataset', lazy=True, cascade='all, delete-orphan')
     files = db.relationship('DatasetFile', backref='dataset', lazy=True, cascade='all, delete-orphan')
@@ -25,10 +40,55 @@ class Dataset(db.Model):
             'path': self.path,
             'nc': self.nc,
             'yaml_file': self.yaml_file,
+            'task_type': self.task_type or 'detect',
+            'kpt_shape': list(self.get_kpt_shape()) if self.kpt_shape else None,
             'created_at': self.created_at.isoformat(),
             'classes': [cls.to_dict() for cls in self.classes],
-            'file_count': len(self.files)
+            'file_count': len(self.files),
+            'file_counts': self.file_counts(),
+            'file_bytes': self.file_bytes(),
+            'ingest': self.ingest_progress()
         }
+    
+    def get_split_stats(self):
+        stats = json.loads(self.split_stats_json) if self.split_stats_json else {}
+        return {split: stats.get(split, {'images': 0, 'bytes': 0}) for split in ('train', 'val', 'test')}
+    
+    def set_split_stats(self, stats):
+        self.split_stats_json = json.dumps(stats)
+    
+    def add_split_stats(self, deltas):
+        """Apply {split: (images, bytes)} increments"""
+        stats = self.get_split_stats()
+        for split, (images, size) in deltas.items():
+            stats[split] = {'images': stats[split]['images'] + images, 'bytes': stats[split]['bytes'] + size}
+        self.set_split_stats(stats)
+    
+    def get_split_mtimes(self):
+        return json.loads(self.split_mtimes_json) if self.split_mtimes_json else {}
+    
+    def file_counts(self):
+        return {split: stats['images'] for split, stats in self.get_split_stats().items()}
+    
+    def file_bytes(self):
+        return {split: stats['bytes'] for split, stats in self.get_split_stats().items()}
+    
+    def ingest_progress(self):
+        return {
+            'status': self.ingest_status or 'ready',
+            'total': self.ingest_total or 0,
+            'done': self.ingest_done or 0,
+            'rejected': self.ingest_rejected or 0,
+            'rejections': json.loads(self.ingest_rejections_json) if self.ingest_rejections_json else [],
+            'error': self.ingest_error
+        }
+    
+    def get_kpt_shape(self):
+        return tuple(int(v) for v in self.kpt_shape.split(',')) if self.kpt_shape else None
+    
+    def label_format(self):
+        """(task, kpt_shape) used to validate the dataset's label files"""
+        return self.task_type or 'detect', self.get_kpt_shape()
 
 
 class Class(db.Model):
@@ -54,15 +114,26 @@ class DatasetFile(db.Model):
     dataset_id = db.Column(db.Integer, db.ForeignKey('datasets.id'), nullable=False)
     split = db.Column(db.String(50), nullable=False)  # train|val|test
     file_path = db.Column(db.String(500), nullable=False)
+    blob_hash = db.Column(db.String(64), index=True)  # Content-addressed store entry (images only)
     
     def to_dict(self):
         return {
             'id': self.id,
             'split': self.split,
-            'file_path': self.file_path
+            'file_path': self.file_path,
+            'blob_hash': self.blob_hash
         }
 
 
+class Blob(db.Model):
+    __tablename__ = 'blobs'
+    
+    hash = db.Column(db.String(64), primary_key=True)  # sha256 of the content
+    size = db.Column(db.BigInteger, nullable=False)
+    refcount = db.Column(db.Integer, default=0, nullable=False)  # DatasetFile rows pointing at it
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 class Training(db.Model):
     __tablename__ = 'trainings'
     
@@ -84,11 +155,21 @@ class Training(db.Model):
     save_checkpoints = db.Column(db.Boolean, default=True)
     use_augmentation = db.Column(db.Boolean, default=True)
     
+    # Batch size and workers picked by probing throughput before the run
+    auto_tune = db.Column(db.Boolean, default=False)
+    tuned_images_per_sec = db.Column(db.Float)
+    
+    # Platform stopping rules (target map50, plateau, time budgets) and why the run ended early
+    stop_rules_json = db.Column(db.Text)
+    stop_reason = db.Column(db.String(50))
+    
     # Legacy config field (for backward compatibility)
     config_json = db.Column(db.Text)
     
     # Status and timestamps
-    status = db.Column(db.String(50), nullable=False, default='queued')  # queued|running|completed|failed|canceled
+    status = db.Column(db.String(50), nullable=False, default='queued')  # queued|running|completed|failed|canceled|pruned
+    priority = db.Column(db.Integer, default=0)  # Higher runs first; FIFO within a priority
+    sweep_id = db.Column(db.Integer, db.ForeignKey('sweeps.id'), nullable=True)  # Trial of a hyperparameter sweep
     started_at = db.Column(db.DateTime)
     finished_at = db.Column(db.DateTime)
     model_dir = db.Column(db.String(500))
@@ -107,6 +188,12 @@ class Training(db.Model):
     def set_config(self, config_dict):
         self.config_json = json.dumps(config_dict)
     
+    def get_stop_rules(self):
+        return json.loads(self.stop_rules_json) if self.stop_rules_json else {}
+    
+    def set_stop_rules(self, rules):
+        self.stop_rules_json = json.dumps(rules) if rules else None
+    
     def to_dict(self):
         config = self.get_config()
         task_suffix = '' if self.task_type == 'detect' else f'-{self.task_type}'
@@ -132,12 +219,18 @@ class Training(db.Model):
             'workers': self.workers,
             'save_checkpoints': self.save_checkpoints,
             'use_augmentation': self.use_augmentation,
+            'auto_tune': self.auto_tune,
+            'tuned_images_per_sec': self.tuned_images_per_sec,
+            'stop_rules': self.get_stop_rules(),
+            'stop_reason': self.stop_reason,
             
             # Legacy config for backward compatibility
             'config': config,
             
             # Status and paths
             'status': self.status,
+            'priority': self.priority,
+            'sweep_id': self.sweep_id,
             'started_at': self.started_at.isoformat() if self.started_at else None,
             'finished_at': self.finished_at.isoformat() if self.finished_at else None,
             'model_dir': self.model_dir,
@@ -150,6 +243,53 @@ class Training(db.Model):
         }
 
 
+class Sweep(db.Model):
+    __tablename__ = 'sweeps'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(255), nullable=False)
+    dataset_id = db.Column(db.Integer, db.ForeignKey('datasets.id'), nullable=False)
+    strategy = db.Column(db.String(20), default='grid')  # grid|random
+    search_space_json = db.Column(db.Text)
+    base_config_json = db.Column(db.Text)
+    max_trials = db.Column(db.Integer)
+    max_concurrent = db.Column(db.Integer, default=2)
+    
+    # Successive halving on map50: trials are compared at epochs min_epochs * eta^k
+    halving_min_epochs = db.Column(db.Integer)  # None disables early termination
+    halving_eta = db.Column(db.Integer, default=3)
+    
+    status = db.Column(db.String(50), nullable=False, default='running')  # running|completed|canceled
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    dataset = db.relationship('Dataset')
+    trainings = db.relationship('Training', backref='sweep', lazy=True)
+    
+    def get_search_space(self):
+        return json.loads(self.search_space_json) if self.search_space_json else {}
+    
+    def get_base_config(self):
+        return json.loads(self.base_config_json) if self.base_config_json else {}
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'dataset_id': self.dataset_id,
+            'strategy': self.strategy,
+            'search_space': self.get_search_space(),
+            'base_config': self.get_base_config(),
+            'max_trials': self.max_trials,
+            'max_concurrent': self.max_concurrent,
+            'halving_min_epochs': self.halving_min_epochs,
+            'halving_eta': self.halving_eta,
+            'status': self.status,
+            'created_at': self.created_at.isoformat(),
+            'trials_count': len(self.trainings)
+        }
+
+
 class TrainingMetric(db.Model):
     __tablename__ = 'training_metrics'
     
@@ -163,8 +303,21 @@ class TrainingMetric(db.Model):
     val_accuracy = db.Column(db.Float)
     map50 = db.Column(db.Float)
     map = db.Column(db.Float)
+    extra_json = db.Column(db.Text)  # Other results.csv columns (mask/pose/cls metrics, losses, lr)
+    
+    # Per-epoch profile recorded by the training callbacks (seconds, MB)
+    epoch_time = db.Column(db.Float)
+    images_per_sec = db.Column(db.Float)
+    data_time = db.Column(db.Float)  # Waiting on the dataloader
+    compute_time = db.Column(db.Float)  # Forward, backward and optimizer steps
+    peak_rss_mb = db.Column(db.Float)
+    device_mem_mb = db.Column(db.Float)
+    
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     
+    def get_extra(self):
+        return json.loads(self.extra_json) if self.extra_json else {}
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -176,6 +329,13 @@ class TrainingMetric(db.Model):
             'val_accuracy': self.val_accuracy,
             'map50': self.map50,
             'map': self.map,
+            'extra': self.get_extra(),
+            'epoch_time': self.epoch_time,
+            'images_per_sec': self.images_per_sec,
+            'data_time': self.data_time,
+            'compute_time': self.compute_time,
+            'peak_rss_mb': self.peak_rss_mb,
+            'device_mem_mb': self.device_mem_mb,
             'timestamp': self.timestamp.isoformat()
         }
 
@@ -208,8 +368,19 @@ class Test(db.Model):
     training_id = db.Column(db.Integer, db.ForeignKey('trainings.id'), nullable=True)  # Permitir None para testes diretos
     source = db.Column(db.String(50), nullable=False)  # image|video|dir|webcam
     input_path = db.Column(db.String(500))
+    model_path = db.Column(db.String(500))
     result_dir = db.Column(db.String(500))
     metrics_json = db.Column(db.Text)
+    config_json = db.Column(db.Text)  # Inference parameters (conf, iou, img_size, ...)
+    output_mode = db.Column(db.String(30))  # detections_only|annotated_jpeg|annotated_webp|thumbnails
+    output_quality = db.Column(db.Integer)  # JPEG/WebP quality 1-100
+    
+    # Job queue state (NULL for tests created before the queue existed)
+    status = db.Column(db.String(50))  # queued|running|completed|failed|canceled
+    queue_position = db.Column(db.Integer)
+    estimated_start_at = db.Column(db.DateTime)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -221,13 +392,28 @@ class Test(db.Model):
     def set_metrics(self, metrics_dict):
         self.metrics_json = json.dumps(metrics_dict)
     
+    def get_config(self):
+        return json.loads(self.config_json) if self.config_json else {}
+    
+    def set_config(self, config_dict):
+        self.config_json = json.dumps(config_dict)
+    
     def to_dict(self):
         return {
             'id': self.id,
             'training_id': self.training_id,
             'source': self.source,
             'input_path': self.input_path,
+            'model_path': self.model_path,
             'result_dir': self.result_dir,
             'metrics': self.get_metrics(),
+            'config': self.get_config(),
+            'output_mode': self.output_mode,
+            'output_quality': self.output_quality,
+            'status': self.status,
+            'queue_position': self.queue_position,
+            'estimated_start_at': self.estimated_start_at.isoformat() if self.estimated_start_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
             'created_at': self.created_at.isoformat()
         }
@@ -4,12 +4,21 @@ import os
 import json
 from sqlalchemy import func, or_
 from sqlalchemy.orm import selectinload
-from app import db
+from app import db, socketio
 from app.models import Dataset, Class, DatasetFile
 from app.services.storage import StorageService
+from app.services.preprocess_cache import PreprocessCache
+from app.services.ingestion import DatasetIngestor, INGEST_SYNC_LIMIT
+from app.services.archive_import import ArchiveImportError, import_archive
+from app.services.blob_store import BlobStore
+from app.services.dataset_stats import DatasetStatsReconciler, reconcile as reconcile_stats
+from app.services.label_validation import TASK_TYPES, parse_kpt_shape, validate_label_directories
 
 datasets_bp = Blueprint('datasets', __name__)
 storage = StorageService()
+blob_store = BlobStore(storage.blobs_dir)
+ingestor = DatasetIngestor(blob_store=blob_store)
+stats_reconciler = DatasetStatsReconciler()
 
 
 @datasets_bp.route('/datasets', methods=['GET'])
@@ -74,9 +83,11 @@ def list_datasets():
             'yaml_file': dataset.yaml_file,
             'created_at': dataset.created_at.isoformat(),
             'classes': [cls.to_dict() for cls in dataset.classes],
-            'file_count': file_counts_by_dataset.get(dataset.id, 0)
+            'file_count': file_counts_by_dataset.get(dataset.id, 0),
+            # Stored counts: listing datasets never touches the filesystem
+            'file_counts': dataset.file_counts(),
+            'file_bytes': dataset.file_bytes()
         }
-        dataset_dict['file_counts'] = storage.get_dataset_files_count(dataset.path)
         datasets_list.append(dataset_dict)
 
     return jsonify({
@@ -111,14 +122,48 @@ def get_datasets_stats():
 def get_dataset(dataset_id):
     """Get dataset details"""
     dataset = Dataset.query.get_or_404(dataset_id)
+    return jsonify(dataset.to_dict())
+
+
+@datasets_bp.route('/datasets/<int:dataset_id>/reconcile', methods=['POST'])
+def reconcile_dataset(dataset_id):
+    """Recount the dataset's files on disk now"""
+    dataset = Dataset.query.get_or_404(dataset_id)
+    if ingestor.is_running(dataset_id):
+        return jsonify({'error': 'Dataset files are still being processed'}), 400
     
-    # Get file counts
-    file_counts = storage.get_dataset_files_count(dataset.path)
-    
-    dataset_dict = dataset.to_dict()
-    dataset_dict['file_counts'] = file_counts
+    drifted = reconcile_stats(dataset, force=True)
+    db.session.commit()
+    return jsonify({'drifted_splits': drifted, 'file_counts': dataset.file_counts(),
+                    'file_bytes': dataset.file_bytes()})
+
+
+@datasets_bp.route('/datasets/<int:dataset_id>/dedup', methods=['GET'])
+def get_dataset_dedup(dataset_id):
+    """Get how much of the dataset's image storage is shared with other datasets"""
+    Dataset.query.get_or_404(dataset_id)
+    return jsonify(blob_store.report(dataset_id))
+
+
+@datasets_bp.route('/datasets/<int:dataset_id>/labels/validate', methods=['POST'])
+def validate_dataset_labels(dataset_id):
+    """Validate every label file of the dataset and report the errors per line"""
+    dataset = Dataset.query.get_or_404(dataset_id)
+    task_type, kpt_shape = dataset.label_format()
+    if task_type == 'pose' and not kpt_shape:
+        return jsonify({'error': 'Dataset has no kpt_shape for its pose labels'}), 400
     
-    return jsonify(dataset_dict)
+    label_dirs = [os.path.join(dataset.path, 'labels', split) for split in ('train', 'val', 'test')]
+    report = validate_label_directories(label_dirs, dataset.nc, task_type, kpt_shape)
+    report['task_type'] = task_type
+    return jsonify(report)
+
+
+@datasets_bp.route('/datasets/<int:dataset_id>/ingest', methods=['GET'])
+def get_dataset_ingest(dataset_id):
+    """Get upload ingestion progress"""
+    dataset = Dataset.query.get_or_404(dataset_id)
+    return jsonify(dataset.ingest_progress())
 
 
 @datasets_bp.route('/datasets', methods=['POST'])
@@ -138,6 +183,11 @@ def create_dataset():
         except json.JSONDecodeError:
             return jsonify({'error': 'Invalid classes JSON format'}), 400
         
+        try:
+            label_format = _parse_label_format(request.form)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Check if dataset name already exists
         existing = Dataset.query.filter_by(name=name).first()
         if existing:
@@ -146,91 +196,144 @@ def create_dataset():
         # Create dataset directory structure
         dataset_path = storage.create_dataset_structure(name)
         
-        # Create dataset record
-        dataset = Dataset(
-            name=name,
-            path=dataset_path,
-            nc=len(classes)
-        )
-        db.session.add(dataset)
-        db.session.flush()  # Get the ID
-        
-        # Add classes
-        for i, class_name in enumerate(classes):
-            class_obj = Class(
-                dataset_id=dataset.id,
-                class_index=i,
-                class_name=class_name
-            )
-            db.session.add(class_obj)
-        
-        # Process uploaded files
-        uploaded_files = []
+        # Save uploads straight to their split folders; validation happens afterwards
+        uploads = {}
         for split in ['train', 'val', 'test']:
-            # Process images (multiple files)
-            images_key = f'{split}_images'
-            if images_key in request.files:
-                files = request.files.getlist(images_key)
-                for file in files:
-                    if file.filename:
-                        filename = secure_filename(file.filename)
-                        images_dir = os.path.join(dataset_path, 'images', split)
-                        os.makedirs(images_dir, exist_ok=True)
-                        
-                        file_path = os.path.join(images_dir, filename)
-                        file.save(file_path)
-                        
-                        # Validate image
-                        if storage.validate_image(file_path):
-                            uploaded_files.append(file_path)
-                            # Record in database
-                            dataset_file = DatasetFile(
-                                dataset_id=dataset.id,
-                                split=split,
-                                file_path=file_path
-                            )
-                            db.session.add(dataset_file)
-                        else:
-                            os.remove(file_path)  # Remove invalid files
-            
-            # Process labels (multiple files)
-            labels_key = f'{split}_labels'
-            if labels_key in request.files:
-                files = request.files.getlist(labels_key)
-                for file in files:
+            for kind, folder in (('image', 'images'), ('label', 'labels')):
+                files_key = f'{split}_{folder}'
+                if files_key not in request.files:
+                    continue
+                
+                target_dir = os.path.join(dataset_path, folder, split)
+                os.makedirs(target_dir, exist_ok=True)
+                for file in request.files.getlist(files_key):
                     if file.filename:
-                        filename = secure_filename(file.filename)
-                        labels_dir = os.path.join(dataset_path, 'labels', split)
-                        os.makedirs(labels_dir, exist_ok=True)
-                        
-                        file_path = os.path.join(labels_dir, filename)
+                        file_path = os.path.join(target_dir, secure_filename(file.filename))
+                        if os.path.lexists(file_path):
+                            os.remove(file_path)  # Never write through a hardlink into the blob store
                         file.save(file_path)
-                        
-                        # Validate label
-                        if storage.validate_yolo_label(file_path, len(classes)):
-                            uploaded_files.append(file_path)
-                            # Record in database
-                            dataset_file = DatasetFile(
-                                dataset_id=dataset.id,
-                                split=split,
-                                file_path=file_path
-                            )
-                            db.session.add(dataset_file)
-                        else:
-                            os.remove(file_path)  # Remove invalid files
-        
-        # Generate YAML file
-        yaml_file = storage.generate_dataset_yaml(dataset_path, name, classes)
-        dataset.yaml_file = yaml_file
-        
-        # Commit all changes
-        db.session.commit()
+                        uploads[file_path] = (split, kind)
         
+        return _register_dataset(name, dataset_path, classes, uploads, label_format)
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+def _parse_label_format(form, default_kpt_shape=None):
+    """(task_type, kpt_shape) of a new dataset from the request form; raises ValueError"""
+    task_type = (form.get('task_type') or 'detect').lower()
+    if task_type not in TASK_TYPES:
+        raise ValueError(f"Invalid task_type '{task_type}', use one of: {', '.join(TASK_TYPES)}")
+    if task_type != 'pose':
+        return task_type, None
+    
+    kpt_shape = parse_kpt_shape(form.get('kpt_shape')) or default_kpt_shape
+    if not kpt_shape:
+        raise ValueError('kpt_shape (e.g. 17,3) is required for pose datasets')
+    return task_type, kpt_shape
+
+
+def _register_dataset(name, dataset_path, classes, uploads, label_format, extra=None):
+    """Create the dataset rows for files saved under dataset_path and ingest them
+    
+    uploads maps file paths to (split, kind). Small uploads are validated in
+    the request (201); larger ones in the background (202).
+    """
+    task_type, kpt_shape = label_format
+    dataset = Dataset(
+        name=name,
+        path=dataset_path,
+        nc=len(classes),
+        task_type=task_type,
+        kpt_shape=','.join(str(v) for v in kpt_shape) if kpt_shape else None,
+        ingest_status='processing',
+        ingest_total=len(uploads)
+    )
+    db.session.add(dataset)
+    db.session.flush()  # Get the ID
+    
+    # Add classes
+    for i, class_name in enumerate(classes):
+        class_obj = Class(
+            dataset_id=dataset.id,
+            class_index=i,
+            class_name=class_name
+        )
+        db.session.add(class_obj)
+    
+    # Generate YAML file
+    dataset.yaml_file = storage.generate_dataset_yaml(dataset_path, name, classes, kpt_shape)
+    
+    # Commit the dataset before ingesting so progress is visible
+    db.session.commit()
+    
+    items = [(split, kind, path, len(classes), task_type, kpt_shape) for path, (split, kind) in uploads.items()]
+    if len(items) > INGEST_SYNC_LIMIT:
+        ingestor.start(current_app._get_current_object(), dataset.id, items)
         return jsonify({
-            'message': 'Dataset created successfully',
+            'message': 'Dataset created, files are being processed',
             'dataset': dataset.to_dict(),
-            'uploaded_files_count': len(uploaded_files)
-        }), 201
+            **(extra or {})
+        }), 202
+    
+    accepted = ingestor.ingest(dataset.id, items)
+    db.session.refresh(dataset)
+    
+    return jsonify({
+        'message': 'Dataset created successfully',
+        'dataset': dataset.to_dict(),
+        'uploaded_files_count': accepted,
+        **(extra or {})
+    }), 201
+
+
+@datasets_bp.route('/datasets/import', methods=['POST'])
+def import_dataset():
+    """Create a dataset from a zip or tar archive in YOLO layout"""
+    try:
+        name = request.form.get('name')
+        archive = request.files.get('archive')
+        
+        if not name or not archive or not archive.filename:
+            return jsonify({'error': 'Name and archive are required'}), 400
+        
+        classes = None
+        if request.form.get('classes'):
+            try:
+                classes = json.loads(request.form['classes'])
+            except json.JSONDecodeError:
+                return jsonify({'error': 'Invalid classes JSON format'}), 400
+        
+        if Dataset.query.filter_by(name=name).first():
+            return jsonify({'error': 'Dataset name already exists'}), 400
+        
+        dataset_path = storage.create_dataset_structure(name)
+        try:
+            result = import_archive(archive.stream, archive.filename, dataset_path)
+        except ArchiveImportError as e:
+            storage.delete_dataset(dataset_path)
+            return jsonify({'error': str(e)}), 400
+        
+        stats = result['stats']
+        print(f"Import {name}: {stats['files']} arquivos, {stats['bytes'] / 1024 ** 2:.1f} MB em "
+              f"{stats['seconds']}s ({stats['files_per_sec']} arquivos/s, {stats['mb_per_sec']} MB/s)")
+        
+        # Explicit classes win over the archive's data.yaml
+        classes = classes or result['classes']
+        if not classes:
+            storage.delete_dataset(dataset_path)
+            return jsonify({'error': 'Classes are required when the archive has no data.yaml'}), 400
+        
+        try:
+            label_format = _parse_label_format(request.form, default_kpt_shape=result['kpt_shape'])
+        except ValueError as e:
+            storage.delete_dataset(dataset_path)
+            return jsonify({'error': str(e)}), 400
+        
+        return _register_dataset(name, dataset_path, classes, result['files'], label_format,
+                                 extra={'import': stats})
         
     except Exception as e:
         db.session.rollback()
@@ -275,7 +378,7 @@ def update_dataset(dataset_id):
             
             # Regenerate YAML
             yaml_file = storage.generate_dataset_yaml(
-                dataset.path, dataset.name, classes
+                dataset.path, dataset.name, classes, dataset.get_kpt_shape()
             )
             dataset.yaml_file = yaml_file
         
@@ -303,12 +406,18 @@ def delete_dataset(dataset_id):
                 'error': 'Cannot delete dataset with existing trainings'
             }), 400
         
-        # Delete files from disk
+        if ingestor.is_running(dataset_id):
+            return jsonify({'error': 'Dataset files are still being processed'}), 400
+        
+        # Delete files from disk; shared images live on in the blob store
         storage.delete_dataset(dataset.path)
+        PreprocessCache(storage.cache_dir).delete(dataset.id)
+        freed_blobs = blob_store.release(dataset.id)
         
         # Delete from database (cascade will handle related records)
         db.session.delete(dataset)
         db.session.commit()
+        blob_store.purge(freed_blobs)
         
         return jsonify({'message': 'Dataset deleted successfully'})
         
@@ -358,3 +467,9 @@ def update_dataset_yaml(dataset_id):
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+# WebSocket namespace for upload ingestion progress ('dataset_ingest' events)
+@socketio.on('connect', namespace='/ws/datasets')
+def handle_connect():
+    print('Client connected to datasets namespace')
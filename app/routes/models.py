@@ -6,6 +6,8 @@ import requests
 from flask import Blueprint, jsonify, request
 from werkzeug.utils import secure_filename
 
+from app.services.exporter import exporter, EXPORT_FORMATS
+
 models_bp = Blueprint('models', __name__)
 
 ULTRALYTICS_KNOWN_MODELS = {
@@ -166,3 +168,33 @@ def download_model():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+@models_bp.route('/models/export', methods=['POST'])
+def export_model():
+    data = request.get_json(silent=True) or {}
+    model_path = (data.get('model_path') or '').strip()
+    fmt = data.get('format', 'onnx')
+
+    if not model_path:
+        return jsonify({'error': 'model_path is required'}), 400
+    if not os.path.exists(model_path):
+        model_path = _build_model_path(model_path)
+        if not os.path.exists(model_path):
+            return jsonify({'error': 'Modelo nao encontrado localmente.'}), 404
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    try:
+        img_size = int(data.get('img_size', 640))
+        entry = exporter.export(model_path, fmt, img_size, force=bool(data.get('force')))
+        if data.get('parity_check', True):
+            entry = dict(entry, parity=exporter.parity_check(model_path, fmt, img_size=img_size))
+
+        return jsonify({
+            'success': True,
+            'model_path': os.path.abspath(model_path),
+            'export': entry,
+            'exports': exporter.list_exports(model_path)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,116 @@
+from flask import Blueprint, request, jsonify
+from datetime import datetime
+from app import db
+from app.models import Sweep, Dataset
+from app.services.sweeps import TERMINAL_STATUSES
+from app.routes.trainings import trainer
+
+sweeps_bp = Blueprint('sweeps', __name__)
+
+
+@sweeps_bp.route('/sweeps', methods=['GET'])
+def list_sweeps():
+    """List hyperparameter sweeps"""
+    sweeps = Sweep.query.order_by(Sweep.created_at.desc()).all()
+    for sweep in sweeps:
+        trainer.sweeps.refresh_status(sweep)
+    db.session.commit()
+
+    return jsonify({'sweeps': [sweep.to_dict() for sweep in sweeps]})
+
+
+@sweeps_bp.route('/sweeps', methods=['POST'])
+def create_sweep():
+    """Create a sweep and queue one training per trial of its search space"""
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'JSON body is required'}), 400
+
+    try:
+        dataset_id = int(data.get('dataset_id'))
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid dataset ID'}), 400
+
+    dataset = Dataset.query.get(dataset_id)
+    if not dataset:
+        return jsonify({'error': 'Dataset not found'}), 404
+    if dataset.ingest_status == 'processing':
+        return jsonify({'error': 'Dataset files are still being processed'}), 400
+
+    strategy = (data.get('strategy') or 'grid').lower()
+    if strategy == 'bayesian':
+        return jsonify({'error': 'Bayesian search is not supported; use grid or random'}), 400
+
+    try:
+        sweep = trainer.sweeps.create(
+            dataset,
+            name=data.get('name') or f'Sweep {dataset.name} {datetime.utcnow():%Y-%m-%d %H:%M}',
+            strategy=strategy,
+            search_space=data.get('search_space') or {},
+            base_config=data.get('base_config'),
+            max_trials=data.get('max_trials'),
+            max_concurrent=data.get('max_concurrent', 2),
+            halving_min_epochs=data.get('halving_min_epochs'),
+            halving_eta=data.get('halving_eta'),
+            seed=data.get('seed')
+        )
+        db.session.commit()
+    except (ValueError, TypeError) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+    # The scheduler starts up to max_concurrent trials and backfills as they finish
+    trainer.start_training(sweep.trainings[0].id)
+
+    return jsonify({
+        'success': True,
+        'message': f'Sweep created with {len(sweep.trainings)} trials',
+        'sweep': sweep.to_dict(),
+        'training_ids': [training.id for training in sweep.trainings]
+    }), 201
+
+
+@sweeps_bp.route('/sweeps/<int:sweep_id>', methods=['GET'])
+def get_sweep(sweep_id):
+    """Get sweep details with its leaderboard"""
+    sweep = Sweep.query.get_or_404(sweep_id)
+    trainer.sweeps.refresh_status(sweep)
+    db.session.commit()
+
+    sweep_dict = sweep.to_dict()
+    sweep_dict['leaderboard'] = trainer.sweeps.leaderboard(sweep)
+    sweep_dict['status_counts'] = {}
+    for training in sweep.trainings:
+        sweep_dict['status_counts'][training.status] = sweep_dict['status_counts'].get(training.status, 0) + 1
+
+    return jsonify(sweep_dict)
+
+
+@sweeps_bp.route('/sweeps/<int:sweep_id>/leaderboard', methods=['GET'])
+def get_sweep_leaderboard(sweep_id):
+    """Trials ranked by best mAP50"""
+    sweep = Sweep.query.get_or_404(sweep_id)
+    return jsonify({'sweep_id': sweep.id, 'leaderboard': trainer.sweeps.leaderboard(sweep)})
+
+
+@sweeps_bp.route('/sweeps/<int:sweep_id>/cancel', methods=['POST'])
+def cancel_sweep(sweep_id):
+    """Cancel queued trials and stop the running ones"""
+    sweep = Sweep.query.get_or_404(sweep_id)
+
+    canceled = 0
+    for training in sweep.trainings:
+        if training.status in TERMINAL_STATUSES:
+            continue
+        if not trainer.cancel_training(training.id):
+            training.status = 'canceled'
+            training.finished_at = datetime.utcnow()
+        canceled += 1
+
+    sweep.status = 'canceled'
+    db.session.commit()
+
+    return jsonify({'message': f'{canceled} trials canceled', 'sweep': sweep.to_dict()})
@@ -1,17 +1,27 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
+from flask_socketio import emit
 from werkzeug.utils import secure_filename
 import os
-import threading
 from datetime import datetime
-from app import db
+from app import db, socketio
 from app.models import Test, Training, Checkpoint
-from app.services.infer import InferenceService
+from app.services.infer import InferenceService, OUTPUT_MODES, DEFAULT_OUTPUT_MODE, DEFAULT_OUTPUT_QUALITY
+from app.services.model_cache import model_cache
+from app.services.exporter import BACKENDS
+from app.services.detections_store import DetectionReader
+from app.services.webcam import WebcamStreamService
+from app.services.jobs import create_inference_queue
 from app.services.storage import StorageService
 
 tests_bp = Blueprint('tests', __name__)
 inference = InferenceService()
 storage = StorageService()
 
+webcam_streams = WebcamStreamService(inference, socketio)
+inference_queue = create_inference_queue(inference)
+
+MAX_FRAMES_PER_PAGE = 1000
+
 
 @tests_bp.route('/tests', methods=['GET'])
 def list_tests():
@@ -49,7 +59,7 @@ def get_test(test_id):
         result_files = []
         for root, dirs, files in os.walk(test.result_dir):
             for file in files:
-                if file.lower().endswith(('.jpg', '.jpeg', '.png', '.mp4', '.avi')):
+                if file.lower().endswith(('.jpg', '.jpeg', '.png', '.webp', '.mp4', '.avi')):
                     rel_path = os.path.relpath(os.path.join(root, file), test.result_dir)
                     result_files.append(rel_path)
         test_dict['result_files'] = result_files
@@ -69,6 +79,18 @@ def create_test():
         if not source_type:
             return jsonify({'error': 'Source type is required'}), 400
         
+        output_mode = request.form.get('output_mode', DEFAULT_OUTPUT_MODE)
+        if output_mode not in OUTPUT_MODES:
+            return jsonify({'error': f"Output mode must be one of: {', '.join(OUTPUT_MODES)}"}), 400
+        
+        output_quality = request.form.get('output_quality', DEFAULT_OUTPUT_QUALITY, type=int)
+        if not 1 <= output_quality <= 100:
+            return jsonify({'error': 'Output quality must be between 1 and 100'}), 400
+        
+        backend = request.form.get('backend', 'pytorch')
+        if backend not in BACKENDS:
+            return jsonify({'error': f"Backend must be one of: {', '.join(BACKENDS)}"}), 400
+        
         # Handle model file upload
         model_file = request.files.get('model_file')
         if model_file and model_file.filename:
@@ -112,8 +134,13 @@ def create_test():
         # Create test record
         test = Test(
             training_id=training_id,
-            source=source_type
+            source=source_type,
+            model_path=model_path,
+            output_mode=output_mode,
+            output_quality=output_quality,
+            status='queued'
         )
+        test.set_config(_parse_inference_params(request.form))
         db.session.add(test)
         db.session.flush()  # Get the ID
         
@@ -182,16 +209,12 @@ def create_test():
         
         db.session.commit()
         
-        # Start inference in background
-        thread = threading.Thread(
-            target=_run_inference_async,
-            args=(test.id, model_path, source_type, input_path)
-        )
-        thread.daemon = True
-        thread.start()
+        # Hand the job to the inference queue (bounded worker pool)
+        inference_queue.submit(current_app._get_current_object(), test.id, model_path)
+        db.session.refresh(test)
         
         return jsonify({
-            'message': 'Test created and started',
+            'message': 'Test created and queued',
             'test': test.to_dict()
         }), 201
         
@@ -200,53 +223,74 @@ def create_test():
         return jsonify({'error': str(e)}), 500
 
 
-def _run_inference_async(test_id, model_path, source_type, input_path):
-    """Run inference asynchronously"""
-    from app import create_app
+def _parse_inference_params(form):
+    """Read inference parameters from the test form, falling back to defaults"""
+    params = {
+        'conf_threshold': form.get('conf_threshold', 0.25, type=float),
+        'iou_threshold': form.get('iou_threshold', 0.45, type=float),
+        'img_size': form.get('img_size', 640, type=int)
+    }
     
-    # Create application context for this thread
-    app = create_app()
-    with app.app_context():
-        try:
-            test = Test.query.get(test_id)
-            if not test:
-                return
-            
-            # Get inference parameters from request (you might want to store these in the test record)
-            params = {
-                'conf_threshold': 0.25,
-                'iou_threshold': 0.45,
-                'img_size': 640
-            }
-            
-            # Run inference
-            result = inference.run_inference(
-                model_path, source_type, input_path, test_id, **params
-            )
-            
-            # Update test record with results
-            if result['success']:
-                test.set_metrics(result.get('results', {}))
-            else:
-                test.set_metrics({'error': result.get('error', 'Unknown error')})
-            
-            db.session.commit()
-            
-        except Exception as e:
-            print(f"Error in inference: {e}")
-            # Update test with error
-            try:
-                test = Test.query.get(test_id)
-                if test:
-                    test.set_metrics({'error': str(e)})
-                    db.session.commit()
-            except Exception as db_error:
-                print(f"Error updating test with error: {db_error}")
+    batch_size = form.get('batch_size', type=int)
+    if batch_size and batch_size > 0:
+        params['batch_size'] = batch_size
+    
+    frame_stride = form.get('frame_stride', type=int)
+    if frame_stride and frame_stride > 1:
+        params['frame_stride'] = frame_stride
+    
+    if form.get('backend', 'pytorch') != 'pytorch':
+        params['backend'] = form.get('backend')
+    
+    if form.get('inference_mode') == 'tiled':
+        params['inference_mode'] = 'tiled'
+        tile_size = form.get('tile_size', type=int)
+        if tile_size and tile_size > 0:
+            params['tile_size'] = tile_size
+        tile_overlap = form.get('tile_overlap', type=float)
+        if tile_overlap is not None and 0 <= tile_overlap < 1:
+            params['tile_overlap'] = tile_overlap
+    
+    if form.get('detection_format') == 'compact':
+        params['detection_format'] = 'compact'
+    
+    if 'save_video' in form:
+        params['save_video'] = form.get('save_video', '').lower() in ('true', 'on', '1', 'yes')
+    
+    return params
+
+
+@tests_bp.route('/tests/<int:test_id>/cancel', methods=['POST'])
+def cancel_test(test_id):
+    """Cancel a queued or running test"""
+    test = Test.query.get_or_404(test_id)
+    
+    if test.status not in ('queued', 'running'):
+        return jsonify({'error': 'Test cannot be canceled'}), 400
+    
+    if not inference_queue.cancel(test_id):
+        # Not known to the queue (e.g. server restarted): update status directly
+        test.status = 'canceled'
+        test.finished_at = datetime.utcnow()
+        db.session.commit()
+        return jsonify({'message': 'Test canceled'})
+    
+    return jsonify({'message': 'Test cancellation requested'})
+
+
+@tests_bp.route('/tests/queue', methods=['GET'])
+def get_inference_queue():
+    """Get inference queue backend and load"""
+    return jsonify(inference_queue.stats())
 
 
 @tests_bp.route('/tests/<int:test_id>/results', methods=['GET'])
 def get_test_results(test_id):
-    """Get test results including annotated images/videos"""
+    """Get test results including annotated images/videos
+
+    Video tests accept ?offset=&limit=&format=compact to page through
+    per-frame detections without loading the whole side file.
+    """
     test = Test.query.get_or_404(test_id)
     
     if not test.result_dir or not os.path.exists(test.result_dir):
@@ -261,7 +305,7 @@ def get_test_results(test_id):
     # List result files
     for root, dirs, files in os.walk(test.result_dir):
         for file in files:
-            if file.lower().endswith(('.jpg', '.jpeg', '.png', '.mp4', '.avi')):
+            if file.lower().endswith(('.jpg', '.jpeg', '.png', '.webp', '.mp4', '.avi')):
                 file_path = os.path.join(root, file)
                 rel_path = os.path.relpath(file_path, test.result_dir)
                 
@@ -272,9 +316,31 @@ def get_test_results(test_id):
                     'filename': file,
                     'path': rel_path,
                     'url': file_url,
-                    'type': 'image' if file.lower().endswith(('.jpg', '.jpeg', '.png')) else 'video'
+                    'type': 'image' if file.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')) else 'video'
                 })
     
+    # Per-frame detections (video tests) are paged from the columnar side file
+    detections_dir = os.path.join(test.result_dir, 'detections')
+    if DetectionReader.exists(detections_dir):
+        with DetectionReader(detections_dir) as reader:
+            frame_detections = {
+                'total_frames': reader.total_frames,
+                'total_detections': reader.total_rows
+            }
+            
+            if 'offset' in request.args or 'limit' in request.args:
+                offset = max(0, request.args.get('offset', 0, type=int))
+                limit = min(MAX_FRAMES_PER_PAGE, max(1, request.args.get('limit', 100, type=int)))
+                compact = request.args.get('format', results['metrics'].get('detection_format')) == 'compact'
+                frame_detections.update({
+                    'offset': offset,
+                    'limit': limit,
+                    'format': 'compact' if compact else 'full',
+                    'frames': reader.read(offset, limit, compact=compact)
+                })
+        
+        results['frame_detections'] = frame_detections
+    
     return jsonify(results)
 
 
@@ -299,6 +365,19 @@ def delete_test(test_id):
         return jsonify({'error': str(e)}), 500
 
 
+@tests_bp.route('/tests/model-cache', methods=['GET'])
+def get_model_cache_stats():
+    """Get shared model cache counters (hits, misses, evictions)"""
+    return jsonify(model_cache.stats())
+
+
+@tests_bp.route('/tests/model-cache', methods=['DELETE'])
+def clear_model_cache():
+    """Drop every cached model"""
+    removed = model_cache.invalidate()
+    return jsonify({'message': 'Model cache cleared', 'removed': removed})
+
+
 # WebSocket endpoint for webcam inference
 @tests_bp.route('/tests/webcam/frame', methods=['POST'])
 def process_webcam_frame():
@@ -316,13 +395,107 @@ def process_webcam_frame():
         conf_threshold = data.get('conf_threshold', 0.25)
         iou_threshold = data.get('iou_threshold', 0.45)
         img_size = data.get('img_size', 640)
+        detection_format = 'compact' if data.get('detection_format') == 'compact' else 'full'
         
         # Process frame
         result = inference.process_webcam_frame(
-            model_path, frame_data, conf_threshold, iou_threshold, img_size
+            model_path, frame_data, conf_threshold, iou_threshold, img_size,
+            detection_format=detection_format
         )
         
         return jsonify(result)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+def _parse_webcam_options(data):
+    """Validate the open_session payload; raises ValueError with a message for the client"""
+    def number(name, default, cast, low, high):
+        value = data.get(name, default)
+        try:
+            value = cast(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'{name} must be a number')
+        if not low <= value <= high:  # also rejects NaN
+            raise ValueError(f'{name} must be between {low} and {high}')
+        return value
+    
+    return {
+        'conf_threshold': number('conf_threshold', 0.25, float, 0.0, 1.0),
+        'iou_threshold': number('iou_threshold', 0.45, float, 0.0, 1.0),
+        'img_size': number('img_size', 640, int, 32, 4096),
+        'device': data.get('device'),
+        'annotate': bool(data.get('annotate', False)),
+        'detection_format': 'compact' if data.get('detection_format') == 'compact' else 'full',
+        'jpeg_quality': number('jpeg_quality', 80, int, 1, 100)
+    }
+
+
+# WebSocket events for streaming webcam inference
+@socketio.on('open_session', namespace='/ws/webcam')
+def handle_open_webcam_session(data):
+    """Bind this connection to one model for the rest of the stream"""
+    data = data or {}
+    if not isinstance(data, dict):
+        emit('session_error', {'error': 'open_session expects an object'})
+        return
+    
+    try:
+        options = _parse_webcam_options(data)
+    except ValueError as e:
+        emit('session_error', {'error': str(e)})
+        return
+    
+    model_path = data.get('model_path')
+    training_id = data.get('training_id')
+    
+    if training_id:
+        best_checkpoint = Checkpoint.query.filter_by(
+            training_id=training_id, is_final=True
+        ).first()
+        model_path = best_checkpoint.file_path if best_checkpoint else None
+    
+    if not model_path:
+        emit('session_error', {'error': 'Model path or completed training is required'})
+        return
+    
+    try:
+        webcam_streams.open(request.sid, model_path, options)
+    except Exception as e:
+        emit('session_error', {'error': str(e)})
+        return
+    
+    emit('session_opened', {'model_path': model_path, 'options': options})
+
+
+@socketio.on('frame', namespace='/ws/webcam')
+def handle_webcam_frame(data):
+    """Receive one encoded frame (raw bytes or {'image', 'seq', 'sent_at'})"""
+    if isinstance(data, dict):
+        image_bytes, seq, sent_at = data.get('image'), data.get('seq'), data.get('sent_at')
+    else:
+        image_bytes, seq, sent_at = data, None, None
+    
+    if not image_bytes:
+        emit('frame_error', {'seq': seq, 'error': 'Empty frame'})
+        return
+    
+    if not webcam_streams.submit(request.sid, image_bytes, seq, sent_at):
+        emit('session_error', {'error': 'No open session, send open_session first'})
+
+
+@socketio.on('get_stats', namespace='/ws/webcam')
+def handle_webcam_stats(data=None):
+    session = webcam_streams.get(request.sid)
+    emit('session_stats', session.stats() if session else {})
+
+
+@socketio.on('close_session', namespace='/ws/webcam')
+def handle_close_webcam_session(data=None):
+    emit('session_closed', {'stats': webcam_streams.close(request.sid)})
+
+
+@socketio.on('disconnect', namespace='/ws/webcam')
+def handle_webcam_disconnect():
+    webcam_streams.close(request.sid)
@@ -7,8 +7,12 @@ from datetime import datetime
 from sqlalchemy import func
 from app import db, socketio
 from app.models import Training, TrainingMetric, Checkpoint, Dataset
-from app.services.trainer import TrainingService
+from app.services.trainer import TrainingService, RESUMABLE_STATUSES
 from app.services.storage import StorageService
+from app.services.exporter import exporter, dataset_sample_images, EXPORT_FORMATS
+from app.services.results_csv import load_results
+from app.services.profiling import PROFILE_FIELDS, profile_summary
+from app.services.stopping import parse_rules as parse_stop_rules
 
 trainings_bp = Blueprint('trainings', __name__)
 storage = StorageService()
@@ -97,6 +101,8 @@ def create_training():
         dataset = Dataset.query.get(dataset_id)
         if not dataset:
             return jsonify({'error': 'Dataset not found'}), 404
+        if dataset.ingest_status == 'processing':
+            return jsonify({'error': 'Dataset files are still being processed'}), 400
         
         # Helper function to convert values
         def convert_to_bool(value):
@@ -128,6 +134,15 @@ def create_training():
                 return 'pose'
             return fallback
         
+        # Platform stopping rules: a 'stop_rules' object, or flat stop_* form fields
+        stop_rules = data.get('stop_rules')
+        if stop_rules is None:
+            stop_rules = {key[len('stop_'):]: value for key, value in data.items() if key.startswith('stop_')}
+        try:
+            stop_rules = parse_stop_rules(stop_rules)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Create training record
         requested_model_name = (data.get('model_name') or '').strip()
         requested_task_type = (data.get('task_type') or data.get('task') or '').strip()
@@ -156,6 +171,8 @@ def create_training():
             workers=convert_to_int(data.get('workers', 8), 8),
             save_checkpoints=convert_to_bool(data.get('save_checkpoints', True)),
             use_augmentation=convert_to_bool(data.get('use_augmentation', True)),
+            priority=convert_to_int(data.get('priority', 0), 0),
+            auto_tune=convert_to_bool(data.get('auto_tune', False)),
             
             status='queued'
         )
@@ -170,17 +187,19 @@ def create_training():
             'workers': training.workers,
             'save_checkpoints': training.save_checkpoints,
             'use_augmentation': training.use_augmentation,
+            'auto_tune': training.auto_tune,
             'model_version': training.model_version,
             'model_name': model_name,
             'task_type': training.task_type,
             'device': training.device
         }
         training.set_config(config)
+        training.set_stop_rules(stop_rules)
         
         db.session.add(training)
         db.session.commit()
         
-        # Start training asynchronously
+        # Queue for the scheduler, which starts it when a device slot is free
         trainer.start_training(training.id)
         
         return jsonify({
@@ -211,6 +230,32 @@ def start_training(training_id):
         return jsonify({'error': str(e)}), 500
 
 
+@trainings_bp.route('/trainings/<int:training_id>/resume', methods=['POST'])
+def resume_training(training_id):
+    """Continue an interrupted, failed or canceled training from run/weights/last.pt"""
+    training = Training.query.get_or_404(training_id)
+    
+    if training.status not in RESUMABLE_STATUSES:
+        return jsonify({'error': f'Training cannot be resumed from status {training.status}'}), 400
+    
+    if not trainer.last_checkpoint(training):
+        return jsonify({'error': 'No last.pt checkpoint to resume from'}), 404
+    
+    try:
+        trainer.prepare_resume(training)
+        db.session.commit()
+        trainer.start_training(training_id)
+        
+        return jsonify({
+            'message': 'Training queued to resume from last checkpoint',
+            'training': training.to_dict()
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
 @trainings_bp.route('/trainings/<int:training_id>/cancel', methods=['POST'])
 def cancel_training(training_id):
     """Cancel an active training"""
@@ -234,6 +279,21 @@ def cancel_training(training_id):
         return jsonify({'error': str(e)}), 500
 
 
+@trainings_bp.route('/trainings/queue', methods=['GET'])
+def get_training_queue():
+    """Slot usage and the queued trainings in dispatch order"""
+    snapshot = trainer.scheduler.queue_snapshot()
+    queued = [
+        {
+            'training_id': training_id,
+            'queue_position': entry['queue_position'],
+            'estimated_start_at': entry['estimated_start_at'].isoformat() if entry['estimated_start_at'] else None
+        }
+        for training_id, entry in snapshot.items()
+    ]
+    return jsonify({**trainer.scheduler.stats(), 'queued': queued})
+
+
 @trainings_bp.route('/trainings/<int:training_id>/metrics', methods=['GET'])
 def get_training_metrics(training_id):
     """Get training metrics with optional filtering"""
@@ -250,16 +310,37 @@ def get_training_metrics(training_id):
     })
 
 
+@trainings_bp.route('/trainings/<int:training_id>/profile', methods=['GET'])
+def get_training_profile(training_id):
+    """Per-epoch time, throughput and memory, and whether the run is input- or compute-bound"""
+    Training.query.get_or_404(training_id)
+    
+    columns = [getattr(TrainingMetric, field) for field in PROFILE_FIELDS]
+    rows = db.session.query(TrainingMetric.epoch, *columns).filter_by(training_id=training_id)\
+        .order_by(TrainingMetric.epoch.asc()).all()
+    epochs = [dict(zip(('epoch',) + PROFILE_FIELDS, row)) for row in rows]
+    
+    return jsonify({
+        'training_id': training_id,
+        'epochs': epochs,
+        'summary': profile_summary(epochs)
+    })
+
+
 @trainings_bp.route('/trainings/<int:training_id>/logs/stream', methods=['GET'])
 def stream_training_logs(training_id):
     """Stream training logs via Server-Sent Events"""
     training = Training.query.get_or_404(training_id)
     
+    logs = trainer.metrics.recent_logs(training_id)
+    
     def generate():
-        # This is a simplified implementation
-        # In a real scenario, you'd read from log files or queue
         yield f"data: Training {training_id} status: {training.status}\n\n"
         
+        # Log lines buffered in memory by the metrics sink
+        for entry in logs:
+            yield f"data: [{entry['timestamp']}] {entry['message']}\n\n"
+        
         if training.status == 'completed':
             yield f"data: Training completed successfully\n\n"
         elif training.status == 'failed':
@@ -369,6 +450,62 @@ def download_model(training_id):
     })
 
 
+def _final_model_path(training_id):
+    """Path of the final checkpoint of a completed training, or None"""
+    best_checkpoint = Checkpoint.query.filter_by(
+        training_id=training_id, is_final=True
+    ).first()
+    if not best_checkpoint or not os.path.exists(best_checkpoint.file_path):
+        return None
+    return best_checkpoint.file_path
+
+
+@trainings_bp.route('/trainings/<int:training_id>/export', methods=['POST'])
+def export_training_model(training_id):
+    """Export the trained model to ONNX / OpenVINO / TorchScript and check parity"""
+    training = Training.query.get_or_404(training_id)
+    
+    if training.status != 'completed':
+        return jsonify({'error': 'Training is not completed'}), 400
+    
+    model_path = _final_model_path(training_id)
+    if not model_path:
+        return jsonify({'error': 'Model file not found'}), 404
+    
+    data = request.get_json(silent=True) or {}
+    formats = data.get('formats') or ['onnx']
+    unsupported = [fmt for fmt in formats if fmt not in EXPORT_FORMATS]
+    if unsupported:
+        return jsonify({'error': f"Unsupported formats: {', '.join(unsupported)}"}), 400
+    
+    img_size = int(data.get('img_size') or training.img_size or 640)
+    samples = dataset_sample_images(training.dataset.path) if training.dataset else []
+    
+    try:
+        exports = []
+        for fmt in formats:
+            entry = exporter.export(model_path, fmt, img_size, force=bool(data.get('force')))
+            if data.get('parity_check', True):
+                entry = dict(entry, parity=exporter.parity_check(model_path, fmt, samples, img_size))
+            exports.append(entry)
+        
+        return jsonify({'model_path': model_path, 'exports': exports})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@trainings_bp.route('/trainings/<int:training_id>/exports', methods=['GET'])
+def list_training_exports(training_id):
+    """List cached export artifacts of the trained model"""
+    Training.query.get_or_404(training_id)
+    
+    model_path = _final_model_path(training_id)
+    if not model_path:
+        return jsonify({'error': 'Model file not found'}), 404
+    
+    return jsonify({'model_path': model_path, 'exports': exporter.list_exports(model_path)})
+
+
 @trainings_bp.route('/trainings/<int:training_id>', methods=['DELETE'])
 def delete_training(training_id):
     """Delete a training and its artifacts"""
@@ -527,48 +664,14 @@ def get_training_csv_data(training_id):
         return jsonify({'error': f'Results CSV file not found at {csv_path}'}), 404
     
     try:
-        import pandas as pd
-        
-        # Read CSV file
-        df = pd.read_csv(csv_path)
-        
-        # Clean column names (remove extra whitespace)
-        df.columns = df.columns.str.strip()
-        
-        # Convert to our metrics format
-        metrics = []
-        for _, row in df.iterrows():
-            # Extract values with fallbacks for missing columns
-            epoch = int(row.get('epoch', 0))
-            
-            # Use different possible column names for loss
-            train_loss = row.get('train/box_loss', row.get('loss', 0))
-            val_loss = row.get('val/box_loss', train_loss)
-            
-            # Use precision and recall as accuracy metrics
-            precision = row.get('metrics/precision(B)', 0)
-            recall = row.get('metrics/recall(B)', 0)
-            
-            # mAP metrics
-            map50 = row.get('metrics/mAP50(B)', 0)
-            map5095 = row.get('metrics/mAP50-95(B)', 0)
-            
-            metric = {
-                'epoch': epoch,
-                'loss': float(train_loss),
-                'accuracy': float(recall),  # Use recall as main accuracy metric
-                'val_loss': float(val_loss),
-                'val_accuracy': float(precision),  # Use precision as validation accuracy
-                'precision': float(precision),  # Add precision as separate field
-                'recall': float(recall),        # Add recall as separate field
-                'map50': float(map50),
-                'map5095': float(map5095)
-            }
-            metrics.append(metric)
+        # Parsed once per file version and served from memory until results.csv changes
+        table = load_results(csv_path)
+        metrics = table.api_metrics()
         
         return jsonify({
             'metrics': metrics,
             'total_epochs': len(metrics),
+            'extra_columns': table.extra_columns,
             'source': 'results.csv',
             'csv_path': csv_path
         })
@@ -61,25 +61,7 @@ def training_details_page(training_id):
             duration = f"{minutes}m"
     
     elapsed_time = duration or '-'
-    estimated_time = '-'
-    processing_speed = '-'
-    
-    if training.started_at and current_epoch > 0:
-        from datetime import datetime
-        elapsed_seconds = (datetime.utcnow() - training.started_at).total_seconds()
-        time_per_epoch = elapsed_seconds / current_epoch
-        remaining_epochs = training.epochs - current_epoch
-        
-        if remaining_epochs > 0:
-            remaining_seconds = remaining_epochs * time_per_epoch
-            est_hours = int(remaining_seconds // 3600)
-            est_minutes = int((remaining_seconds % 3600) // 60)
-            if est_hours > 0:
-                estimated_time = f"{est_hours}h {est_minutes}m"
-            else:
-                estimated_time = f"{est_minutes}m"
-        
-        processing_speed = f"{time_per_epoch:.1f}s/época"
+    estimated_time, processing_speed = _epoch_timing(training, metrics, current_epoch)
     
     return render_template('training_dashboard.html',
                          training=training,
@@ -130,25 +112,7 @@ def training_details_original(training_id):
     
     # Additional timing calculations
     elapsed_time = duration or '-'
-    estimated_time = '-'
-    processing_speed = '-'
-    
-    if training.started_at and current_epoch > 0:
-        from datetime import datetime
-        elapsed_seconds = (datetime.utcnow() - training.started_at).total_seconds()
-        time_per_epoch = elapsed_seconds / current_epoch
-        remaining_epochs = training.epochs - current_epoch
-        
-        if remaining_epochs > 0:
-            remaining_seconds = remaining_epochs * time_per_epoch
-            est_hours = int(remaining_seconds // 3600)
-            est_minutes = int((remaining_seconds % 3600) // 60)
-            if est_hours > 0:
-                estimated_time = f"{est_hours}h {est_minutes}m"
-            else:
-                estimated_time = f"{est_minutes}m"
-        
-        processing_speed = f"{time_per_epoch:.1f}s/época"
+    estimated_time, processing_speed = _epoch_timing(training, metrics, current_epoch)
     
     return render_template('training_details.html',
                          training=training,
@@ -167,3 +131,38 @@ def serve_training_file(training_id, filename):
     data_root = current_app.config.get('DATA_ROOT', 'data')
     model_dir = os.path.join(data_root, 'models', str(training_id))
     return send_from_directory(model_dir, filename)
+
+
+def _epoch_timing(training, metrics, current_epoch):
+    """Estimated remaining time and processing speed from the recent epochs
+
+    Uses the per-epoch profile recorded by the training callbacks; older
+    trainings without it fall back to elapsed time / current epoch.
+    """
+    estimated_time = '-'
+    processing_speed = '-'
+    if not training.started_at or current_epoch <= 0:
+        return estimated_time, processing_speed
+    
+    profiled = [m for m in metrics if m.epoch_time]
+    if profiled:
+        time_per_epoch = sum(m.epoch_time for m in profiled) / len(profiled)
+    else:
+        from datetime import datetime
+        elapsed_seconds = (datetime.utcnow() - training.started_at).total_seconds()
+        time_per_epoch = elapsed_seconds / current_epoch
+    
+    remaining_epochs = training.epochs - current_epoch
+    if remaining_epochs > 0:
+        remaining_seconds = remaining_epochs * time_per_epoch
+        est_hours = int(remaining_seconds // 3600)
+        est_minutes = int((remaining_seconds % 3600) // 60)
+        if est_hours > 0:
+            estimated_time = f"{est_hours}h {est_minutes}m"
+        else:
+            estimated_time = f"{est_minutes}m"
+    
+    processing_speed = f"{time_per_epoch:.1f}s/época"
+    if profiled and profiled[0].images_per_sec:
+        processing_speed += f" ({profiled[0].images_per_sec:.0f} img/s)"
+    return estimated_time, processing_speed
@@ -0,0 +1,189 @@
+import os
+import posixpath
+import stat
+import tarfile
+import time
+import zipfile
+import zlib
+
+import yaml
+from werkzeug.utils import secure_filename
+
+from app.services.label_validation import parse_kpt_shape
+from app.services.storage import IMAGE_EXTENSIONS
+
+YAML_NAMES = ('data.yaml', 'dataset.yaml')
+# Folder names that select a split; Roboflow exports use 'valid'
+SPLIT_ALIASES = {'train': 'train', 'val': 'val', 'valid': 'val', 'validation': 'val', 'test': 'test'}
+IMPORT_MAX_BYTES = int(float(os.getenv('IMPORT_MAX_GB', 20)) * 1024 ** 3)
+COPY_BUFFER = 1024 * 1024
+MAX_YAML_BYTES = 1024 * 1024
+
+
+class ArchiveImportError(Exception):
+    pass
+
+
+def safe_member_path(name):
+    """Normalised relative path of an archive member, or None when it could escape the target
+
+    Rejects absolute paths, Windows drive letters and '..' components.
+    """
+    name = name.replace('\\', '/')
+    if not name or name.startswith('/') or (len(name) > 1 and name[1] == ':'):
+        return None
+    path = posixpath.normpath(name)
+    if path in ('.', '..') or path.startswith('../'):
+        return None
+    return path
+
+
+def member_target(path):
+    """(split, kind, filename) for a YOLO-layout member, or None when it is not part of the dataset
+
+    Accepts both images/<split>/x.jpg and <split>/images/x.jpg layouts;
+    files under images/ or labels/ without a split folder go to train.
+    """
+    parts = path.split('/')
+    folders = [part.lower() for part in parts[:-1]]
+    filename = secure_filename(parts[-1])
+    extension = os.path.splitext(filename)[1].lower()
+
+    if 'images' in folders and extension in IMAGE_EXTENSIONS:
+        kind = 'image'
+    elif 'labels' in folders and extension == '.txt':
+        kind = 'label'
+    else:
+        return None
+
+    split = next((SPLIT_ALIASES[folder] for folder in reversed(folders) if folder in SPLIT_ALIASES), 'train')
+    return split, kind, filename
+
+
+def _load_yaml(content):
+    try:
+        data = yaml.safe_load(content)
+    except yaml.YAMLError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def yaml_classes(content):
+    """Class names from a YOLO data.yaml ('names' as a list or an index mapping)"""
+    names = _load_yaml(content).get('names')
+    if isinstance(names, dict):
+        try:
+            names = [names[key] for key in sorted(names, key=int)]
+        except (TypeError, ValueError):
+            return None
+    if not isinstance(names, list) or not names:
+        return None
+    return [str(name) for name in names]
+
+
+def yaml_kpt_shape(content):
+    """Pose keypoint shape from a YOLO data.yaml, or None"""
+    try:
+        return parse_kpt_shape(_load_yaml(content).get('kpt_shape'))
+    except ValueError:
+        return None
+
+
+def _zip_members(stream):
+    with zipfile.ZipFile(stream) as archive:
+        for info in archive.infolist():
+            mode = info.external_attr >> 16
+            if info.is_dir() or stat.S_ISLNK(mode):
+                continue
+            with archive.open(info) as source:
+                yield info.filename, source
+
+
+def _tar_members(stream):
+    # Stream mode reads members in order without seeking back
+    with tarfile.open(fileobj=stream, mode='r|*') as archive:
+        for member in archive:
+            if not member.isfile():
+                continue  # Links and devices are never extracted
+            yield member.name, archive.extractfile(member)
+
+
+def iter_members(stream, filename=''):
+    """(name, file object) for every regular file of a zip or tar archive, in archive order"""
+    try:
+        is_zip = zipfile.is_zipfile(stream)
+        stream.seek(0)
+    except (AttributeError, OSError):
+        is_zip = filename.lower().endswith('.zip')
+
+    return _zip_members(stream) if is_zip else _tar_members(stream)
+
+
+def _copy(source, target_path, written, max_bytes):
+    """Copy one member in fixed-size chunks; returns the running total of bytes written"""
+    if os.path.lexists(target_path):
+        os.remove(target_path)  # Never write through a hardlink into the blob store
+    with open(target_path, 'wb') as target:
+        while True:
+            chunk = source.read(COPY_BUFFER)
+            if not chunk:
+                return written
+            written += len(chunk)
+            if written > max_bytes:
+                raise ArchiveImportError(f'Archive expands to more than {max_bytes / 1024 ** 3:.1f} GB')
+            target.write(chunk)
+
+
+def import_archive(stream, filename, dataset_path, max_bytes=IMPORT_MAX_BYTES):
+    """Stream archive members straight into the dataset split folders
+
+    Returns the saved files as {path: (split, kind)}, the classes and
+    kpt_shape of an included data.yaml and throughput figures. Validation
+    is left to the caller (DatasetIngestor).
+    """
+    started = time.time()
+    files, classes, kpt_shape = {}, None, None
+    written, skipped, unsafe = 0, 0, 0
+
+    try:
+        for name, source in iter_members(stream, filename):
+            path = safe_member_path(name)
+            if path is None:
+                unsafe += 1
+                continue
+
+            if posixpath.basename(path).lower() in YAML_NAMES:
+                if classes is None:
+                    content = source.read(MAX_YAML_BYTES)
+                    classes, kpt_shape = yaml_classes(content), yaml_kpt_shape(content)
+                continue
+
+            target = member_target(path)
+            if target is None:
+                skipped += 1
+                continue
+
+            split, kind, member_name = target
+            target_dir = os.path.join(dataset_path, 'images' if kind == 'image' else 'labels', split)
+            os.makedirs(target_dir, exist_ok=True)
+            target_path = os.path.join(target_dir, member_name)
+            written = _copy(source, target_path, written, max_bytes)
+            files[target_path] = (split, kind)
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, zlib.error) as e:
+        raise ArchiveImportError(f'Invalid archive: {e}')
+
+    elapsed = max(time.time() - started, 1e-6)
+    return {
+        'files': files,
+        'classes': classes,
+        'kpt_shape': kpt_shape,
+        'stats': {
+            'files': len(files),
+            'bytes': written,
+            'skipped': skipped,
+            'unsafe': unsafe,
+            'seconds': round(elapsed, 2),
+            'files_per_sec': round(len(files) / elapsed, 1),
+            'mb_per_sec': round(written / 1024 ** 2 / elapsed, 2)
+        }
+    }
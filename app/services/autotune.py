@@ -0,0 +1,164 @@
+import os
+import shutil
+import tempfile
+import time
+
+BATCH_CANDIDATES = tuple(int(v) for v in os.getenv('AUTO_TUNE_BATCH_SIZES', '8,16,32,64').split(','))
+WORKER_CANDIDATES = tuple(int(v) for v in os.getenv('AUTO_TUNE_WORKERS', '0,2,4,8').split(','))
+PROBE_STEPS = int(os.getenv('AUTO_TUNE_STEPS', 5))
+# Share of device (or host) memory a batch may use before it is considered too large
+MEMORY_FRACTION = float(os.getenv('AUTO_TUNE_MEMORY_FRACTION', 0.9))
+
+
+def worker_candidates(candidates=WORKER_CANDIDATES, cpu_count=None):
+    """Worker counts worth probing on this host (never more than the CPU count)"""
+    cpu_count = cpu_count or os.cpu_count() or 1
+    return sorted({min(workers, cpu_count) for workers in candidates})
+
+
+def pick_configuration(batch_trials, worker_trials):
+    """Fastest batch size that fits memory and fastest worker count (ties go to fewer workers)
+
+    batch_trials: [{'batch_size', 'images_per_sec', 'fits'}]
+    worker_trials: [{'workers', 'images_per_sec'}]
+    Returns (batch_size, workers, images_per_sec) or None when no batch size fits.
+    """
+    fitting = [trial for trial in batch_trials if trial['fits']]
+    if not fitting:
+        return None
+
+    batch = max(fitting, key=lambda t: (t['images_per_sec'], -t['batch_size']))
+    if not worker_trials:
+        return batch['batch_size'], None, batch['images_per_sec']
+
+    loader = max(worker_trials, key=lambda t: (t['images_per_sec'], -t['workers']))
+    # The run is as fast as the slower of the model step and the data pipeline
+    return batch['batch_size'], loader['workers'], min(batch['images_per_sec'], loader['images_per_sec'])
+
+
+def _is_out_of_memory(error):
+    return isinstance(error, MemoryError) or 'out of memory' in str(error).lower()
+
+
+def _memory_pressure(torch, device):
+    """Fraction of device memory (or host RAM on CPU/MPS) in use"""
+    if device.type == 'cuda':
+        total = torch.cuda.get_device_properties(device).total_memory
+        return torch.cuda.max_memory_reserved(device) / total
+
+    import psutil
+    return psutil.virtual_memory().percent / 100
+
+
+def _probe_batch(torch, trainer, batch_size, steps):
+    """Images/sec of forward + backward passes on one real batch of the dataset"""
+    model, device = trainer.model, trainer.device
+    trainer.args.workers = 0
+    loader = trainer.get_dataloader(trainer.trainset, batch_size=batch_size, rank=-1, mode='train')
+    batch = trainer.preprocess_batch(next(iter(loader)))
+    images = len(batch['img'])
+    del loader
+
+    if device.type == 'cuda':
+        torch.cuda.empty_cache()
+        torch.cuda.reset_peak_memory_stats(device)
+
+    model.train()
+    elapsed = 0.0
+    for step in range(steps + 1):
+        start = time.perf_counter()
+        loss, _ = model(batch)
+        loss.sum().backward()
+        model.zero_grad(set_to_none=True)
+        if device.type == 'cuda':
+            torch.cuda.synchronize(device)
+        if step:  # The first step warms up kernels and allocators
+            elapsed += time.perf_counter() - start
+
+    fits = _memory_pressure(torch, device) <= MEMORY_FRACTION
+    return {'batch_size': batch_size, 'images': images, 'images_per_sec': images * steps / elapsed, 'fits': fits}
+
+
+def _repeat(loader):
+    while True:
+        yield from loader
+
+
+def _probe_workers(trainer, batch_size, workers, steps):
+    """Images/sec the training dataloader delivers with a given worker count"""
+    trainer.args.workers = workers
+    loader = trainer.get_dataloader(trainer.trainset, batch_size=batch_size, rank=-1, mode='train')
+    batches = _repeat(loader)  # Small datasets have fewer batches per epoch than probe steps
+    next(batches)  # Worker start-up is paid once per run, not per epoch
+
+    images = 0
+    start = time.perf_counter()
+    for _ in range(steps):
+        images += len(next(batches)['img'])
+    elapsed = time.perf_counter() - start
+    del batches, loader
+    return {'workers': workers, 'images_per_sec': images / elapsed}
+
+
+def autotune(model_name, data, img_size, device, batch_sizes=BATCH_CANDIDATES, workers=None, steps=PROBE_STEPS,
+             log=print):
+    """Probe batch sizes and dataloader workers on the training set; returns the chosen configuration
+
+    Batch sizes are tried in increasing order until one runs out of memory
+    or exceeds MEMORY_FRACTION. Runs inside the training worker process
+    (imports torch and ultralytics).
+    """
+    import torch
+    from ultralytics import YOLO
+
+    model = YOLO(model_name)
+    trainer_class = model.task_map[model.task]['trainer']
+    project = tempfile.mkdtemp(prefix='autotune-')
+    try:
+        trainer = trainer_class(overrides={
+            'model': model_name, 'data': data, 'imgsz': img_size, 'device': device, 'batch': min(batch_sizes),
+            'workers': 0, 'project': project, 'name': 'probe', 'exist_ok': True, 'plots': False, 'verbose': False
+        })
+        trainer.setup_model()
+        trainer.model = trainer.model.to(trainer.device)
+        trainer.set_model_attributes()
+
+        batch_trials = []
+        for batch_size in sorted(set(batch_sizes)):
+            try:
+                trial = _probe_batch(torch, trainer, batch_size, steps)
+            except (RuntimeError, MemoryError) as e:
+                if not _is_out_of_memory(e):
+                    raise
+                trial = {'batch_size': batch_size, 'images_per_sec': 0.0, 'fits': False}
+            if batch_trials and trial.get('images', batch_size) < batch_size:
+                break  # The dataset caps larger batches to the same images
+            batch_trials.append(trial)
+            log(f"Auto-tune: batch {batch_size} -> {trial['images_per_sec']:.1f} img/s"
+                f"{'' if trial['fits'] else ' (excede a memoria)'}")
+            if not trial['fits']:
+                break
+
+        fitting = [trial for trial in batch_trials if trial['fits']]
+        if not fitting:
+            return None
+        best_batch = max(fitting, key=lambda t: (t['images_per_sec'], -t['batch_size']))['batch_size']
+
+        worker_trials = []
+        for count in workers if workers is not None else worker_candidates():
+            trial = _probe_workers(trainer, best_batch, count, steps)
+            worker_trials.append(trial)
+            log(f"Auto-tune: {count} workers -> {trial['images_per_sec']:.1f} img/s")
+
+        batch_size, worker_count, images_per_sec = pick_configuration(batch_trials, worker_trials)
+        return {
+            'batch_size': batch_size,
+            'workers': worker_count,
+            'images_per_sec': images_per_sec,
+            'batch_trials': batch_trials,
+            'worker_trials': worker_trials,
+        }
+    finally:
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        shutil.rmtree(project, ignore_errors=True)
@@ -0,0 +1,157 @@
+import hashlib
+import os
+import threading
+from collections import Counter
+
+from sqlalchemy import func
+
+from app import db
+from app.models import Blob, Dataset, DatasetFile
+
+HASH_BUFFER = 1024 * 1024
+PURGE_BATCH = 500  # Stays under SQLite's bound-parameter limit
+
+
+def file_digest(path):
+    """sha256 hex digest and size of a file (module level so process pools can run it)"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_BUFFER)
+            if not chunk:
+                return digest.hexdigest(), size
+            digest.update(chunk)
+            size += len(chunk)
+
+
+class BlobStore:
+    """Content-addressed store of dataset images under <root>/<aa>/<bb>/<sha256>
+
+    Dataset split files are hardlinks to their blob, so datasets that share
+    images share disk blocks. Blob rows count the DatasetFile rows pointing
+    at each blob; a blob is removed from the store when that count reaches
+    zero. Because dataset files are hardlinks, removing a blob name never
+    destroys content a dataset still holds.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def link(self, path, digest):
+        """Make path a hardlink of its blob, storing it first if new; False when it stays a private copy"""
+        blob_path = self.blob_path(digest)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        try:
+            os.link(path, blob_path)  # First copy of this content becomes the blob
+            return True
+        except FileExistsError:
+            pass
+        except OSError:
+            return False  # Store on another filesystem or links unsupported
+
+        try:
+            if os.path.samefile(path, blob_path):
+                return True
+            tmp_path = f'{path}.blob-{os.getpid()}'
+            os.link(blob_path, tmp_path)
+            os.replace(tmp_path, path)
+            return True
+        except OSError:
+            return False
+
+    def add_references(self, sizes):
+        """Count new DatasetFile references; sizes is a list of (digest, size), one per reference"""
+        counts = Counter(digest for digest, _ in sizes)
+        if not counts:
+            return
+        size_of = dict(sizes)
+
+        # Serialises first inserts of the same blob from concurrent ingestions
+        with self._lock:
+            existing = {row.hash for row in Blob.query.filter(Blob.hash.in_(list(counts))).all()}
+            for digest, count in counts.items():
+                if digest in existing:
+                    Blob.query.filter_by(hash=digest).update({'refcount': Blob.refcount + count})
+                else:
+                    db.session.add(Blob(hash=digest, size=size_of[digest], refcount=count))
+            db.session.commit()
+
+    def release(self, dataset_id):
+        """Drop a dataset's references; returns digests no longer referenced (commit, then purge them)"""
+        dataset_blobs = db.session.query(DatasetFile.blob_hash).filter(DatasetFile.dataset_id == dataset_id)
+        references = (
+            db.session.query(func.count(DatasetFile.id))
+            .filter(DatasetFile.dataset_id == dataset_id, DatasetFile.blob_hash == Blob.hash)
+            .scalar_subquery()
+        )
+        # One statement for the whole dataset, however many images it has
+        Blob.query.filter(Blob.hash.in_(dataset_blobs)).update(
+            {'refcount': Blob.refcount - references}, synchronize_session=False
+        )
+
+        unreferenced = Blob.query.filter(Blob.hash.in_(dataset_blobs), Blob.refcount <= 0)
+        freed = [row.hash for row in unreferenced.all()]
+        unreferenced.delete(synchronize_session=False)
+        return freed
+
+    def purge(self, digests):
+        """Remove unreferenced blobs from disk (after the release was committed)"""
+        digests = list(digests)
+        with self._lock:
+            for start in range(0, len(digests), PURGE_BATCH):
+                batch = digests[start:start + PURGE_BATCH]
+                alive = {row.hash for row in Blob.query.filter(Blob.hash.in_(batch)).all()}
+                for digest in batch:
+                    if digest in alive:
+                        continue  # Referenced again by an ingestion since the release
+                    try:
+                        os.remove(self.blob_path(digest))
+                    except OSError:
+                        pass
+
+    def report(self, dataset_id):
+        """How a dataset's images are stored: plain size, bytes only it holds, bytes shared with others"""
+        rows = (
+            db.session.query(DatasetFile.blob_hash, func.count(DatasetFile.id), Blob.size, Blob.refcount)
+            .join(Blob, Blob.hash == DatasetFile.blob_hash)
+            .filter(DatasetFile.dataset_id == dataset_id)
+            .group_by(DatasetFile.blob_hash, Blob.size, Blob.refcount)
+            .all()
+        )
+        untracked = DatasetFile.query.filter(
+            DatasetFile.dataset_id == dataset_id,
+            DatasetFile.blob_hash.is_(None),
+            func.lower(DatasetFile.file_path).notlike('%.txt')
+        ).count()
+
+        logical = sum(count * size for _, count, size, _ in rows)
+        unique = sum(size for _, count, size, refcount in rows if refcount <= count)
+        shared = sum(size for _, count, size, refcount in rows if refcount > count)
+
+        dataset_blobs = db.session.query(DatasetFile.blob_hash).filter(
+            DatasetFile.dataset_id == dataset_id, DatasetFile.blob_hash.isnot(None)
+        )
+        others = (
+            db.session.query(Dataset.id, Dataset.name, func.count(DatasetFile.id))
+            .join(DatasetFile, DatasetFile.dataset_id == Dataset.id)
+            .filter(DatasetFile.blob_hash.in_(dataset_blobs), Dataset.id != dataset_id)
+            .group_by(Dataset.id, Dataset.name)
+            .all()
+        )
+        shared_with = [{'dataset_id': other_id, 'name': name, 'files': files} for other_id, name, files in others]
+
+        return {
+            'files': sum(count for _, count, _, _ in rows),
+            'blobs': len(rows),
+            'untracked_files': untracked,
+            'logical_bytes': logical,
+            'unique_bytes': unique,
+            'shared_bytes': shared,
+            'duplicate_bytes': logical - unique - shared,
+            'shared_with': shared_with
+        }
@@ -0,0 +1,52 @@
+from ultralytics.data.dataset import YOLODataset
+
+from app.services.preprocess_cache import CacheReader
+
+
+class CachedYOLODataset(YOLODataset):
+    """YOLODataset whose load_image serves resized images from the cache shards
+
+    Imports ultralytics, so only the training worker uses this module.
+    Images missing from the cache (or loaded with rect_mode=False) go
+    through the original decode path.
+    """
+
+    def use_cache(self, reader):
+        self.preprocess_cache = reader
+        self.cache_slots = [reader.slot(path) for path in self.im_files]
+        return sum(slot is not None for slot in self.cache_slots)
+
+    def load_image(self, i, rect_mode=True):
+        slot = self.cache_slots[i] if rect_mode else None
+        if slot is None or self.ims[i] is not None:
+            return super().load_image(i, rect_mode)
+
+        im, (h0, w0) = self.preprocess_cache.get(slot)
+
+        # Same buffer bookkeeping as BaseDataset.load_image (mosaic reuses recent images)
+        if self.augment:
+            self.ims[i], self.im_hw0[i], self.im_hw[i] = im, (h0, w0), im.shape[:2]
+            self.buffer.append(i)
+            if len(self.buffer) >= self.max_buffer_length:
+                j = self.buffer.pop(0)
+                self.ims[j], self.im_hw0[j], self.im_hw[j] = None, None, None
+
+        return im, (h0, w0), im.shape[:2]
+
+
+def cached_trainer(trainer_class, cache_dir, log=print):
+    """Subclass of a task trainer whose datasets read from the cache at cache_dir"""
+    reader = CacheReader(cache_dir)
+
+    class CachedTrainer(trainer_class):
+        def build_dataset(self, img_path, mode='train', batch=None):
+            dataset = super().build_dataset(img_path, mode, batch)
+            if type(dataset) is not YOLODataset or dataset.imgsz != reader.img_size:
+                return dataset
+
+            dataset.__class__ = CachedYOLODataset
+            hits = dataset.use_cache(reader)
+            log(f'Cache de pre-processamento ({mode}): {hits}/{len(dataset.im_files)} imagens')
+            return dataset
+
+    return CachedTrainer
@@ -0,0 +1,80 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import or_
+
+from app import db
+from app.models import Dataset
+from app.services.storage import SPLITS, scan_dataset_splits, split_mtimes
+
+RECONCILE_INTERVAL = int(os.getenv('DATASET_RECONCILE_INTERVAL', 300))
+
+
+def reconcile(dataset, force=False):
+    """Rescan the splits whose images/ directory changed since the last scan; returns the drifted splits
+
+    Ingestion keeps the stored counts up to date; this catches files added
+    or removed behind the application's back. Directory mtimes only move
+    when entries change, so an untouched dataset costs three stat calls.
+    """
+    mtimes = split_mtimes(dataset.path)
+    known = dataset.get_split_mtimes()
+    changed = [split for split in SPLITS if force or mtimes[split] is None or mtimes[split] != known.get(split)]
+
+    drifted = []
+    if changed:
+        stats = dataset.get_split_stats()
+        scanned = scan_dataset_splits(dataset.path, changed)
+        drifted = [split for split in changed if scanned[split] != stats[split]]
+        stats.update(scanned)
+        dataset.set_split_stats(stats)
+
+    dataset.split_mtimes_json = json.dumps(mtimes)
+    dataset.stats_checked_at = datetime.utcnow()
+    return drifted
+
+
+class DatasetStatsReconciler:
+    """Background scan that corrects stored dataset counts when the disk drifts from them"""
+
+    def __init__(self, interval=RECONCILE_INTERVAL):
+        self.interval = interval
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self, app):
+        """Start the periodic scan once; the first pass runs right away"""
+        with self._lock:
+            if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._thread = threading.Thread(target=self._loop, args=(app,), name='dataset-stats', daemon=True)
+            self._thread.start()
+
+    def _loop(self, app):
+        while True:
+            try:
+                with app.app_context():
+                    self.reconcile_all()
+            except Exception as e:
+                print(f"Error reconciling dataset stats: {e}")
+            time.sleep(self.interval)
+
+    def reconcile_all(self):
+        """Reconcile every dataset that is not being ingested (requires an app context)"""
+        datasets = Dataset.query.filter(
+            or_(Dataset.ingest_status.is_(None), Dataset.ingest_status != 'processing')
+        ).all()
+
+        corrected = {}
+        for dataset in datasets:
+            drifted = reconcile(dataset)
+            if drifted:
+                corrected[dataset.id] = drifted
+            db.session.commit()
+
+        for dataset_id, splits in corrected.items():
+            print(f"Dataset {dataset_id}: contagens corrigidas em {', '.join(splits)}")
+        return corrected
@@ -0,0 +1,153 @@
+import json
+import os
+
+import numpy as np
+
+# One raw little-endian file per column; rows are individual detections
+COLUMNS = {
+    'frame': ('<i4', 1),
+    'cls': ('<i2', 1),
+    'conf': ('<f4', 1),
+    'xyxy': ('<f4', 4),
+}
+# Per processed frame: (frame index, first detection row)
+FRAME_INDEX = ('frames', '<i8', 2)
+META_FILE = 'meta.json'
+FORMAT_VERSION = 1
+
+
+def _column_file(directory, name, dtype):
+    return os.path.join(directory, f'{name}.{np.dtype(dtype).str[1:]}.bin')
+
+
+class DetectionWriter:
+    """Append-only columnar writer for per-frame detections"""
+
+    def __init__(self, directory, names=None):
+        self.directory = directory
+        self.names = names or {}
+        self.rows = 0
+        self.frames = 0
+        os.makedirs(directory, exist_ok=True)
+
+        self._files = {
+            name: open(_column_file(directory, name, dtype), 'wb')
+            for name, (dtype, _) in COLUMNS.items()
+        }
+        name, dtype, _ = FRAME_INDEX
+        self._files[name] = open(_column_file(directory, name, dtype), 'wb')
+
+    def append(self, frame_index, xyxy, conf, cls):
+        """Write the detections of one frame (arrays of length N, xyxy is N x 4)"""
+        count = len(conf)
+        self._files['frames'].write(np.array([frame_index, self.rows], dtype='<i8').tobytes())
+        if count:
+            self._files['frame'].write(np.full(count, frame_index, dtype='<i4').tobytes())
+            self._files['cls'].write(np.asarray(cls, dtype='<i2').tobytes())
+            self._files['conf'].write(np.asarray(conf, dtype='<f4').tobytes())
+            self._files['xyxy'].write(np.asarray(xyxy, dtype='<f4').reshape(count, 4).tobytes())
+        self.rows += count
+        self.frames += 1
+
+    def close(self):
+        for file_obj in self._files.values():
+            file_obj.close()
+        meta = {
+            'version': FORMAT_VERSION,
+            'rows': self.rows,
+            'frames': self.frames,
+            'names': {str(k): v for k, v in self.names.items()},
+            'columns': {name: {'dtype': dtype, 'width': width} for name, (dtype, width) in COLUMNS.items()},
+        }
+        with open(os.path.join(self.directory, META_FILE), 'w') as f:
+            json.dump(meta, f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class DetectionReader:
+    """Range reader over a detections directory using memory maps
+
+    Close it (or use it as a context manager) when done: an open map keeps
+    its file locked on Windows, so the test directory could not be deleted.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        meta_path = os.path.join(directory, META_FILE)
+        self.meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r') as f:
+                self.meta = json.load(f)
+        self.names = self.meta.get('names', {})
+
+        name, dtype, width = FRAME_INDEX
+        self._frames = self._map(name, dtype, width)
+        self.total_frames = len(self._frames)
+        # Derived from file sizes so partially written stores are readable too
+        self.total_rows = len(self._map('conf', *COLUMNS['conf']))
+
+    @staticmethod
+    def exists(directory):
+        name, dtype, _ = FRAME_INDEX
+        return os.path.exists(_column_file(directory, name, dtype))
+
+    def _map(self, name, dtype, width):
+        path = _column_file(self.directory, name, dtype)
+        itemsize = np.dtype(dtype).itemsize * width
+        rows = os.path.getsize(path) // itemsize if os.path.exists(path) else 0
+        if rows == 0:
+            return np.empty((0, width) if width > 1 else 0, dtype=dtype)
+        shape = (rows, width) if width > 1 else (rows,)
+        return np.memmap(path, dtype=dtype, mode='r', shape=shape)
+
+    def close(self):
+        """Release the frame index map; pages already returned are plain copies"""
+        name, dtype, width = FRAME_INDEX
+        # Dropping the last reference unmaps the file (numpy has no explicit unmap)
+        self._frames = np.empty((0, width), dtype=dtype)
+        self.total_frames = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def read(self, offset=0, limit=100, compact=False):
+        """Read processed frames [offset, offset + limit) with their detections"""
+        offset = max(0, offset)
+        stop = min(self.total_frames, offset + max(0, limit))
+        if offset >= stop:
+            return []
+
+        # Copies, so no view keeps a map (and its file handle) alive after the call
+        frames = np.array(self._frames[offset:stop])
+        row_start = int(frames[0, 1])
+        row_stop = int(self._frames[stop, 1]) if stop < self.total_frames else self.total_rows
+
+        columns = {
+            name: np.array(self._map(name, dtype, width)[row_start:row_stop])
+            for name, (dtype, width) in COLUMNS.items()
+        }
+
+        bounds = np.append(frames[:, 1], row_stop) - row_start
+        page = []
+        for i, frame_index in enumerate(frames[:, 0].tolist()):
+            lo, hi = bounds[i], bounds[i + 1]
+            xyxy = columns['xyxy'][lo:hi].round(2).tolist()
+            conf = columns['conf'][lo:hi].round(4).tolist()
+            cls = columns['cls'][lo:hi].tolist()
+            if compact:
+                detections = [[*box, c, k] for box, c, k in zip(xyxy, conf, cls)]
+            else:
+                detections = [
+                    {'bbox': box, 'confidence': c, 'class': k, 'class_name': self.names.get(str(k))}
+                    for box, c, k in zip(xyxy, conf, cls)
+                ]
+            page.append({'frame': frame_index, 'detection_count': int(hi - lo), 'detections': detections})
+        return page
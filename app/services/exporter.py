@@ -0,0 +1,260 @@
+import glob
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from app.services.model_cache import model_cache
+from app.services.storage import is_image_file
+
+# Export formats served on CPU and the artifact ultralytics writes next to the weights
+EXPORT_FORMATS = {
+    'onnx': {'suffix': '.onnx', 'dynamic': True},
+    'openvino': {'suffix': '_openvino_model', 'dynamic': False},
+    'torchscript': {'suffix': '.torchscript', 'dynamic': False},
+}
+BACKENDS = ('pytorch',) + tuple(EXPORT_FORMATS)
+
+PARITY_IOU = 0.5
+PARITY_MIN_MATCH_RATE = 0.95
+PARITY_SAMPLE_SIZE = 8
+
+
+def _box_iou(a, b):
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy arrays"""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def compare_detections(reference, candidate, iou_threshold=PARITY_IOU):
+    """Greedy same-class IoU matching between two (xyxy, conf, cls) tuples"""
+    ref_xyxy, ref_conf, ref_cls = reference
+    cand_xyxy, cand_conf, cand_cls = candidate
+    if len(ref_conf) == 0 or len(cand_conf) == 0:
+        return {'matched': 0, 'conf_deltas': [], 'ious': []}
+
+    iou = _box_iou(ref_xyxy, cand_xyxy)
+    iou[ref_cls[:, None] != cand_cls[None, :]] = 0
+
+    matched, conf_deltas, ious = 0, [], []
+    for i in np.argsort(-ref_conf):
+        j = int(np.argmax(iou[i]))
+        if iou[i, j] < iou_threshold:
+            continue
+        matched += 1
+        conf_deltas.append(float(abs(ref_conf[i] - cand_conf[j])))
+        ious.append(float(iou[i, j]))
+        iou[:, j] = 0  # each candidate box matches once
+    return {'matched': matched, 'conf_deltas': conf_deltas, 'ious': ious}
+
+
+def _publish(source, target):
+    """Move a finished artifact into place (OpenVINO exports are directories)"""
+    if not os.path.isdir(source):
+        os.replace(source, target)
+        return
+    previous = None
+    if os.path.exists(target):
+        # A directory cannot be swapped atomically; the old one is removed once the new one is in place
+        previous = f'{target}.old-{os.getpid()}-{int(time.time() * 1000)}'
+        os.replace(target, previous)
+    os.replace(source, target)
+    if previous:
+        shutil.rmtree(previous, ignore_errors=True)
+
+
+class ExportService:
+    """Export checkpoints to CPU inference runtimes and serve the cached artifacts"""
+
+    def __init__(self, models=None):
+        self.models = models or model_cache
+        self._lock = threading.Lock()
+
+    def artifact_path(self, model_path, fmt, img_size=None):
+        """Dynamic exports serve every input size; static ones get one artifact per size"""
+        base, _ = os.path.splitext(model_path)
+        if not EXPORT_FORMATS[fmt]['dynamic']:
+            base = f'{base}_{img_size}'
+        return base + EXPORT_FORMATS[fmt]['suffix']
+
+    def manifest_key(self, fmt, img_size):
+        return fmt if EXPORT_FORMATS[fmt]['dynamic'] else f'{fmt}_{img_size}'
+
+    def manifest_path(self, model_path):
+        base, _ = os.path.splitext(model_path)
+        return base + '.exports.json'
+
+    def load_manifest(self, model_path):
+        path = self.manifest_path(model_path)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _save_manifest(self, model_path, manifest):
+        path = self.manifest_path(model_path)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + '.tmp', path)
+
+    @staticmethod
+    def _newer_than(artifact, model_path):
+        return os.path.exists(artifact) and os.path.getmtime(artifact) >= os.path.getmtime(model_path)
+
+    def is_fresh(self, model_path, fmt, img_size=None):
+        """True when the artifact exists and is newer than the checkpoint"""
+        return self._newer_than(self.artifact_path(model_path, fmt, img_size), model_path)
+
+    def list_exports(self, model_path):
+        manifest = self.load_manifest(model_path)
+        exports = []
+        for fmt, spec in EXPORT_FORMATS.items():
+            entries = [dict(entry) for entry in manifest.values() if entry.get('format') == fmt]
+            if not entries:
+                entries = [{'path': self.artifact_path(model_path, fmt) if spec['dynamic'] else None}]
+            for entry in entries:
+                entry.update({
+                    'format': fmt,
+                    'available': bool(entry['path']) and self._newer_than(entry['path'], model_path),
+                })
+                exports.append(entry)
+        return exports
+
+    def export(self, model_path, fmt, img_size=640, force=False):
+        """Export (or reuse) an artifact; returns its manifest entry
+
+        Artifacts are built from a staging copy of the weights and moved into
+        place, so a test that already resolved one never reads a half-written file.
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Model file not found: {model_path}")
+
+        dynamic = EXPORT_FORMATS[fmt]['dynamic']
+        key = self.manifest_key(fmt, img_size)
+        with self._lock:
+            manifest = self.load_manifest(model_path)
+            entry = manifest.get(key)
+            if entry and not force and self.is_fresh(model_path, fmt, img_size):
+                return entry
+
+            from ultralytics import YOLO
+
+            started = time.time()
+            path = self.artifact_path(model_path, fmt, img_size)
+            staging = tempfile.mkdtemp(prefix='.export-', dir=os.path.dirname(model_path) or '.')
+            try:
+                weights = shutil.copy2(model_path, os.path.join(staging, os.path.basename(model_path)))
+                YOLO(weights).export(format=fmt, imgsz=img_size, dynamic=dynamic, device='cpu')
+                # Ultralytics names the artifact after the weights it was exported from
+                _publish(os.path.splitext(weights)[0] + EXPORT_FORMATS[fmt]['suffix'], path)
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+
+            entry = {
+                'format': fmt,
+                'path': path,
+                'img_size': img_size,
+                'dynamic': dynamic,
+                'export_seconds': round(time.time() - started, 2),
+                'exported_at': datetime.utcnow().isoformat(),
+            }
+            manifest[key] = entry
+            self._save_manifest(model_path, manifest)
+
+        # Any cached session for a previous artifact is now stale
+        self.models.invalidate(entry['path'])
+        return entry
+
+    def resolve(self, model_path, backend, img_size=640):
+        """Return (path, entry) of the weights to load for a backend, exporting on demand"""
+        if not backend or backend == 'pytorch':
+            return model_path, None
+        entry = self.export(model_path, backend, img_size)
+        return entry['path'], entry
+
+    def parity_check(self, model_path, fmt, sample_images=None, img_size=640, conf=0.25, iou=0.45):
+        """Compare exported detections against the PyTorch checkpoint on sample images"""
+        from app.services.infer import _box_arrays
+
+        entry = self.export(model_path, fmt, img_size)
+        samples = list(sample_images or [])[:PARITY_SAMPLE_SIZE] or self.default_samples()
+
+        reference_model = self.models.get(model_path)
+        exported_model = self.models.get(entry['path'])
+
+        totals = {'reference_boxes': 0, 'exported_boxes': 0, 'matched': 0}
+        conf_deltas, ious = [], []
+        timings = {'pytorch': 0.0, fmt: 0.0}
+
+        for image_path in samples:
+            started = time.time()
+            reference = reference_model(image_path, conf=conf, iou=iou, imgsz=img_size, verbose=False)[0]
+            timings['pytorch'] += time.time() - started
+
+            started = time.time()
+            exported = exported_model(image_path, conf=conf, iou=iou, imgsz=img_size, verbose=False)[0]
+            timings[fmt] += time.time() - started
+
+            ref_arrays, exp_arrays = _box_arrays(reference), _box_arrays(exported)
+            comparison = compare_detections(ref_arrays, exp_arrays)
+            totals['reference_boxes'] += len(ref_arrays[1])
+            totals['exported_boxes'] += len(exp_arrays[1])
+            totals['matched'] += comparison['matched']
+            conf_deltas.extend(comparison['conf_deltas'])
+            ious.extend(comparison['ious'])
+
+        denominator = max(totals['reference_boxes'], totals['exported_boxes'])
+        match_rate = totals['matched'] / denominator if denominator else 1.0
+        report = {
+            **totals,
+            'samples': len(samples),
+            'match_rate': round(match_rate, 4),
+            'max_conf_delta': round(max(conf_deltas), 4) if conf_deltas else 0.0,
+            'mean_iou': round(float(np.mean(ious)), 4) if ious else None,
+            'seconds': {name: round(value, 3) for name, value in timings.items()},
+            'passed': match_rate >= PARITY_MIN_MATCH_RATE,
+            'checked_at': datetime.utcnow().isoformat(),
+        }
+
+        key = self.manifest_key(fmt, img_size)
+        with self._lock:
+            manifest = self.load_manifest(model_path)
+            if key in manifest:
+                manifest[key]['parity'] = report
+                self._save_manifest(model_path, manifest)
+        return report
+
+    def default_samples(self):
+        """Bundled ultralytics sample images, used when no dataset images are given"""
+        from ultralytics.utils import ASSETS
+        return sorted(glob.glob(os.path.join(str(ASSETS), '*.jpg')))[:PARITY_SAMPLE_SIZE]
+
+
+def dataset_sample_images(dataset_path, limit=PARITY_SAMPLE_SIZE):
+    """First validation (or training) images of a dataset for parity checks"""
+    for split in ('val', 'train'):
+        images_dir = os.path.join(dataset_path, 'images', split)
+        if not os.path.isdir(images_dir):
+            continue
+        images = sorted(
+            os.path.join(images_dir, f) for f in os.listdir(images_dir)
+            if is_image_file(f)
+        )
+        if images:
+            return images[:limit]
+    return []
+
+
+# Shared by routes and the inference service
+exporter = ExportService()
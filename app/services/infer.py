@@ -1,15 +1,82 @@
 import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
-from ultralytics import YOLO
 from PIL import Image
 import json
 from app.services.storage import StorageService
+from app.services.model_cache import model_cache
+from app.services.detections_store import DetectionWriter
+from app.services.exporter import exporter as default_exporter
+from app.services.tiling import predict_tiled, DEFAULT_TILE_OVERLAP
+
+# Batched inference defaults (overridable per test)
+DEFAULT_BATCH_SIZE = int(os.getenv('INFERENCE_BATCH_SIZE', 8))
+DEFAULT_IO_WORKERS = int(os.getenv('INFERENCE_IO_WORKERS', min(8, os.cpu_count() or 1)))
+PREFETCH_BATCHES = 2
+
+# Test output modes: skip rendering entirely, or choose how annotated outputs are encoded
+OUTPUT_MODES = ('detections_only', 'annotated_jpeg', 'annotated_webp', 'thumbnails')
+DEFAULT_OUTPUT_MODE = 'annotated_jpeg'
+DEFAULT_OUTPUT_QUALITY = 95
+THUMBNAIL_SIZE = 320
+
+# Sentinel closing the video pipeline queues
+_END_OF_STREAM = object()
+
+
+def _thumbnail_size(width, height):
+    """(width, height) scaled so the longest side is THUMBNAIL_SIZE"""
+    scale = min(1.0, THUMBNAIL_SIZE / max(width, height, 1))
+    return max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+
+
+class InferenceCanceled(Exception):
+    """Raised inside long-running inference when its job is canceled"""
+
+
+def _check_canceled(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise InferenceCanceled('Inference was canceled')
+
+
+def _box_arrays(result):
+    """Return (xyxy, conf, cls) numpy arrays for the boxes of one result"""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+    # One device->host transfer per column instead of one per box
+    return boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy().astype(np.int64)
+
+
+def extract_detections(result, detection_format='full'):
+    """Build the JSON payload for the boxes of one ultralytics Results object
+
+    'full' gives one dict per box; 'compact' gives [x1, y1, x2, y2, conf, cls]
+    rows, leaving class names to the caller (image, video and directory
+    results then carry a single class_names map).
+    """
+    xyxy, conf, cls = _box_arrays(result)
+    rows = zip(xyxy.tolist(), conf.tolist(), cls.tolist())
+
+    if detection_format == 'compact':
+        return [[*bbox, confidence, class_id] for bbox, confidence, class_id in rows]
+
+    names = result.names
+    return [
+        {'bbox': bbox, 'confidence': confidence, 'class': class_id, 'class_name': names[class_id]}
+        for bbox, confidence, class_id in rows
+    ]
 
 
 class InferenceService:
-    def __init__(self):
+    def __init__(self, models=None, exporter=None):
         self.storage = StorageService()
+        self.models = models or model_cache
+        self.exporter = exporter or default_exporter
     
     def run_inference(self, model_path, source_type, input_path, test_id, **kwargs):
         """Run inference on given input"""
@@ -17,25 +84,62 @@ class InferenceService:
             # Create test directory
             test_dir = self.storage.create_test_directory(test_id)
             
-            # Load model
-            model = YOLO(model_path)
-            
             # Set inference parameters
             conf_threshold = kwargs.get('conf_threshold', 0.25)
             iou_threshold = kwargs.get('iou_threshold', 0.45)
             img_size = kwargs.get('img_size', 640)
+            device = kwargs.get('device')
+            batch_size = kwargs.get('batch_size')
+            cancel_event = kwargs.get('cancel_event')
+            output = {
+                'output_mode': kwargs.get('output_mode') or DEFAULT_OUTPUT_MODE,
+                'output_quality': kwargs.get('output_quality') or DEFAULT_OUTPUT_QUALITY
+            }
+            
+            # Tiled mode slices large images into overlapping tiles (tile_size defaults to img_size)
+            tiling = None
+            if kwargs.get('inference_mode') == 'tiled':
+                tiling = {
+                    'tile_size': int(kwargs.get('tile_size') or img_size),
+                    'overlap': float(kwargs.get('tile_overlap', DEFAULT_TILE_OVERLAP))
+                }
             
             results = []
-            output_paths = []
             
-            if source_type == 'image':
-                results = self._process_image(model, input_path, test_dir, conf_threshold, iou_threshold, img_size)
-            elif source_type == 'video':
-                results = self._process_video(model, input_path, test_dir, conf_threshold, iou_threshold, img_size)
-            elif source_type == 'dir':
-                results = self._process_directory(model, input_path, test_dir, conf_threshold, iou_threshold, img_size)
-            elif source_type == 'webcam':
-                results = self._process_webcam(model, test_dir, conf_threshold, iou_threshold, img_size)
+            # Exported backends (ONNX Runtime, OpenVINO, TorchScript) are built once and cached next to the .pt
+            backend = kwargs.get('backend') or 'pytorch'
+            model_path, export = self.exporter.resolve(model_path, backend, img_size)
+            if export is not None:
+                device = 'cpu'
+                if not export['dynamic']:
+                    # Static graphs are exported with a fixed input size and batch 1
+                    img_size = export['img_size']
+                    batch_size = 1
+            
+            detection_format = kwargs.get('detection_format', 'full')
+            
+            # Borrow the model from the shared cache (loaded once per checkpoint)
+            with self.models.use(model_path, device) as model:
+                if source_type == 'image':
+                    results = self._process_image(model, input_path, test_dir, conf_threshold, iou_threshold, img_size,
+                                                  detection_format=detection_format, cancel_event=cancel_event,
+                                                  tiling=tiling, batch_size=batch_size, **output)
+                elif source_type == 'video':
+                    results = self._process_video(model, input_path, test_dir, conf_threshold, iou_threshold, img_size,
+                                                  batch_size=batch_size,
+                                                  frame_stride=kwargs.get('frame_stride', 1),
+                                                  save_video=kwargs.get('save_video', True),
+                                                  cancel_event=cancel_event, detection_format=detection_format,
+                                                  **output)
+                elif source_type == 'dir':
+                    results = self._process_directory(model, input_path, test_dir, conf_threshold, iou_threshold, img_size,
+                                                      batch_size=batch_size, cancel_event=cancel_event, tiling=tiling,
+                                                      detection_format=detection_format, **output)
+                elif source_type == 'webcam':
+                    results = self._process_webcam(model, test_dir, conf_threshold, iou_threshold, img_size)
+            
+            if isinstance(results, dict):
+                results['backend'] = backend
             
             return {
                 'success': True,
@@ -43,129 +147,347 @@ class InferenceService:
                 'output_dir': test_dir
             }
             
+        except InferenceCanceled as e:
+            return {
+                'success': False,
+                'canceled': True,
+                'error': str(e)
+            }
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e)
             }
     
-    def _process_image(self, model, image_path, output_dir, conf, iou, img_size):
+    def _process_image(self, model, image_path, output_dir, conf, iou, img_size, detection_format='full',
+                       output_mode=DEFAULT_OUTPUT_MODE, output_quality=DEFAULT_OUTPUT_QUALITY,
+                       tiling=None, batch_size=None, cancel_event=None):
         """Process a single image"""
-        # Run inference
-        results = model(image_path, conf=conf, iou=iou, imgsz=img_size)
+        _check_canceled(cancel_event)
+        tile_stats = None
+        if tiling:
+            image = cv2.imread(image_path)
+            if image is None:
+                raise ValueError(f"Could not read image: {image_path}")
+            result, tile_stats = self._predict_tiled(model, image, conf, iou, img_size, tiling, batch_size)
+            results = [result]
+        else:
+            # Run inference
+            results = model(image_path, conf=conf, iou=iou, imgsz=img_size)
+        
+        # A cancel that arrived during prediction leaves no output behind
+        _check_canceled(cancel_event)
         
-        # Save annotated image
-        output_path = os.path.join(output_dir, 'annotated_image.jpg')
-        annotated_img = results[0].plot()
-        cv2.imwrite(output_path, annotated_img)
+        # Save annotated image (skipped for detections_only)
+        output_path = self._output_path(os.path.join(output_dir, 'annotated_image'), output_mode)
+        if output_path:
+            self._write_annotated(results[0], output_path, output_mode, output_quality)
         
         # Extract detection data
-        detections = []
-        if len(results[0].boxes) > 0:
-            boxes = results[0].boxes
-            for i, box in enumerate(boxes):
-                detection = {
-                    'bbox': box.xyxy[0].tolist(),
-                    'confidence': float(box.conf[0]),
-                    'class': int(box.cls[0]),
-                    'class_name': results[0].names[int(box.cls[0])]
-                }
-                detections.append(detection)
+        detections = extract_detections(results[0], detection_format)
         
-        return {
+        result = {
             'type': 'image',
             'input_path': image_path,
             'output_path': output_path,
             'detections': detections,
             'detection_count': len(detections)
         }
+        if detection_format == 'compact':
+            result['class_names'] = results[0].names
+        if tile_stats:
+            result['tiling'] = tile_stats
+        return result
     
-    def _process_video(self, model, video_path, output_dir, conf, iou, img_size):
-        """Process a video file"""
+    def _process_video(self, model, video_path, output_dir, conf, iou, img_size, batch_size=None,
+                       frame_stride=1, save_video=True, cancel_event=None, detection_format='full',
+                       output_mode=DEFAULT_OUTPUT_MODE, output_quality=DEFAULT_OUTPUT_QUALITY):
+        """Process a video file
+
+        Runs as a three-stage pipeline: a decoder thread reads frames into a
+        bounded queue, this thread runs the model on batches of frames, and an
+        encoder thread renders and writes the annotated video. Bounded queues
+        give backpressure so a slow stage never buffers the whole clip.
+        Per-frame detections are streamed to a columnar store under
+        output_dir/detections; detection_format is the default format of
+        the pages read back from it.
+        """
         cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video: {video_path}")
         
         # Get video properties
-        fps = int(cap.get(cv2.CAP_PROP_FPS))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30
         width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         
-        # Create output video writer
-        output_path = os.path.join(output_dir, 'annotated_video.mp4')
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+        batch_size = max(1, int(batch_size or DEFAULT_BATCH_SIZE))
+        frame_stride = max(1, int(frame_stride or 1))
+        
+        # Create output video writer (sampled frames keep real-time playback speed)
+        output_path = None
+        out = None
+        frame_size = None
+        if save_video and output_mode != 'detections_only':
+            output_path = os.path.join(output_dir, 'annotated_video.mp4')
+            if output_mode == 'thumbnails':
+                frame_size = _thumbnail_size(width, height)
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            out = cv2.VideoWriter(output_path, fourcc, max(1.0, fps / frame_stride), frame_size or (width, height))
+        
+        frames_queue = queue.Queue(maxsize=batch_size * PREFETCH_BATCHES)
+        encode_queue = queue.Queue(maxsize=batch_size * PREFETCH_BATCHES)
+        stop = threading.Event()
+        stage_errors = []
+        source_frames = 0
+        
+        def put(target, item):
+            # Block for backpressure, but give up if the pipeline is shutting down
+            while not stop.is_set():
+                try:
+                    target.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def end_stream(target):
+            # Sole producer of target: drop what nobody will consume so the marker always fits
+            while True:
+                try:
+                    target.put_nowait(_END_OF_STREAM)
+                    return
+                except queue.Full:
+                    try:
+                        target.get_nowait()
+                    except queue.Empty:
+                        pass
+        
+        def decode():
+            nonlocal source_frames
+            try:
+                while not stop.is_set():
+                    if source_frames % frame_stride:
+                        # Skipped frames are grabbed without being decoded
+                        if not cap.grab():
+                            break
+                        source_frames += 1
+                        continue
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    if not put(frames_queue, (source_frames, frame)):
+                        break
+                    source_frames += 1
+            except Exception as e:
+                stage_errors.append(e)
+            finally:
+                if not put(frames_queue, _END_OF_STREAM):
+                    end_stream(frames_queue)
+        
+        def encode():
+            try:
+                while True:
+                    result = encode_queue.get()
+                    if result is _END_OF_STREAM:
+                        break
+                    annotated = result.plot()
+                    if frame_size:
+                        annotated = cv2.resize(annotated, frame_size, interpolation=cv2.INTER_AREA)
+                    out.write(annotated)
+            except Exception as e:
+                stage_errors.append(e)
+                stop.set()
+        
+        decoder = threading.Thread(target=decode, name='video-decode', daemon=True)
+        encoder = threading.Thread(target=encode, name='video-encode', daemon=True) if out else None
+        decoder.start()
+        if encoder:
+            encoder.start()
         
         frame_count = 0
         total_detections = 0
+        detections_dir = os.path.join(output_dir, 'detections')
+        detections = DetectionWriter(detections_dir, getattr(model, 'names', None))
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Run inference on frame
-            results = model(frame, conf=conf, iou=iou, imgsz=img_size)
-            
-            # Annotate frame
-            annotated_frame = results[0].plot()
-            out.write(annotated_frame)
-            
-            # Count detections
-            total_detections += len(results[0].boxes) if results[0].boxes is not None else 0
-            frame_count += 1
+        try:
+            finished = False
+            while not finished and not stop.is_set():
+                _check_canceled(cancel_event)
+                
+                # Collect a batch of decoded frames
+                indices, batch = [], []
+                while len(batch) < batch_size and not stop.is_set():
+                    try:
+                        item = frames_queue.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    if item is _END_OF_STREAM:
+                        finished = True
+                        break
+                    indices.append(item[0])
+                    batch.append(item[1])
+                
+                if not batch or stop.is_set():
+                    break
+                
+                # Run inference on the batch
+                results = model(batch, conf=conf, iou=iou, imgsz=img_size, verbose=False)
+                
+                for frame_index, result in zip(indices, results):
+                    xyxy, confidences, classes = _box_arrays(result)
+                    detections.append(frame_index, xyxy, confidences, classes)
+                    total_detections += len(confidences)
+                    frame_count += 1
+                    if encoder and not put(encode_queue, result):
+                        break
+        finally:
+            if encoder is not None:
+                # The encoder drains the queue until the marker; a failed encoder is no longer reading it
+                while encoder.is_alive():
+                    try:
+                        encode_queue.put(_END_OF_STREAM, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                encoder.join()
+            stop.set()
+            decoder.join()
+            cap.release()
+            if out:
+                out.release()
+            detections.close()
         
-        cap.release()
-        out.release()
+        if stage_errors:
+            raise stage_errors[0]
         
-        return {
+        summary = {
             'type': 'video',
             'input_path': video_path,
             'output_path': output_path,
             'frame_count': frame_count,
-            'total_detections': total_detections
+            'source_frame_count': source_frames,
+            'frame_stride': frame_stride,
+            'total_detections': total_detections,
+            'detections_dir': detections_dir,
+            'detection_format': detection_format
         }
+        if detection_format == 'compact':
+            summary['class_names'] = getattr(model, 'names', None) or {}
+        return summary
     
-    def _process_directory(self, model, input_dir, output_dir, conf, iou, img_size):
-        """Process all images in a directory"""
+    def _process_directory(self, model, input_dir, output_dir, conf, iou, img_size, batch_size=None, workers=None,
+                           cancel_event=None, output_mode=DEFAULT_OUTPUT_MODE, output_quality=DEFAULT_OUTPUT_QUALITY,
+                           tiling=None, detection_format='full'):
+        """Process all images in a directory in batches
+
+        Images are decoded ahead of the model by a thread pool, fed to the
+        model in fixed-size batches (mixed shapes are letterboxed and padded to
+        img_size) and the annotated outputs are written by a second pool.
+        In tiled mode each image is one batch of its own tiles instead.
+        """
         # Create subdirectory for annotated images
-        annotated_dir = os.path.join(output_dir, 'annotated_images')
-        os.makedirs(annotated_dir, exist_ok=True)
+        render = output_mode != 'detections_only'
+        annotated_dir = os.path.join(output_dir, 'annotated_images') if render else None
+        if render:
+            os.makedirs(annotated_dir, exist_ok=True)
         
         # Get all image files
         image_extensions = {'.jpg', '.jpeg', '.png', '.bmp'}
         image_files = []
         
-        for file in os.listdir(input_dir):
+        for file in sorted(os.listdir(input_dir)):
             if any(file.lower().endswith(ext) for ext in image_extensions):
                 image_files.append(os.path.join(input_dir, file))
         
-        results = []
+        batch_size = max(1, int(batch_size or DEFAULT_BATCH_SIZE))
+        workers = max(1, int(workers or DEFAULT_IO_WORKERS))
+        batches = [image_files[i:i + batch_size] for i in range(0, len(image_files), batch_size)]
+        
+        # Slots keep the result list in input order regardless of completion order
+        slots = [None] * len(image_files)
         total_detections = 0
         
-        for image_path in image_files:
-            try:
-                # Run inference
-                inference_results = model(image_path, conf=conf, iou=iou, imgsz=img_size)
+        with ThreadPoolExecutor(workers, thread_name_prefix='infer-decode') as decoder, \
+                ThreadPoolExecutor(workers, thread_name_prefix='infer-write') as writer:
+            decoded = deque()
+            pending_writes = deque()
+            max_pending_writes = workers * batch_size * 2
+            next_batch = 0
+            
+            def prefetch():
+                nonlocal next_batch
+                while next_batch < len(batches) and len(decoded) < PREFETCH_BATCHES:
+                    start = next_batch * batch_size
+                    paths = batches[next_batch]
+                    decoded.append((start, paths, [decoder.submit(cv2.imread, path) for path in paths]))
+                    next_batch += 1
+            
+            prefetch()
+            while decoded:
+                _check_canceled(cancel_event)
+                start, paths, futures = decoded.popleft()
+                prefetch()
                 
-                # Save annotated image
-                filename = os.path.basename(image_path)
-                output_path = os.path.join(annotated_dir, f'annotated_{filename}')
-                annotated_img = inference_results[0].plot()
-                cv2.imwrite(output_path, annotated_img)
+                indices, frames = [], []
+                for offset, (image_path, future) in enumerate(zip(paths, futures)):
+                    frame = future.result()
+                    if frame is None:
+                        print(f"Error processing {image_path}: unreadable image")
+                        continue
+                    indices.append(start + offset)
+                    frames.append(frame)
                 
-                # Count detections
-                detection_count = len(inference_results[0].boxes) if inference_results[0].boxes is not None else 0
-                total_detections += detection_count
+                if not frames:
+                    continue
                 
-                results.append({
-                    'input_path': image_path,
-                    'output_path': output_path,
-                    'detection_count': detection_count
-                })
+                tile_stats = [None] * len(frames)
+                try:
+                    if tiling:
+                        tiled = [self._predict_tiled(model, frame, conf, iou, img_size, tiling, batch_size)
+                                 for frame in frames]
+                        batch_results = [result for result, _ in tiled]
+                        tile_stats = [stats for _, stats in tiled]
+                    else:
+                        # Run inference on the whole batch
+                        batch_results = model(frames, conf=conf, iou=iou, imgsz=img_size, verbose=False)
+                except Exception as e:
+                    print(f"Error processing batch starting at {paths[0]}: {e}")
+                    continue
                 
-            except Exception as e:
-                print(f"Error processing {image_path}: {e}")
+                for index, result, stats in zip(indices, batch_results, tile_stats):
+                    image_path = image_files[index]
+                    output_path = None
+                    if render:
+                        filename = os.path.basename(image_path)
+                        output_path = self._output_path(os.path.join(annotated_dir, f'annotated_{filename}'), output_mode)
+                    
+                    detections = extract_detections(result, detection_format)
+                    total_detections += len(detections)
+                    
+                    slots[index] = {
+                        'input_path': image_path,
+                        'output_path': output_path,
+                        'detections': detections,
+                        'detection_count': len(detections)
+                    }
+                    if stats:
+                        slots[index]['tiling'] = stats
+                    if output_path:
+                        pending_writes.append((image_path, writer.submit(
+                            self._write_annotated, result, output_path, output_mode, output_quality
+                        )))
+                
+                # Backpressure: do not let annotated frames pile up in memory
+                while len(pending_writes) > max_pending_writes:
+                    self._wait_for_write(*pending_writes.popleft())
+            
+            while pending_writes:
+                self._wait_for_write(*pending_writes.popleft())
         
-        return {
+        results = [slot for slot in slots if slot is not None]
+        
+        summary = {
             'type': 'directory',
             'input_path': input_dir,
             'output_dir': annotated_dir,
@@ -173,6 +495,52 @@ class InferenceService:
             'total_detections': total_detections,
             'results': results
         }
+        if detection_format == 'compact':
+            summary['class_names'] = getattr(model, 'names', None) or {}
+        if tiling:
+            summary['total_tiles'] = sum(r['tiling']['tiles'] for r in results if 'tiling' in r)
+        return summary
+    
+    def _predict_tiled(self, model, image, conf, iou, img_size, tiling, batch_size=None):
+        """Tiled prediction on one decoded image; returns (result, tile stats)"""
+        return predict_tiled(
+            model, image, tiling['tile_size'], tiling['overlap'], conf=conf, iou=iou,
+            img_size=img_size, batch_size=batch_size or DEFAULT_BATCH_SIZE
+        )
+    
+    def _output_path(self, base_path, output_mode):
+        """File path for an annotated output, or None when nothing is rendered
+
+        A base_path that already has the source extension (directory outputs
+        are named annotated_<filename>) keeps it and its format; WebP outputs
+        append .webp so a.jpg and a.png do not collide.
+        """
+        if output_mode == 'detections_only':
+            return None
+        if output_mode == 'annotated_webp':
+            return base_path + '.webp'
+        return base_path if os.path.splitext(base_path)[1] else base_path + '.jpg'
+    
+    def _write_annotated(self, result, output_path, output_mode=DEFAULT_OUTPUT_MODE, output_quality=DEFAULT_OUTPUT_QUALITY):
+        """Render detections on the original image and save it in the requested format"""
+        annotated = result.plot()
+        quality = int(output_quality)
+        
+        if output_mode == 'thumbnails':
+            height, width = annotated.shape[:2]
+            annotated = cv2.resize(annotated, _thumbnail_size(width, height), interpolation=cv2.INTER_AREA)
+        
+        if output_mode == 'annotated_webp':
+            params = [cv2.IMWRITE_WEBP_QUALITY, quality]
+        else:
+            params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        cv2.imwrite(output_path, annotated, params)
+    
+    def _wait_for_write(self, image_path, future):
+        try:
+            future.result()
+        except Exception as e:
+            print(f"Error writing annotated image for {image_path}: {e}")
     
     def _process_webcam(self, model, output_dir, conf, iou, img_size):
         """Process webcam stream (placeholder - actual implementation would be handled by frontend)"""
@@ -184,41 +552,44 @@ class InferenceService:
             'output_dir': output_dir
         }
     
-    def process_webcam_frame(self, model_path, frame_data, conf_threshold=0.25, iou_threshold=0.45, img_size=640):
+    def infer_frame(self, model_path, frame, conf_threshold=0.25, iou_threshold=0.45, img_size=640,
+                    device=None, annotate=True, detection_format='full'):
+        """Run the cached model on one decoded BGR frame
+
+        Returns (detections, annotated_frame); annotated_frame is None when
+        annotate is False.
+        """
+        with self.models.use(model_path, device) as model:
+            results = model(frame, conf=conf_threshold, iou=iou_threshold, imgsz=img_size, verbose=False)
+        
+        # Get annotated frame
+        annotated_frame = results[0].plot() if annotate else None
+        
+        # Extract detections
+        detections = extract_detections(results[0], detection_format)
+        
+        return detections, annotated_frame
+    
+    def process_webcam_frame(self, model_path, frame_data, conf_threshold=0.25, iou_threshold=0.45, img_size=640, device=None,
+                             detection_format='full'):
         """Process a single webcam frame"""
         try:
-            # Load model
-            model = YOLO(model_path)
-            
             # Decode frame (assuming base64 encoded)
             import base64
             frame_bytes = base64.b64decode(frame_data)
             nparr = np.frombuffer(frame_bytes, np.uint8)
             frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
             
-            # Run inference
-            results = model(frame, conf=conf_threshold, iou=iou_threshold, imgsz=img_size)
-            
-            # Get annotated frame
-            annotated_frame = results[0].plot()
+            # Run inference on the cached model
+            detections, annotated_frame = self.infer_frame(
+                model_path, frame, conf_threshold, iou_threshold, img_size, device,
+                detection_format=detection_format
+            )
             
             # Encode back to base64
             _, buffer = cv2.imencode('.jpg', annotated_frame)
             frame_base64 = base64.b64encode(buffer).decode('utf-8')
             
-            # Extract detections
-            detections = []
-            if results[0].boxes is not None and len(results[0].boxes) > 0:
-                boxes = results[0].boxes
-                for box in boxes:
-                    detection = {
-                        'bbox': box.xyxy[0].tolist(),
-                        'confidence': float(box.conf[0]),
-                        'class': int(box.cls[0]),
-                        'class_name': results[0].names[int(box.cls[0])]
-                    }
-                    detections.append(detection)
-            
             return {
                 'success': True,
                 'annotated_frame': frame_base64,
@@ -229,4 +600,4 @@ class InferenceService:
             return {
                 'success': False,
                 'error': str(e)
-            }
\ No newline at end of file
+            }
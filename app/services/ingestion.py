@@ -0,0 +1,171 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from app import db, socketio
+from app.models import Dataset, DatasetFile
+from app.services.blob_store import file_digest
+from app.services.label_validation import validate_label_files
+from app.services.storage import is_image_file, validate_image_file
+
+INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', os.cpu_count() or 4))
+INGEST_CHUNK_SIZE = int(os.getenv('INGEST_CHUNK_SIZE', 1000))
+# Uploads with at most this many files are validated inside the request
+INGEST_SYNC_LIMIT = int(os.getenv('INGEST_SYNC_LIMIT', 200))
+MAX_REJECTIONS = 100  # Rejected files whose reasons are kept on the dataset
+
+
+def validate_upload(item):
+    """(split, path, valid, (digest, size) or None, errors) for one saved upload; invalid files are removed
+
+    item is (split, kind, path, num_classes[, task, kpt_shape]) with kind
+    'image' or 'label'. Valid images are hashed here too, for the blob
+    store. Module level so the process pool can pickle it.
+    """
+    split, kind, path, num_classes, *label_format = item
+    if kind == 'image':
+        if not is_image_file(path):
+            # Same filter as the stats scan, so counts never drift from the directories
+            errors = [{'line': 0, 'error': 'unsupported image format'}]
+        else:
+            errors = [] if validate_image_file(path) else [{'line': 0, 'error': 'not a valid image'}]
+    else:
+        errors = validate_label_files([path], num_classes, *label_format)[path]
+    if errors:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return split, path, False, None, errors
+    return split, path, True, file_digest(path) if kind == 'image' else None, []
+
+
+class DatasetIngestor:
+    """Validate uploaded dataset files and record them as DatasetFile rows
+
+    Small uploads are ingested inline; large ones run in a background thread
+    that validates in a process pool, inserts the rows in chunks with one
+    commit each and reports progress on the Dataset row and as
+    'dataset_ingest' events on /ws/datasets. With a blob_store, valid images
+    are replaced by hardlinks into the content-addressed store.
+    """
+
+    def __init__(self, workers=INGEST_WORKERS, chunk_size=INGEST_CHUNK_SIZE, blob_store=None):
+        self.workers = max(1, workers)
+        self.chunk_size = max(1, chunk_size)
+        self.blob_store = blob_store
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    def is_running(self, dataset_id):
+        with self._lock:
+            thread = self._threads.get(dataset_id)
+            return thread is not None and thread.is_alive()
+
+    def start(self, app, dataset_id, items):
+        """Ingest in the background; items are (split, kind, path, num_classes[, task, kpt_shape])"""
+        thread = threading.Thread(target=self._run, args=(app, dataset_id, items),
+                                  name=f'ingest-{dataset_id}', daemon=True)
+        with self._lock:
+            self._threads[dataset_id] = thread
+        thread.start()
+
+    def _run(self, app, dataset_id, items):
+        try:
+            with app.app_context():
+                context = multiprocessing.get_context('spawn')
+                with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+                    self.ingest(dataset_id, items, pool.map, chunksize=64)
+        except Exception as e:
+            print(f"Error ingesting dataset {dataset_id}: {e}")
+        finally:
+            with self._lock:
+                self._threads.pop(dataset_id, None)
+
+    def ingest(self, dataset_id, items, map_fn=map, **map_kwargs):
+        """Validate and record every item; returns the number of accepted files (requires an app context)"""
+        started = time.time()
+        rows, references, done, accepted = [], [], 0, 0
+        split_stats = defaultdict(lambda: (0, 0))
+        rejections = []
+        try:
+            for split, path, valid, blob, errors in map_fn(validate_upload, items, **map_kwargs):
+                done += 1
+                if errors and len(rejections) < MAX_REJECTIONS:
+                    rejections.append({'file': os.path.basename(path), 'split': split, **errors[0]})
+                if valid:
+                    blob_hash = self._store(path, blob)
+                    rows.append({'dataset_id': dataset_id, 'split': split, 'file_path': path,
+                                 'blob_hash': blob_hash})
+                    if blob_hash:
+                        references.append(blob)
+                    if blob:  # Images only, like the split counts shown for datasets
+                        images, size = split_stats[split]
+                        split_stats[split] = (images + 1, size + blob[1])
+                if len(rows) >= self.chunk_size or done == len(items):
+                    accepted += len(rows)
+                    self._write_chunk(dataset_id, rows, references, split_stats, rejections,
+                                      done, done - accepted, started)
+                    rows, references = [], []
+                    split_stats.clear()
+
+            self._update(dataset_id, 'ready', done, done - accepted, started)
+            print(f"Dataset {dataset_id}: {accepted}/{len(items)} arquivos validos "
+                  f"em {time.time() - started:.1f}s")
+            return accepted
+        except Exception as e:
+            db.session.rollback()
+            self._update(dataset_id, 'failed', done, done - accepted, started, error=str(e))
+            raise
+
+    def _store(self, path, blob):
+        """Digest of the blob path now links to, or None when it keeps its own copy"""
+        if blob is None or self.blob_store is None:
+            return None
+        return blob[0] if self.blob_store.link(path, blob[0]) else None
+
+    def _write_chunk(self, dataset_id, rows, references, split_stats, rejections, done, rejected, started):
+        if references:
+            # Committed before the rows: a crash in between only keeps a blob alive
+            self.blob_store.add_references(references)
+        if rows:
+            db.session.bulk_insert_mappings(DatasetFile, rows)
+
+        dataset = db.session.get(Dataset, dataset_id)
+        if split_stats:
+            dataset.add_split_stats(split_stats)
+        if rejections:
+            dataset.ingest_rejections_json = json.dumps(rejections)
+        self._update(dataset_id, 'processing', done, rejected, started)
+
+    def _update(self, dataset_id, status, done, rejected, started, error=None):
+        Dataset.query.filter_by(id=dataset_id).update({
+            'ingest_status': status,
+            'ingest_done': done,
+            'ingest_rejected': rejected,
+            'ingest_error': error
+        })
+        db.session.commit()
+
+        elapsed = max(time.time() - started, 1e-6)
+        socketio.emit('dataset_ingest', {
+            'dataset_id': dataset_id,
+            'status': status,
+            'done': done,
+            'rejected': rejected,
+            'files_per_sec': round(done / elapsed, 1),
+            'error': error
+        }, namespace='/ws/datasets')
+
+    def recover_interrupted(self):
+        """Mark ingestions left 'processing' by a dead server as failed (requires an app context)"""
+        count = Dataset.query.filter_by(ingest_status='processing').update({
+            'ingest_status': 'failed',
+            'ingest_error': 'Ingestao interrompida pelo reinicio do servidor'
+        })
+        db.session.commit()
+        return count
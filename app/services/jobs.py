@@ -0,0 +1,364 @@
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from app import db
+from app.models import Test
+
+# Keep a worker on the same checkpoint at most this many jobs in a row
+MAX_COALESCED_JOBS = 8
+DEFAULT_JOB_SECONDS = 30.0
+INTERRUPTED_ERROR = 'Inferencia interrompida pelo reinicio do servidor'
+
+
+def estimated_start(position, workers, average, busy=True, now=None):
+    """Start time of the job at a 1-based queue position, in waves of `workers` jobs"""
+    workers = max(1, workers or 1)
+    waves = (position - 1) // workers + (1 if busy else 0)
+    return (now or datetime.utcnow()) + timedelta(seconds=waves * average)
+
+
+def _fail_interrupted(test):
+    test.status = 'failed'
+    test.set_metrics({'error': INTERRUPTED_ERROR})
+    test.queue_position = None
+    test.estimated_start_at = None
+    test.finished_at = datetime.utcnow()
+
+
+def execute_test(inference, test_id, cancel_event=None):
+    """Run one persisted test and store its outcome (requires an app context)"""
+    test = db.session.get(Test, test_id)
+    if not test or test.status == 'canceled':
+        return None
+
+    # Written unconditionally: a concurrent position update may have set the queue fields meanwhile
+    Test.query.filter_by(id=test_id).update({
+        'status': 'running',
+        'started_at': datetime.utcnow(),
+        'queue_position': None,
+        'estimated_start_at': None
+    })
+    db.session.commit()
+    db.session.refresh(test)
+
+    try:
+        params = test.get_config()
+        params.update(output_mode=test.output_mode, output_quality=test.output_quality)
+        result = inference.run_inference(
+            test.model_path, test.source, test.input_path, test.id,
+            cancel_event=cancel_event, **params
+        )
+    except Exception as e:
+        result = {'success': False, 'error': str(e)}
+
+    # Re-read the row: a cancel request may have changed it meanwhile
+    db.session.expire_all()
+    test = db.session.get(Test, test_id)
+    if not test:
+        return result
+
+    if result.get('success'):
+        test.set_metrics(result.get('results', {}))
+        test.status = 'completed'
+    elif result.get('canceled'):
+        test.set_metrics({'error': result.get('error', 'Inference was canceled')})
+        test.status = 'canceled'
+    else:
+        test.set_metrics({'error': result.get('error', 'Unknown error')})
+        test.status = 'failed'
+    test.finished_at = datetime.utcnow()
+    db.session.commit()
+    return result
+
+
+class InferenceJob:
+    def __init__(self, test_id, model_path):
+        self.test_id = test_id
+        self.model_key = os.path.realpath(model_path) if model_path else None
+        self.cancel_event = threading.Event()
+        self.enqueued_at = time.time()
+
+
+class LocalInferenceQueue:
+    """In-process job queue with a fixed-size worker pool
+
+    Workers prefer the next pending job on the checkpoint they just used, so
+    consecutive jobs on one model run back to back while it is resident in
+    the model cache.
+    """
+
+    backend = 'local'
+
+    def __init__(self, inference, workers=None):
+        self.inference = inference
+        self.workers = max(1, int(workers or os.getenv('INFERENCE_WORKERS', 2)))
+        self._pending = deque()
+        self._running = {}
+        self._cond = threading.Condition()
+        self._threads = []
+        self._durations = deque(maxlen=20)
+        self._app = None
+
+    def submit(self, app, test_id, model_path):
+        """Enqueue a persisted test, starting the worker pool on first use"""
+        with self._cond:
+            self._app = app
+            self._pending.append(InferenceJob(test_id, model_path))
+            self._ensure_workers()
+            self._cond.notify()
+        self._publish_positions()
+
+    def cancel(self, test_id):
+        """Cancel a queued or running job; returns False if the job is unknown"""
+        with self._cond:
+            for job in self._pending:
+                if job.test_id == test_id:
+                    self._pending.remove(job)
+                    break
+            else:
+                job = self._running.get(test_id)
+                if job is None:
+                    return False
+                # Running jobs stop at their next batch boundary
+                job.cancel_event.set()
+                return True
+
+        with self._app.app_context():
+            test = db.session.get(Test, test_id)
+            if test:
+                test.status = 'canceled'
+                test.queue_position = None
+                test.estimated_start_at = None
+                test.finished_at = datetime.utcnow()
+                db.session.commit()
+        self._publish_positions()
+        return True
+
+    def recover_interrupted(self):
+        """Startup reconciliation of tests left behind by a dead server (requires an app context)
+
+        Tests that were running are marked failed; queued ones are submitted
+        again in their original order.
+        """
+        for test in Test.query.filter_by(status='running').all():
+            _fail_interrupted(test)
+        db.session.commit()
+
+        queued = Test.query.filter_by(status='queued').order_by(Test.created_at, Test.id).all()
+        if queued:
+            with self._cond:
+                self._app = current_app._get_current_object()
+                self._pending.extend(InferenceJob(test.id, test.model_path) for test in queued)
+                self._ensure_workers()
+                self._cond.notify_all()
+            self._publish_positions()
+        return len(queued)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'backend': self.backend,
+                'workers': self.workers,
+                'pending': len(self._pending),
+                'running': len(self._running),
+                'avg_job_seconds': round(self._average_duration(), 2),
+            }
+
+    def _ensure_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker_loop, name=f'inference-worker-{len(self._threads)}',
+                                      daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _take_job(self, last_model_key, streak):
+        """Pop the next job, coalescing on the previous model when possible"""
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+
+            job = None
+            if last_model_key and streak < MAX_COALESCED_JOBS:
+                job = next((j for j in self._pending if j.model_key == last_model_key), None)
+            if job is None:
+                job = self._pending[0]
+            self._pending.remove(job)
+            self._running[job.test_id] = job
+            return job
+
+    def _worker_loop(self):
+        last_model_key, streak = None, 0
+        while True:
+            job = self._take_job(last_model_key, streak)
+            streak = streak + 1 if job.model_key == last_model_key else 1
+            last_model_key = job.model_key
+            self._publish_positions()
+
+            started = time.time()
+            try:
+                with self._app.app_context():
+                    execute_test(self.inference, job.test_id, job.cancel_event)
+            except Exception as e:
+                print(f"Error in inference job {job.test_id}: {e}")
+            finally:
+                with self._cond:
+                    self._running.pop(job.test_id, None)
+                    self._durations.append(time.time() - started)
+
+    def _average_duration(self):
+        return sum(self._durations) / len(self._durations) if self._durations else DEFAULT_JOB_SECONDS
+
+    def _publish_positions(self):
+        """Store queue position and estimated start time on queued tests"""
+        with self._cond:
+            pending = [job.test_id for job in self._pending]
+            busy = len(self._running) >= self.workers
+            average = self._average_duration()
+            app = self._app
+        if app is None:
+            return
+
+        now = datetime.utcnow()
+        with app.app_context():
+            for position, test_id in enumerate(pending, start=1):
+                # A worker may have started the job since the snapshot
+                Test.query.filter_by(id=test_id, status='queued').update({
+                    'queue_position': position,
+                    'estimated_start_at': estimated_start(position, self.workers, average, busy, now)
+                })
+            db.session.commit()
+
+
+# Redis/RQ backend (INFERENCE_QUEUE_BACKEND=redis): jobs are executed by
+# `rq worker -w rq.worker.SimpleWorker -u $REDIS_URL inference`, started next to the server.
+# SimpleWorker runs jobs in the worker process itself, so its model cache stays warm.
+_worker_app = None
+_worker_inference = None
+
+
+def run_test_job(test_id):
+    """RQ entry point: one app and InferenceService per worker process"""
+    global _worker_app, _worker_inference
+    if _worker_app is None:
+        from app import create_app
+        from app.services.infer import InferenceService
+        _worker_app = create_app()
+        _worker_inference = InferenceService()
+
+    with _worker_app.app_context():
+        return execute_test(_worker_inference, test_id)
+
+
+class RedisInferenceQueue:
+    """Inference queue backed by RQ for multi-process deployments"""
+
+    backend = 'redis'
+
+    def __init__(self, connection, queue_name='inference'):
+        from rq import Queue
+        self.connection = connection
+        self.queue = Queue(queue_name, connection=connection)
+
+    def submit(self, app, test_id, model_path):
+        job = self.queue.enqueue(run_test_job, test_id, job_id=f'test-{test_id}', job_timeout=-1)
+        position = job.get_position()
+        with app.app_context():
+            values = {'queue_position': None, 'estimated_start_at': None}
+            if position is not None:
+                values['queue_position'] = position + 1
+                values['estimated_start_at'] = estimated_start(
+                    position + 1, self._worker_count(), self._average_duration(),
+                    busy=self.queue.started_job_registry.count > 0
+                )
+            Test.query.filter_by(id=test_id).update(values)
+            db.session.commit()
+
+    def _worker_count(self):
+        from rq import Worker
+        return Worker.count(queue=self.queue)
+
+    def _average_duration(self, window=20):
+        """Mean run time of the last completed tests (workers live in other processes)"""
+        rows = Test.query.filter(Test.status == 'completed', Test.started_at.isnot(None),
+                                 Test.finished_at.isnot(None)) \
+            .order_by(Test.finished_at.desc()).limit(window).all()
+        durations = [(row.finished_at - row.started_at).total_seconds() for row in rows]
+        return sum(durations) / len(durations) if durations else DEFAULT_JOB_SECONDS
+
+    def recover_interrupted(self):
+        """Fail queued or running tests whose RQ job no longer exists (requires an app context)"""
+        from rq.job import Job
+        from rq.exceptions import NoSuchJobError
+
+        recovered = 0
+        for test in Test.query.filter(Test.status.in_(('queued', 'running'))).all():
+            try:
+                status = Job.fetch(f'test-{test.id}', connection=self.connection).get_status()
+            except NoSuchJobError:
+                status = None
+            if status in ('queued', 'deferred', 'scheduled', 'started'):
+                continue
+            _fail_interrupted(test)
+            recovered += 1
+        db.session.commit()
+        return recovered
+
+    def cancel(self, test_id):
+        from rq.command import send_stop_job_command
+        from rq.job import Job
+        from rq.exceptions import NoSuchJobError
+
+        try:
+            job = Job.fetch(f'test-{test_id}', connection=self.connection)
+        except NoSuchJobError:
+            return False
+
+        status = job.get_status()
+        if status == 'started':
+            send_stop_job_command(self.connection, job.id)
+        elif status in ('queued', 'deferred', 'scheduled'):
+            job.cancel()
+        else:
+            return False
+
+        test = db.session.get(Test, test_id)
+        if test:
+            test.status = 'canceled'
+            test.queue_position = None
+            test.estimated_start_at = None
+            test.finished_at = datetime.utcnow()
+            db.session.commit()
+        return True
+
+    def stats(self):
+        return {
+            'backend': self.backend,
+            'pending': self.queue.count,
+            'running': self.queue.started_job_registry.count,
+            'workers': None,
+        }
+
+
+def create_inference_queue(inference):
+    """In-process pool by default; RQ only with INFERENCE_QUEUE_BACKEND=redis and a reachable REDIS_URL
+
+    The RQ backend needs `rq worker` processes running, so it is never picked implicitly.
+    """
+    redis_url = os.getenv('REDIS_URL')
+    if os.getenv('INFERENCE_QUEUE_BACKEND', 'local') == 'redis':
+        if not redis_url:
+            print("INFERENCE_QUEUE_BACKEND=redis requires REDIS_URL, using local inference queue")
+            return LocalInferenceQueue(inference)
+        try:
+            from redis import Redis
+            connection = Redis.from_url(redis_url, socket_connect_timeout=1)
+            connection.ping()
+            return RedisInferenceQueue(connection)
+        except Exception as e:
+            print(f"Redis unavailable ({e}), using local inference queue")
+    return LocalInferenceQueue(inference)
@@ -0,0 +1,206 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+TASK_TYPES = ('detect', 'segment', 'pose')
+MAX_ERRORS_PER_FILE = 100
+VALIDATION_BATCH = 512  # Label files parsed together in one NumPy pass
+WHITESPACE = np.frombuffer(b' \t\n\r\x0b\x0c', dtype=np.uint8)  # Same set as bytes.split()
+
+
+def parse_kpt_shape(value):
+    """(keypoints, dims) from '17,3', [17, 3] or None; raises ValueError"""
+    if value in (None, '', []):
+        return None
+    if isinstance(value, str):
+        value = value.replace('[', '').replace(']', '').split(',')
+    try:
+        keypoints, dims = (int(v) for v in value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid kpt_shape: {value}')
+    if keypoints <= 0 or dims not in (2, 3):
+        raise ValueError('kpt_shape must be [keypoints, 2 or 3]')
+    return keypoints, dims
+
+
+def _to_float(tokens):
+    """Values of every token, and a mask of the tokens that are not numbers (None when all are)"""
+    try:
+        return np.array(tokens, dtype=np.float64), None
+    except ValueError:
+        values = np.full(len(tokens), np.nan)
+        bad = np.zeros(len(tokens), dtype=bool)
+        for index, token in enumerate(tokens):
+            try:
+                values[index] = float(token)
+            except ValueError:
+                bad[index] = True
+        return values, bad
+
+
+def _column_count_error(count, task, kpt_shape):
+    if task == 'segment':
+        return f'expected a polygon (class and at least 3 x y pairs), found {count} values'
+    if task == 'pose':
+        keypoints, dims = kpt_shape
+        return f'expected {5 + keypoints * dims} values (box and {keypoints}x{dims} keypoints), found {count}'
+    return f'expected 5 values (class x y w h) or a polygon, found {count}'
+
+
+def validate_label_bytes(raw, num_classes, task='detect', kpt_shape=None):
+    """{line index (0-based): error} for a YOLO label buffer, validated in one vectorised pass
+
+    detect accepts boxes and polygons (ultralytics converts polygons to
+    boxes), segment requires polygons and pose requires a box followed by
+    kpt_shape keypoints (visibility 0, 1 or 2 when they have 3 dims).
+    """
+    if task == 'pose' and kpt_shape is None:
+        raise ValueError('Pose labels require kpt_shape')
+
+    data = np.frombuffer(raw, dtype=np.uint8)
+    if not len(data):
+        return {}
+
+    # Token starts and the line of every byte, without a Python loop over lines
+    space = np.isin(data, WHITESPACE)
+    newline = data == 10
+    starts = ~space
+    starts[1:] &= space[:-1]
+    line_of_byte = np.cumsum(newline) - newline
+    token_line = line_of_byte[starts]
+    if not len(token_line):
+        return {}
+
+    values, unparsable = _to_float(raw.split())
+    tokens_per_line = np.bincount(token_line)
+    lines = np.flatnonzero(tokens_per_line)
+    counts = tokens_per_line[lines]
+    first = np.cumsum(counts) - counts
+    position = np.arange(len(values)) - np.repeat(first, counts)  # Column of each token, 0 = class
+
+    errors = {}
+
+    # Lowest priority first: later checks overwrite the message of the same line
+    coordinate = position >= 1
+    if task == 'pose':
+        keypoints, dims = kpt_shape
+        expected = counts == 5 + keypoints * dims
+        if dims == 3:
+            visibility = (position >= 5) & ((position - 5) % 3 == 2)
+            coordinate &= ~visibility
+            bad_visibility = visibility & ~np.isin(values, (0, 1, 2))
+            _first_per_line(errors, token_line, position, bad_visibility, values,
+                            'visibility {value} at column {column} is not 0, 1 or 2')
+    elif task == 'segment':
+        expected = (counts >= 7) & (counts % 2 == 1)
+    else:
+        expected = (counts == 5) | ((counts >= 7) & (counts % 2 == 1))
+
+    out_of_range = coordinate & ~((values >= 0) & (values <= 1))
+    _first_per_line(errors, token_line, position, out_of_range, values,
+                    'value {value} at column {column} outside [0, 1]')
+
+    classes = values[first]
+    bad_class = ~np.isfinite(classes) | (classes != np.floor(classes)) | (classes < 0) | (classes >= num_classes)
+    for line, value in zip(lines[bad_class], classes[bad_class]):
+        errors[int(line)] = f'class {value:g} is not an index between 0 and {num_classes - 1}'
+
+    for line, count in zip(lines[~expected], counts[~expected]):
+        errors[int(line)] = _column_count_error(int(count), task, kpt_shape)
+
+    if unparsable is not None:
+        tokens = raw.split()
+        for index in np.flatnonzero(unparsable)[::-1]:  # Reversed so the first bad token of a line wins
+            token = tokens[index].decode(errors='replace')
+            errors[int(token_line[index])] = f"'{token}' at column {position[index] + 1} is not a number"
+
+    return errors
+
+
+def _first_per_line(errors, token_line, position, mask, values, message):
+    indices = np.flatnonzero(mask)
+    if not len(indices):
+        return
+    _, first_of_line = np.unique(token_line[indices], return_index=True)
+    for index in indices[first_of_line]:
+        errors[int(token_line[index])] = message.format(value=f'{values[index]:g}', column=position[index] + 1)
+
+
+def validate_label_text(text, num_classes, task='detect', kpt_shape=None):
+    """Per-line errors [{'line': 1-based, 'error': message}] of one label file's content"""
+    raw = text.encode() if isinstance(text, str) else text
+    errors = validate_label_bytes(raw, num_classes, task, kpt_shape)
+    return [{'line': line + 1, 'error': errors[line]} for line in sorted(errors)[:MAX_ERRORS_PER_FILE]]
+
+
+def validate_label_files(paths, num_classes, task='detect', kpt_shape=None):
+    """{path: per-line errors} for several files, parsed together in one pass
+
+    Files are joined with a newline so file k starts at the line after
+    file k-1 ends; unreadable files get a single error on line 0.
+    """
+    contents, results = [], {}
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                contents.append((path, f.read()))
+        except OSError as e:
+            results[path] = [{'line': 0, 'error': f'unreadable: {e}'}]
+
+    errors = validate_label_bytes(b'\n'.join(raw for _, raw in contents), num_classes, task, kpt_shape)
+    boundaries = np.cumsum([raw.count(b'\n') + 1 for _, raw in contents])
+    per_file = {}
+    for line, message in errors.items():
+        index = int(np.searchsorted(boundaries, line, side='right'))
+        offset = int(boundaries[index - 1]) if index else 0
+        per_file.setdefault(index, []).append({'line': line - offset + 1, 'error': message})
+
+    for index, (path, _) in enumerate(contents):
+        file_errors = sorted(per_file.get(index, []), key=lambda error: error['line'])
+        results[path] = file_errors[:MAX_ERRORS_PER_FILE]
+    return results
+
+
+def _validate_batch(args):
+    return validate_label_files(*args)
+
+
+def label_files(directories):
+    """Every .txt file directly inside the given label directories"""
+    paths = []
+    for directory in directories:
+        try:
+            with os.scandir(directory) as entries:
+                paths.extend(entry.path for entry in entries
+                             if entry.name.lower().endswith('.txt') and entry.is_file())
+        except FileNotFoundError:
+            continue
+    return sorted(paths)
+
+
+def validate_label_directories(directories, num_classes, task='detect', kpt_shape=None, workers=None):
+    """Validate every label file of the directories in parallel batches; returns a report"""
+    paths = label_files(directories)
+    batches = [(paths[start:start + VALIDATION_BATCH], num_classes, task, kpt_shape)
+               for start in range(0, len(paths), VALIDATION_BATCH)]
+
+    workers = min(workers or os.cpu_count() or 1, len(batches))
+    results = {}
+    if workers > 1:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            for batch_result in pool.map(_validate_batch, batches):
+                results.update(batch_result)
+    else:
+        for batch in batches:
+            results.update(_validate_batch(batch))
+
+    invalid = {path: errors for path, errors in results.items() if errors}
+    return {
+        'files': len(paths),
+        'valid_files': len(paths) - len(invalid),
+        'invalid_files': len(invalid),
+        'errors': invalid
+    }
@@ -0,0 +1,175 @@
+import os
+import queue
+import threading
+from collections import deque, defaultdict
+from datetime import datetime
+
+from app import db, socketio
+from app.models import TrainingMetric
+from app.services.results_csv import CORE_COLUMNS
+from app.services.profiling import PROFILE_FIELDS
+
+MAX_QUEUE_SIZE = int(os.getenv('METRICS_QUEUE_SIZE', 1000))
+FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 1.0))
+FLUSH_BATCH_SIZE = 200
+LOG_HISTORY = 500
+
+_FLUSH = object()
+
+
+def live_metric(metrics, name, default=0.0):
+    """Core metric from an epoch's metrics dict, read from the box, mask or pose column"""
+    for key in CORE_COLUMNS[name]:
+        if key in metrics:
+            return float(metrics[key])
+    return float(default)
+
+
+def epoch_payload(training, epoch, metrics, profile=None):
+    """TrainingMetric column values and the socket payload for one epoch"""
+    map50 = live_metric(metrics, 'map50', metrics.get('metrics/mAP50', 0))
+    row = {
+        'training_id': training.id,
+        'epoch': epoch,
+        'loss': float(metrics.get('train/box_loss', 0)),
+        'accuracy': map50,
+        'val_loss': float(metrics.get('val/box_loss', 0)),
+        'val_accuracy': float(metrics.get('val/mAP50', 0)),
+        'map50': map50,
+        'map': live_metric(metrics, 'map5095', metrics.get('metrics/mAP50-95', 0)),
+        'timestamp': datetime.utcnow()
+    }
+    event = {
+        'training_id': training.id,
+        'epoch': epoch,
+        'total_epochs': training.epochs,
+        'loss': row['loss'],
+        'accuracy': row['accuracy'],
+        'val_loss': row['val_loss'],
+        'val_accuracy': row['val_accuracy'],
+        'map50': row['map50'],
+        'map5095': row['map'],
+        'precision': float(metrics.get('metrics/precision(B)', row['val_accuracy'])),
+        'recall': float(metrics.get('metrics/recall(B)', row['accuracy']))
+    }
+    if profile:
+        row.update({field: profile.get(field) for field in PROFILE_FIELDS})
+        event['profile'] = profile
+    return row, event
+
+
+class MetricsSink:
+    """Buffer epoch metrics and log lines, write them in batches off the training path
+
+    A background writer drains a bounded queue, inserts the buffered
+    TrainingMetric rows with one commit per batch and then emits a single
+    'training_epoch' event per epoch carrying its metrics and log lines.
+    """
+
+    def __init__(self, max_queue=MAX_QUEUE_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._logs = defaultdict(lambda: deque(maxlen=LOG_HISTORY))
+        self._pending_logs = defaultdict(list)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._app = None
+
+    def start(self, app):
+        """Start the writer thread once; safe to call for every training"""
+        with self._lock:
+            self._app = app
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._writer_loop, name='metrics-writer', daemon=True)
+                self._thread.start()
+
+    def log(self, training_id, message, level='info', immediate=False):
+        """Record a log line; it goes out with the next epoch event unless immediate"""
+        entry = {
+            'training_id': training_id,
+            'timestamp': datetime.now().strftime('%H:%M:%S'),
+            'level': level,
+            'message': message
+        }
+        with self._lock:
+            self._logs[training_id].append(entry)
+            if not immediate:
+                self._pending_logs[training_id].append(entry)
+        if immediate:
+            # Lifecycle messages (start, completion) should not wait for an epoch
+            socketio.emit('training_log', entry, namespace='/ws/trainings')
+        return entry
+
+    def record_epoch(self, training, epoch, metrics, profile=None):
+        """Queue one epoch; blocks (backpressure) only if the writer is far behind"""
+        row, event = epoch_payload(training, epoch, metrics, profile)
+        self.log(training.id, f"Época {epoch}/{training.epochs} - Loss: {row['loss']:.4f} | "
+                              f"mAP50: {row['map50']:.2f}% | Accuracy: {row['accuracy']:.2f}%", level='train')
+        with self._lock:
+            event['logs'] = self._pending_logs.pop(training.id, [])
+        self._queue.put((row, event))
+
+    def flush(self, timeout=30):
+        """Wait until everything queued so far is written and emitted
+
+        Log lines still waiting for an epoch event (e.g. a stopping rule that
+        fired on the last epoch) are emitted as well.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._emit_pending_logs()
+            return False
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        return done.wait(timeout)
+
+    def recent_logs(self, training_id):
+        with self._lock:
+            return list(self._logs.get(training_id, ()))
+
+    def forget(self, training_id):
+        """Drop the in-memory log history of a finished training"""
+        with self._lock:
+            self._logs.pop(training_id, None)
+            self._pending_logs.pop(training_id, None)
+
+    def _writer_loop(self):
+        while True:
+            batch, waiters = [], []
+            item = self._queue.get()
+            while True:
+                if item[0] is _FLUSH:
+                    waiters.append(item[1])
+                    break
+                batch.append(item)
+                if len(batch) >= FLUSH_BATCH_SIZE:
+                    break
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write(batch)
+            if waiters:
+                # After the batch, so pending lines follow the epoch events they came after
+                self._emit_pending_logs()
+            for waiter in waiters:
+                waiter.set()
+
+    def _emit_pending_logs(self):
+        with self._lock:
+            pending, self._pending_logs = self._pending_logs, defaultdict(list)
+        for entries in pending.values():
+            for entry in entries:
+                socketio.emit('training_log', entry, namespace='/ws/trainings')
+
+    def _write(self, batch):
+        try:
+            with self._app.app_context():
+                db.session.bulk_insert_mappings(TrainingMetric, [row for row, _ in batch])
+                db.session.commit()
+        except Exception as e:
+            print(f"Error writing training metrics: {e}")
+
+        for _, event in batch:
+            socketio.emit('training_epoch', event, namespace='/ws/trainings')
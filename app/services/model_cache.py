@@ -0,0 +1,184 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+def _load_yolo(model_path, device=None):
+    """Load a YOLO model and pin it to the requested device"""
+    from ultralytics import YOLO
+
+    model = YOLO(model_path)
+    if device not in (None, '', 'auto'):
+        # Predictor setup reads the device from the model overrides
+        model.overrides['device'] = device
+    return model
+
+
+def _estimate_model_bytes(model, fallback):
+    """Estimate the resident size of a loaded model from its tensors"""
+    try:
+        module = getattr(model, 'model', None)
+        if module is None or not hasattr(module, 'parameters'):
+            return fallback
+        total = sum(p.numel() * p.element_size() for p in module.parameters())
+        total += sum(b.numel() * b.element_size() for b in module.buffers())
+        return total or fallback
+    except Exception:
+        return fallback
+
+
+class SharedModel:
+    """Borrowed cached model whose predictions are serialised, one call at a time
+
+    ultralytics predictors keep per-call state, so two threads must not run
+    the same model at once; locking each call instead of the whole job lets
+    concurrent jobs on one checkpoint interleave their batches.
+    """
+
+    def __init__(self, model, lock):
+        self.wrapped = model
+        self._lock = lock
+
+    def __call__(self, *args, **kwargs):
+        with self._lock:
+            return self.wrapped(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.wrapped, name)
+
+
+class ModelCache:
+    """Process-wide LRU registry of loaded models shared by inference paths"""
+
+    def __init__(self, max_models=None, max_bytes=None, loader=None):
+        if max_models is None:
+            max_models = int(os.getenv('MODEL_CACHE_SIZE', 4))
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv('MODEL_CACHE_MAX_MB', 2048)) * 1024 * 1024)
+
+        self.max_models = max(1, max_models)
+        self.max_bytes = max_bytes
+        self._loader = loader or _load_yolo
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'stale_evictions': 0}
+
+    def _make_key(self, model_path, device):
+        """Build the cache key (resolved path, mtime, size, device)"""
+        resolved = os.path.realpath(model_path)
+        try:
+            stat = os.stat(resolved)
+            mtime, size = stat.st_mtime_ns, stat.st_size
+        except OSError:
+            # Hub model names (e.g. yolov8n.pt) are downloaded by the loader
+            mtime, size = 0, 0
+        return (resolved, mtime, size, str(device or 'auto'))
+
+    def get(self, model_path, device=None):
+        """Return a loaded model, loading and caching it on a miss"""
+        return self._get_entry(model_path, device)['model']
+
+    @contextmanager
+    def use(self, model_path, device=None):
+        """Borrow a cached model; each prediction call holds the model's lock, not the whole block"""
+        entry = self._get_entry(model_path, device)
+        yield SharedModel(entry['model'], entry['lock'])
+
+    def _get_entry(self, model_path, device):
+        key = self._make_key(model_path, device)
+
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry
+
+                pending = self._loading.get(key)
+                if pending is None:
+                    self._evict_stale(key)
+                    self._stats['misses'] += 1
+                    pending = threading.Event()
+                    self._loading[key] = pending
+                    break
+
+            # Another thread is loading the same checkpoint; wait and retry
+            pending.wait()
+
+        try:
+            model = self._loader(model_path, device)
+            entry = {
+                'model': model,
+                'lock': threading.Lock(),
+                'bytes': _estimate_model_bytes(model, key[2]),
+            }
+            with self._lock:
+                self._entries[key] = entry
+                self._enforce_budget(keep=key)
+            return entry
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+            pending.set()
+
+    def _evict_stale(self, key):
+        """Drop entries for the same file/device whose mtime or size changed"""
+        path, _, _, device = key
+        for other in list(self._entries):
+            if other[0] == path and other[3] == device and other != key:
+                del self._entries[other]
+                self._stats['stale_evictions'] += 1
+
+    def _enforce_budget(self, keep):
+        """Evict least recently used entries until count and memory budgets hold"""
+        while len(self._entries) > 1:
+            over_count = len(self._entries) > self.max_models
+            over_bytes = self.max_bytes and self._total_bytes() > self.max_bytes
+            if not (over_count or over_bytes):
+                break
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                break
+            del self._entries[oldest]
+            self._stats['evictions'] += 1
+
+    def _total_bytes(self):
+        return sum(entry['bytes'] for entry in self._entries.values())
+
+    def invalidate(self, model_path=None):
+        """Drop one model (all devices) or the whole cache"""
+        with self._lock:
+            if model_path is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+
+            resolved = os.path.realpath(model_path)
+            keys = [key for key in self._entries if key[0] == resolved]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def stats(self):
+        """Hit/miss/eviction counters and the current resident set"""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0,
+                'size': len(self._entries),
+                'max_models': self.max_models,
+                'bytes': self._total_bytes(),
+                'max_bytes': self.max_bytes,
+                'entries': [
+                    {'path': key[0], 'device': key[3], 'file_size': key[2], 'bytes': entry['bytes']}
+                    for key, entry in reversed(self._entries.items())
+                ],
+            }
+
+
+# Shared by every InferenceService instance in this process
+model_cache = ModelCache()
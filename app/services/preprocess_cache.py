@@ -0,0 +1,232 @@
+import hashlib
+import json
+import math
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.services.storage import is_image_file
+
+CACHE_FORMAT = 1
+SHARD_BYTES = int(os.getenv('PREPROCESS_CACHE_SHARD_MB', 1024)) * 1024 * 1024
+MAX_CACHE_BYTES = int(float(os.getenv('PREPROCESS_CACHE_MAX_GB', 50)) * 1024 ** 3)
+BUILD_WORKERS = int(os.getenv('PREPROCESS_CACHE_WORKERS', os.cpu_count() or 4))
+
+# One row per cached image: shard number, byte offset and the resized/original shapes
+INDEX_DTYPE = np.dtype([('shard', '<u4'), ('offset', '<u8'), ('h', '<u4'), ('w', '<u4'),
+                        ('h0', '<u4'), ('w0', '<u4')])
+
+
+class CacheTooLarge(Exception):
+    pass
+
+
+def cache_enabled():
+    return os.getenv('PREPROCESS_CACHE', 'true').lower() in ('true', '1', 'yes', 'on')
+
+
+def dataset_fingerprint(files, img_size):
+    """Hash of a dataset's (split, file_path) rows, their size/mtime and the cache parameters
+
+    Size and mtime catch a file re-uploaded under the same name.
+    """
+    digest = hashlib.sha256(f'{CACHE_FORMAT}:{img_size}'.encode())
+    for split, file_path in sorted(files):
+        try:
+            stat = os.stat(file_path)
+            size, mtime = stat.st_size, stat.st_mtime_ns
+        except OSError:
+            size, mtime = -1, 0
+        digest.update(f'\n{split}\t{file_path}\t{size}\t{mtime}'.encode())
+    return digest.hexdigest()[:16]
+
+
+def resize_for_training(im, img_size):
+    """Resize the long side to img_size keeping the aspect ratio, exactly as ultralytics' loader does
+
+    Letterboxing is left to the training transforms: labels are relative
+    to the unpadded image and mosaic/letterbox pad per batch.
+    """
+    import cv2
+
+    h0, w0 = im.shape[:2]
+    r = img_size / max(h0, w0)
+    if r != 1:
+        w, h = min(math.ceil(w0 * r), img_size), min(math.ceil(h0 * r), img_size)
+        im = cv2.resize(im, (w, h), interpolation=cv2.INTER_LINEAR)
+    return im, (h0, w0)
+
+
+def _load(path, img_size):
+    import cv2
+
+    im = cv2.imread(path)  # BGR, like ultralytics
+    if im is None:
+        return None
+    return resize_for_training(im, img_size)
+
+
+def _decode(pool, paths, img_size, chunk):
+    """(path, loaded) in order, keeping at most one chunk of decoded images in memory"""
+    for start in range(0, len(paths), chunk):
+        batch = paths[start:start + chunk]
+        yield from zip(batch, pool.map(lambda p: _load(p, img_size), batch))
+
+
+class PreprocessCache:
+    """Per-dataset, per-img_size store of resized uint8 images in memory-mappable shards
+
+    Layout: <cache_root>/<dataset_id>/<img_size>/<fingerprint>/ with
+    shard-NNNNN.bin (raw HxWx3 arrays back to back), index.npy (one
+    INDEX_DTYPE row per image) and manifest.json (paths and parameters).
+    A new fingerprint means the DatasetFile rows or their files changed; it
+    is built in a temporary directory and renamed into place, and older
+    builds are removed.
+    """
+
+    def __init__(self, cache_root):
+        self.cache_root = cache_root
+
+    def dataset_dir(self, dataset_id):
+        return os.path.join(self.cache_root, str(dataset_id))
+
+    def cache_dir(self, dataset_id, img_size, fingerprint):
+        return os.path.join(self.dataset_dir(dataset_id), str(img_size), fingerprint)
+
+    def spec(self, dataset, img_size):
+        """What a training worker needs to build or open the cache (requires an app context)"""
+        rows = [(f.split, f.file_path) for f in dataset.files]
+        fingerprint = dataset_fingerprint(rows, img_size)
+        images = sorted(path for _, path in rows if is_image_file(path))
+        return {
+            'dir': self.cache_dir(dataset.id, img_size, fingerprint),
+            'fingerprint': fingerprint,
+            'img_size': img_size,
+            'images': [os.path.realpath(path) for path in images],
+        }
+
+    def delete(self, dataset_id):
+        shutil.rmtree(self.dataset_dir(dataset_id), ignore_errors=True)
+
+
+def is_built(cache_dir):
+    return os.path.exists(os.path.join(cache_dir, 'manifest.json'))
+
+
+def build_cache(spec, max_bytes=MAX_CACHE_BYTES, workers=BUILD_WORKERS, log=print):
+    """Decode and resize every image of the spec into shards; returns the cache directory
+
+    Safe to call from several processes: each builds in its own temporary
+    directory and the first rename wins.
+    """
+    cache_dir, img_size = spec['dir'], spec['img_size']
+    if is_built(cache_dir):
+        return cache_dir
+
+    parent = os.path.dirname(cache_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = f'{cache_dir}.tmp-{os.getpid()}'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    paths, rows, written = [], [], 0
+    shard, shard_file, shard_size = 0, None, 0
+    try:
+        # cv2 releases the GIL while decoding and resizing, so threads scale
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for path, loaded in _decode(pool, spec['images'], img_size, chunk=max(1, workers) * 8):
+                if loaded is None:
+                    continue  # Unreadable files keep failing in the loader, as without a cache
+                im, (h0, w0) = loaded
+                data = np.ascontiguousarray(im, dtype=np.uint8)
+
+                written += data.nbytes
+                if written > max_bytes:
+                    raise CacheTooLarge(f'Preprocessed images exceed {max_bytes / 1024 ** 3:.1f} GB')
+
+                if shard_file is None or shard_size + data.nbytes > SHARD_BYTES:
+                    if shard_file is not None:
+                        shard_file.close()
+                        shard += 1
+                    shard_file = open(os.path.join(tmp_dir, f'shard-{shard:05d}.bin'), 'wb')
+                    shard_size = 0
+
+                rows.append((shard, shard_size, im.shape[0], im.shape[1], h0, w0))
+                paths.append(path)
+                shard_file.write(data.tobytes())
+                shard_size += data.nbytes
+
+                if len(paths) % 5000 == 0:
+                    log(f'Cache de pre-processamento: {len(paths)}/{len(spec["images"])} imagens')
+        if shard_file is not None:
+            shard_file.close()
+
+        np.save(os.path.join(tmp_dir, 'index.npy'), np.array(rows, dtype=INDEX_DTYPE))
+        with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+            json.dump({'format': CACHE_FORMAT, 'fingerprint': spec['fingerprint'], 'img_size': img_size,
+                       'shards': shard + 1 if rows else 0, 'bytes': written, 'paths': paths}, f)
+
+        try:
+            os.rename(tmp_dir, cache_dir)
+        except OSError:
+            if not is_built(cache_dir):
+                raise
+            shutil.rmtree(tmp_dir, ignore_errors=True)  # Another training finished first
+    except BaseException:
+        if shard_file is not None:
+            shard_file.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    # Builds for older DatasetFile fingerprints are unreachable now
+    for name in os.listdir(parent):
+        if name != spec['fingerprint'] and '.tmp-' not in name:
+            shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
+    return cache_dir
+
+
+class CacheReader:
+    """Read-only access to a built cache; shards are memory-mapped on first use
+
+    Picklable without the mappings so dataloader workers started with
+    'spawn' reopen the shards instead of copying them.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        with open(os.path.join(cache_dir, 'manifest.json')) as f:
+            manifest = json.load(f)
+        self.img_size = manifest['img_size']
+        self.index = np.load(os.path.join(cache_dir, 'index.npy'))
+        self.slots = {path: slot for slot, path in enumerate(manifest['paths'])}
+        self._shards = {}
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_shards'] = {}
+        return state
+
+    def __len__(self):
+        return len(self.index)
+
+    def slot(self, path):
+        """Index row of an image file, or None when it is not cached"""
+        return self.slots.get(os.path.realpath(path))
+
+    def _shard(self, number):
+        shard = self._shards.get(number)
+        if shard is None:
+            shard = np.memmap(os.path.join(self.cache_dir, f'shard-{number:05d}.bin'), dtype=np.uint8, mode='r')
+            self._shards[number] = shard
+        return shard
+
+    def get(self, slot):
+        """(image copy, (h0, w0)) for an index row"""
+        row = self.index[slot]
+        h, w = int(row['h']), int(row['w'])
+        offset = int(row['offset'])
+        data = self._shard(int(row['shard']))[offset:offset + h * w * 3]
+        # Augmentations write into the array, so hand out a copy of the mapped bytes
+        return np.array(data).reshape(h, w, 3), (int(row['h0']), int(row['w0']))
@@ -0,0 +1,145 @@
+import time
+
+MB = 1024 * 1024
+
+# Profile values stored as TrainingMetric columns
+PROFILE_FIELDS = ('epoch_time', 'images_per_sec', 'data_time', 'compute_time', 'peak_rss_mb', 'device_mem_mb')
+
+
+class EpochProfiler:
+    """Per-epoch wall time, throughput, dataloader wait vs compute and memory of a training
+
+    Driven by ultralytics callbacks inside the training worker. The trainer
+    fetches a batch before 'on_train_batch_start', so the gap since the
+    previous 'on_train_batch_end' is time spent waiting on the dataloader
+    and the span between the two is the forward/backward/optimizer step.
+    """
+
+    def __init__(self):
+        try:
+            import psutil
+            self._process = psutil.Process()
+        except ImportError:
+            self._process = None
+        self._reset(time.perf_counter())
+
+    def _reset(self, now):
+        self.epoch_start = now
+        self.last_batch_end = now
+        self.batch_start = None
+        self.train_end = None
+        self.data_time = 0.0
+        self.compute_time = 0.0
+        self.batches = 0
+        self.peak_rss = 0
+
+    def _sample_rss(self, include_children=False):
+        if self._process is None:
+            return
+        try:
+            rss = self._process.memory_info().rss
+            if include_children:
+                # Dataloader workers hold their own copies of decoded images and augmentations
+                rss += sum(child.memory_info().rss for child in self._process.children(recursive=True))
+        except Exception:
+            return
+        self.peak_rss = max(self.peak_rss, rss)
+
+    def on_train_epoch_start(self, trainer):
+        self._reset(time.perf_counter())
+        torch = _cuda_torch(trainer)
+        if torch:
+            torch.cuda.reset_peak_memory_stats(trainer.device)
+
+    def on_train_batch_start(self, trainer):
+        self.batch_start = time.perf_counter()
+        self.data_time += self.batch_start - self.last_batch_end
+
+    def on_train_batch_end(self, trainer):
+        now = time.perf_counter()
+        if self.batch_start is not None:
+            self.compute_time += now - self.batch_start
+        self.last_batch_end = now
+        self.batches += 1
+        self._sample_rss()
+
+    def on_train_epoch_end(self, trainer):
+        self.train_end = time.perf_counter()
+        self._sample_rss(include_children=True)
+
+    def summary(self, trainer):
+        """Profile of the epoch that just finished validation (call from on_fit_epoch_end)"""
+        now = time.perf_counter()
+        train_end = self.train_end or now
+        train_time = train_end - self.epoch_start
+
+        loader = getattr(trainer, 'train_loader', None)
+        images = len(loader.dataset) if loader is not None and hasattr(loader, 'dataset') else None
+
+        return {
+            'epoch_time': now - self.epoch_start,
+            'train_time': train_time,
+            'val_time': now - train_end,
+            'data_time': self.data_time,
+            'compute_time': self.compute_time,
+            'images_per_sec': images / train_time if images and train_time > 0 else None,
+            'peak_rss_mb': self.peak_rss / MB if self.peak_rss else None,
+            'device_mem_mb': _device_memory_mb(trainer),
+        }
+
+
+def _cuda_torch(trainer):
+    device = getattr(trainer, 'device', None)
+    if getattr(device, 'type', None) != 'cuda':
+        return None
+    import torch
+    return torch
+
+
+def _device_memory_mb(trainer):
+    """Peak CUDA memory allocated this epoch, or current MPS allocation; None on CPU"""
+    device = getattr(trainer, 'device', None)
+    device_type = getattr(device, 'type', None)
+    if device_type == 'cuda':
+        import torch
+        return torch.cuda.max_memory_allocated(device) / MB
+    if device_type == 'mps':
+        import torch
+        if hasattr(torch, 'mps') and hasattr(torch.mps, 'current_allocated_memory'):
+            return torch.mps.current_allocated_memory() / MB
+    return None
+
+
+def profile_summary(epochs):
+    """Averages over profiled epochs and whether the run is input- or compute-bound
+
+    epochs: dicts with the PROFILE_FIELDS keys (missing or None for epochs
+    recorded before profiling existed).
+    """
+    profiled = [e for e in epochs if e.get('epoch_time') is not None]
+    if not profiled:
+        return {'epochs_profiled': 0, 'bound': None}
+
+    def mean(field):
+        values = [e[field] for e in profiled if e.get(field) is not None]
+        return sum(values) / len(values) if values else None
+
+    def peak(field):
+        values = [e[field] for e in profiled if e.get(field) is not None]
+        return max(values) if values else None
+
+    data_time = sum(e.get('data_time') or 0.0 for e in profiled)
+    compute_time = sum(e.get('compute_time') or 0.0 for e in profiled)
+    busy = data_time + compute_time
+    return {
+        'epochs_profiled': len(profiled),
+        'avg_epoch_time': mean('epoch_time'),
+        'avg_images_per_sec': mean('images_per_sec'),
+        'data_time': data_time,
+        'compute_time': compute_time,
+        'data_fraction': data_time / busy if busy else None,
+        # More time waiting on batches than computing them: add workers, cache or faster storage
+        'bound': 'input' if data_time > compute_time else 'compute',
+        'peak_rss_mb': peak('peak_rss_mb'),
+        'peak_device_mem_mb': peak('device_mem_mb'),
+    }
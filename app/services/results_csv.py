@@ -0,0 +1,122 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Core metrics and the results.csv columns they come from, in preference order.
+# Box (B) columns come first, then mask (M) and pose (P); classification runs
+# only have train/loss, val/loss and top-1/top-5 accuracy.
+CORE_COLUMNS = {
+    'loss': ('train/box_loss', 'train/loss'),
+    'val_loss': ('val/box_loss', 'val/loss'),
+    'precision': ('metrics/precision(B)', 'metrics/precision(M)', 'metrics/precision(P)'),
+    'recall': ('metrics/recall(B)', 'metrics/recall(M)', 'metrics/recall(P)'),
+    'map50': ('metrics/mAP50(B)', 'metrics/mAP50(M)', 'metrics/mAP50(P)'),
+    'map5095': ('metrics/mAP50-95(B)', 'metrics/mAP50-95(M)', 'metrics/mAP50-95(P)'),
+    'top1': ('metrics/accuracy_top1',),
+}
+
+MAX_CACHED_FILES = 32
+
+
+class ResultsTable:
+    """Parsed results.csv: numpy columns for the core metrics plus every other column per epoch"""
+
+    def __init__(self, frame):
+        self.epochs = frame['epoch'].to_numpy(dtype=np.int64) if 'epoch' in frame else np.arange(1, len(frame) + 1)
+        self.core = {}
+        self.present = set()
+        used = {'epoch'}
+        for name, candidates in CORE_COLUMNS.items():
+            column = next((c for c in candidates if c in frame), None)
+            if column is None:
+                self.core[name] = np.zeros(len(frame), dtype=np.float64)
+            else:
+                self.core[name] = frame[column].to_numpy(dtype=np.float64, na_value=0.0)
+                self.present.add(name)
+                used.add(column)
+
+        # Losses of other heads, mask/pose metrics, top-5, learning rates...
+        self.extra_columns = [c for c in frame.columns if c not in used]
+        extra = frame[self.extra_columns].astype(float)
+        self.extra = extra.astype(object).where(extra.notna(), None).to_dict('records')  # NaN is not valid JSON
+
+    def __len__(self):
+        return len(self.epochs)
+
+    def api_metrics(self):
+        """Per-epoch dicts for the /csv-data endpoint"""
+        core = self.core
+        # Classification runs have no recall; fall back to top-1 accuracy
+        accuracy = core['recall'] if 'recall' in self.present else core['top1']
+        val_loss = core['val_loss'] if 'val_loss' in self.present else core['loss']
+        columns = {
+            'epoch': self.epochs.tolist(),
+            'loss': core['loss'].tolist(),
+            'accuracy': accuracy.tolist(),
+            'val_loss': val_loss.tolist(),
+            'val_accuracy': core['precision'].tolist(),
+            'precision': core['precision'].tolist(),
+            'recall': core['recall'].tolist(),
+            'map50': core['map50'].tolist(),
+            'map5095': core['map5095'].tolist(),
+        }
+        names = list(columns)
+        return [
+            dict(zip(names, values), extra=extra)
+            for values, extra in zip(zip(*columns.values()), self.extra)
+        ]
+
+    def metric_rows(self, training_id):
+        """Column mappings for a bulk insert of TrainingMetric rows"""
+        core = self.core
+        accuracy = (core['map50'] if 'map50' in self.present else core['top1']).tolist()
+        return [
+            {
+                'training_id': training_id,
+                'epoch': epoch,
+                'loss': loss,
+                'accuracy': acc,
+                'val_loss': val_loss,
+                'val_accuracy': acc,
+                'map50': map50,
+                'map': map5095,
+                'extra_json': json.dumps(extra),
+            }
+            for epoch, loss, acc, val_loss, map50, map5095, extra in zip(
+                self.epochs.tolist(), core['loss'].tolist(), accuracy, core['val_loss'].tolist(),
+                core['map50'].tolist(), core['map5095'].tolist(), self.extra
+            )
+        ]
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def load_results(csv_path):
+    """Parse results.csv once per file version (mtime and size), served from memory afterwards"""
+    import pandas as pd
+
+    stat = os.stat(csv_path)
+    key = os.path.realpath(csv_path)
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached and cached[0] == version:
+            _cache.move_to_end(key)
+            return cached[1]
+
+    frame = pd.read_csv(csv_path)
+    frame.columns = frame.columns.str.strip()  # ultralytics pads column names
+    table = ResultsTable(frame)
+
+    with _cache_lock:
+        _cache[key] = (version, table)
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_CACHED_FILES:
+            _cache.popitem(last=False)
+    return table
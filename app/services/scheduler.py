@@ -0,0 +1,200 @@
+import heapq
+import os
+import threading
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Training
+
+# Fallback estimate until some trainings have completed
+DEFAULT_EPOCH_SECONDS = 60.0
+
+
+def detect_device_pools():
+    """Slot pools available on this host: 'cpu' plus 'cuda:N', 'xpu' and 'mps' when present"""
+    pools = ['cpu']
+    try:
+        import torch
+    except ImportError:
+        return pools
+
+    if torch.cuda.is_available():
+        pools.extend(f'cuda:{index}' for index in range(torch.cuda.device_count()))
+    if hasattr(torch, 'xpu') and hasattr(torch.xpu, 'is_available') and torch.xpu.is_available():
+        pools.append('xpu')
+    if hasattr(torch.backends, 'mps') and torch.backends.mps.is_available():
+        pools.append('mps')
+    return pools
+
+
+def pool_device(pool):
+    """Device argument for ultralytics for a slot pool ('cuda:1' -> 1)"""
+    if pool.startswith('cuda:'):
+        return int(pool.split(':', 1)[1])
+    return pool
+
+
+class TrainingScheduler:
+    """Dispatch queued trainings onto a fixed number of per-device slots
+
+    The queue is the trainings table itself (status 'queued'), ordered by
+    priority (higher first) then creation order, so it survives restarts.
+    Each pool ('cpu', 'cuda:0', ...) has its own slot count and a global cap
+    bounds the total number of concurrent trainings.
+    """
+
+    def __init__(self, run_job, pools=None, cpu_slots=None, gpu_slots=None, max_concurrent=None):
+        self.run_job = run_job
+        pools = pools or detect_device_pools()
+        cpu_slots = int(cpu_slots or os.getenv('TRAINING_CPU_SLOTS', 1))
+        gpu_slots = int(gpu_slots or os.getenv('TRAINING_GPU_SLOTS', 1))
+        self.capacity = {pool: cpu_slots if pool == 'cpu' else gpu_slots for pool in pools}
+        if max_concurrent is None:
+            max_concurrent = os.getenv('MAX_CONCURRENT_TRAININGS', sum(self.capacity.values()))
+        # 0 pauses dispatch: trainings stay queued until the cap is raised
+        self.max_concurrent = max(0, int(max_concurrent))
+
+        self.running = {}  # training_id -> {'pool', 'started_at', 'thread', 'sweep_id'}
+        self._lock = threading.RLock()
+        self.app = None
+
+    def candidate_pools(self, requested_device):
+        """Pools a training may run on, in preference order (same fallbacks as resolve_device)"""
+        selected = (requested_device or 'auto').lower()
+        gpus = [pool for pool in self.capacity if pool.startswith('cuda:')]
+
+        if selected == 'cpu':
+            return ['cpu']
+        if selected == 'cuda':
+            return gpus or ['cpu']
+        if selected in ('xpu', 'mps'):
+            return [selected] if selected in self.capacity else ['cpu']
+        if selected == 'auto':
+            for preferred in (gpus, ['xpu'], ['mps']):
+                available = [pool for pool in preferred if pool in self.capacity]
+                if available:
+                    return available
+        return ['cpu']
+
+    def free_slots(self, pool):
+        used = sum(1 for job in self.running.values() if job['pool'] == pool)
+        return self.capacity.get(pool, 0) - used
+
+    def sweep_running(self, sweep_id):
+        return sum(1 for job in self.running.values() if job.get('sweep_id') == sweep_id)
+
+    def submit(self, app, training_id):
+        """Make sure a queued training is considered for dispatch"""
+        self.app = app
+        self.dispatch()
+        return True
+
+    def resume(self, app):
+        """Dispatch trainings left queued by a previous server process"""
+        self.app = app
+        self.dispatch()
+
+    def queued(self):
+        """Queued trainings in dispatch order (requires an app context)"""
+        return Training.query.filter_by(status='queued')\
+            .order_by(Training.priority.desc(), Training.created_at.asc(), Training.id.asc()).all()
+
+    def dispatch(self):
+        """Start queued trainings while compatible slots are free"""
+        if self.app is None:
+            return
+
+        with self._lock, self.app.app_context():
+            for training in self.queued():
+                if len(self.running) >= self.max_concurrent:
+                    break
+                if training.id in self.running:
+                    continue
+                if training.sweep_id and self.sweep_running(training.sweep_id) >= training.sweep.max_concurrent:
+                    continue  # Sweep already uses its share of slots; later trials wait
+
+                # Lower-priority jobs may backfill slots the head of the queue cannot use
+                pool = next((p for p in self.candidate_pools(training.device) if self.free_slots(p) > 0), None)
+                if pool is None:
+                    continue
+
+                thread = threading.Thread(target=self._run, args=(training.id, pool),
+                                          name=f'training-{training.id}', daemon=True)
+                self.running[training.id] = {'pool': pool, 'started_at': datetime.utcnow(), 'thread': thread,
+                                             'sweep_id': training.sweep_id}
+                thread.start()
+
+    def _run(self, training_id, pool):
+        try:
+            self.run_job(training_id, pool_device(pool))
+        except Exception as e:
+            print(f"Error in training job {training_id}: {e}")
+        finally:
+            with self._lock:
+                self.running.pop(training_id, None)
+            self.dispatch()
+
+    def epoch_seconds(self):
+        """Average seconds per epoch over recently completed trainings"""
+        completed = Training.query.filter(
+            Training.status == 'completed',
+            Training.started_at.isnot(None),
+            Training.finished_at.isnot(None)
+        ).order_by(Training.finished_at.desc()).limit(20).all()
+
+        per_epoch = [
+            (t.finished_at - t.started_at).total_seconds() / t.epochs
+            for t in completed if t.epochs
+        ]
+        return sum(per_epoch) / len(per_epoch) if per_epoch else DEFAULT_EPOCH_SECONDS
+
+    def queue_snapshot(self):
+        """Queue position and estimated start of every queued training (requires an app context)
+
+        Simulates dispatch: each slot frees up when its running training is
+        expected to finish, and queued trainings take the earliest free
+        compatible slot in queue order.
+        """
+        now = datetime.utcnow()
+        epoch_seconds = self.epoch_seconds()
+
+        with self._lock:
+            running = {training_id: dict(job) for training_id, job in self.running.items()}
+
+        # Per-pool heaps of the times at which each slot becomes free
+        free_at = {pool: [now] * capacity for pool, capacity in self.capacity.items()}
+        global_free = [now] * self.max_concurrent
+        for training_id, job in running.items():
+            training = db.session.get(Training, training_id)
+            total = timedelta(seconds=epoch_seconds * (training.epochs if training else 1))
+            finish = max(now, job['started_at'] + total)
+            if free_at.get(job['pool']):
+                heapq.heapreplace(free_at[job['pool']], finish)
+            if global_free:
+                heapq.heapreplace(global_free, finish)
+
+        # Dispatched trainings keep status 'queued' until their job marks them running
+        waiting = [training for training in self.queued() if training.id not in running]
+
+        snapshot = {}
+        for position, training in enumerate(waiting, start=1):
+            pools = [p for p in self.candidate_pools(training.device) if free_at.get(p)]
+            if not pools or not global_free:  # No compatible slot, or dispatch is paused
+                snapshot[training.id] = {'queue_position': position, 'estimated_start_at': None}
+                continue
+
+            pool = min(pools, key=lambda p: free_at[p][0])
+            start = max(free_at[pool][0], global_free[0])
+            finish = start + timedelta(seconds=epoch_seconds * (training.epochs or 1))
+            heapq.heapreplace(free_at[pool], finish)
+            heapq.heapreplace(global_free, finish)
+            snapshot[training.id] = {'queue_position': position, 'estimated_start_at': start}
+        return snapshot
+
+    def stats(self):
+        with self._lock:
+            return {
+                'capacity': dict(self.capacity),
+                'max_concurrent': self.max_concurrent,
+                'running': {training_id: job['pool'] for training_id, job in self.running.items()},
+            }
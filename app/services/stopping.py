@@ -0,0 +1,70 @@
+import time
+
+# Rule name -> type; every rule is optional
+RULE_TYPES = {
+    'target_map50': float,  # Stop once map50 reaches this value (0-1)
+    'plateau_window': int,  # Stop when map (mAP50-95) has not improved for this many epochs...
+    'plateau_min_delta': float,  # ...by more than this amount
+    'max_duration_minutes': float,  # Wall-clock budget of the whole run
+    'max_epoch_seconds': float,  # Stop when an epoch takes longer than this
+}
+
+STOP_MESSAGES = {
+    'target_map50': 'mAP50 alvo atingido',
+    'plateau': 'mAP sem melhora na janela configurada',
+    'time_budget': 'tempo maximo de treinamento atingido',
+    'epoch_time_budget': 'tempo por epoca acima do limite',
+    'patience': 'sem melhora dentro da paciencia do ultralytics',
+}
+
+
+def parse_rules(data):
+    """Validated stopping rules from request data; raises ValueError"""
+    rules = {}
+    for name, value in (data or {}).items():
+        if name not in RULE_TYPES:
+            raise ValueError(f"Unknown stopping rule '{name}'")
+        if value is None or value == '':
+            continue
+        try:
+            value = RULE_TYPES[name](value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid value for stopping rule '{name}': {value}")
+        if value <= 0 and name != 'plateau_min_delta':
+            raise ValueError(f"Stopping rule '{name}' must be positive")
+        rules[name] = value
+
+    if 'plateau_min_delta' in rules and 'plateau_window' not in rules:
+        raise ValueError('plateau_min_delta requires plateau_window')
+    return rules
+
+
+class StoppingRules:
+    """Evaluate the platform stopping rules once per epoch inside the training worker
+
+    deadline is an absolute time.time() value (the server derives it from
+    the training's started_at so a resumed run keeps its original budget).
+    """
+
+    def __init__(self, rules, deadline=None):
+        self.rules = rules or {}
+        self.deadline = deadline
+        self.best_map = None
+        self.best_epoch = 0
+
+    def check(self, epoch, map50, map5095, epoch_seconds=None, now=None):
+        """Reason to stop after this epoch, or None"""
+        rules = self.rules
+
+        if self.best_map is None or map5095 > self.best_map + rules.get('plateau_min_delta', 0.0):
+            self.best_map, self.best_epoch = map5095, epoch
+
+        if 'target_map50' in rules and map50 >= rules['target_map50']:
+            return 'target_map50'
+        if 'plateau_window' in rules and epoch - self.best_epoch >= rules['plateau_window']:
+            return 'plateau'
+        if self.deadline is not None and (now or time.time()) >= self.deadline:
+            return 'time_budget'
+        if 'max_epoch_seconds' in rules and epoch_seconds and epoch_seconds > rules['max_epoch_seconds']:
+            return 'epoch_time_budget'
+        return None
@@ -5,6 +5,59 @@ from werkzeug.utils import secure_filename
 from PIL import Image
 import yaml
 
+from app.services.label_validation import validate_label_files
+
+SPLITS = ('train', 'val', 'test')
+# Image formats ultralytics trains on; the single filter for uploads, stats and scans
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+
+
+def is_image_file(path):
+    return path.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def validate_image_file(image_path):
+    """Validate that the file is a valid image (module level so process pools can run it)"""
+    try:
+        with Image.open(image_path) as img:
+            img.verify()
+        return True
+    except Exception:
+        return False
+
+
+def validate_label_file(label_path, num_classes, task='detect', kpt_shape=None):
+    """Validate YOLO format label file (see label_validation for the per-line errors)"""
+    return not validate_label_files([label_path], num_classes, task, kpt_shape)[label_path]
+
+
+def scan_dataset_splits(dataset_path, splits=SPLITS):
+    """Image count and bytes of each split, read from the images/<split> directories"""
+    stats = {}
+    for split in splits:
+        images, size = 0, 0
+        try:
+            with os.scandir(os.path.join(dataset_path, 'images', split)) as entries:
+                for entry in entries:
+                    if is_image_file(entry.name) and entry.is_file():
+                        images += 1
+                        size += entry.stat().st_size
+        except FileNotFoundError:
+            pass
+        stats[split] = {'images': images, 'bytes': size}
+    return stats
+
+
+def split_mtimes(dataset_path):
+    """Modification time (ns) of each images/<split> directory; changes whenever files are added or removed"""
+    mtimes = {}
+    for split in SPLITS:
+        try:
+            mtimes[split] = os.stat(os.path.join(dataset_path, 'images', split)).st_mtime_ns
+        except OSError:
+            mtimes[split] = None
+    return mtimes
+
 
 class StorageService:
     def __init__(self, data_root='data'):
@@ -12,6 +65,8 @@ class StorageService:
         self.datasets_dir = os.path.join(data_root, 'datasets')
         self.models_dir = os.path.join(data_root, 'models')
         self.tests_dir = os.path.join(data_root, 'tests')
+        self.cache_dir = os.path.join(data_root, 'cache')  # Preprocessed training images
+        self.blobs_dir = os.path.join(data_root, 'blobs')  # Content-addressed dataset images
         
         # Create directories if they don't exist
         os.makedirs(self.datasets_dir, exist_ok=True)
@@ -61,43 +116,14 @@ class StorageService:
     
     def validate_image(self, image_path):
         """Validate that the file is a valid image"""
-        try:
-            with Image.open(image_path) as img:
-                img.verify()
-            return True
-        except Exception:
-            return False
+        return validate_image_file(image_path)
     
-    def validate_yolo_label(self, label_path, num_classes):
+    def validate_yolo_label(self, label_path, num_classes, task='detect', kpt_shape=None):
         """Validate YOLO format label file"""
-        try:
-            with open(label_path, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    parts = line.split()
-                    if len(parts) != 5:
-                        return False
-                    
-                    # Validate class index
-                    class_idx = int(parts[0])
-                    if class_idx < 0 or class_idx >= num_classes:
-                        return False
-                    
-                    # Validate coordinates (should be normalized between 0 and 1)
-                    for coord in parts[1:]:
-                        val = float(coord)
-                        if val < 0 or val > 1:
-                            return False
-            
-            return True
-        except Exception:
-            return False
+        return validate_label_file(label_path, num_classes, task, kpt_shape)
     
-    def generate_dataset_yaml(self, dataset_path, dataset_name, classes):
-        """Generate YOLO dataset.yaml file"""
+    def generate_dataset_yaml(self, dataset_path, dataset_name, classes, kpt_shape=None):
+        """Generate YOLO dataset.yaml file (kpt_shape for pose datasets)"""
         # Use absolute path to avoid confusion
         abs_dataset_path = os.path.abspath(dataset_path)
         
@@ -109,6 +135,8 @@ class StorageService:
             'nc': len(classes),
             'names': {i: name for i, name in enumerate(classes)}
         }
+        if kpt_shape:
+            yaml_content['kpt_shape'] = list(kpt_shape)
         
         yaml_file_path = os.path.join(dataset_path, 'dataset.yaml')
         with open(yaml_file_path, 'w') as f:
@@ -117,16 +145,8 @@ class StorageService:
         return yaml_file_path
     
     def get_dataset_files_count(self, dataset_path):
-        """Count files in each split of the dataset"""
-        counts = {'train': 0, 'val': 0, 'test': 0}
-        
-        for split in counts.keys():
-            images_dir = os.path.join(dataset_path, 'images', split)
-            if os.path.exists(images_dir):
-                counts[split] = len([f for f in os.listdir(images_dir) 
-                                   if f.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp'))])
-        
-        return counts
+        """Count files in each split of the dataset (reads the disk; prefer Dataset.file_counts)"""
+        return {split: stats['images'] for split, stats in scan_dataset_splits(dataset_path).items()}
     
     def create_training_directory(self, training_id):
         """Create directory for training outputs"""
@@ -0,0 +1,265 @@
+import itertools
+import json
+import math
+import random
+
+from app import db
+from app.models import Sweep, Training, TrainingMetric
+
+STRATEGIES = ('grid', 'random')
+TERMINAL_STATUSES = ('completed', 'failed', 'canceled', 'pruned')
+
+# Searchable parameters -> type of the Training column they set
+SEARCHABLE_PARAMS = {
+    'learning_rate': float,
+    'batch_size': int,
+    'img_size': int,
+    'epochs': int,
+    'patience': int,
+    'workers': int,
+    'model_version': str,
+    'use_augmentation': bool,
+}
+
+# Fields of the base configuration shared by every trial, with their defaults
+BASE_DEFAULTS = {
+    'model_version': 'm',
+    'task_type': 'detect',
+    'device': 'auto',
+    'epochs': 100,
+    'batch_size': 16,
+    'img_size': 640,
+    'learning_rate': 0.01,
+    'patience': 50,
+    'workers': 8,
+    'save_checkpoints': True,
+    'use_augmentation': True,
+    'priority': 0,
+}
+
+DEFAULT_MAX_TRIALS = 20
+DEFAULT_ETA = 3
+
+
+def _cast(name, value):
+    caster = SEARCHABLE_PARAMS[name]
+    if caster is bool and isinstance(value, str):
+        return value.lower() in ('true', 'on', '1', 'yes')
+    return caster(value)
+
+
+def _choices(name, spec):
+    """Discrete values of a parameter spec (a list or {'values': [...]}), or None for a range"""
+    if isinstance(spec, (list, tuple)):
+        values = list(spec)
+    elif isinstance(spec, dict) and 'values' in spec:
+        values = list(spec['values'])
+    elif isinstance(spec, dict) and 'min' in spec and 'max' in spec:
+        return None
+    else:
+        raise ValueError(f"Invalid search space for '{name}': use a list of values or {{min, max}}")
+
+    if not values:
+        raise ValueError(f"Search space for '{name}' has no values")
+    return [_cast(name, value) for value in values]
+
+
+def _sample_range(name, spec, rng):
+    low, high = float(spec['min']), float(spec['max'])
+    if low > high:
+        raise ValueError(f"Search space for '{name}' has min > max")
+
+    if spec.get('log'):
+        if low <= 0:
+            raise ValueError(f"Log-uniform range for '{name}' must be positive")
+        value = math.exp(rng.uniform(math.log(low), math.log(high)))
+    else:
+        value = rng.uniform(low, high)
+
+    if SEARCHABLE_PARAMS[name] is int or spec.get('type') == 'int':
+        return int(round(value))
+    return _cast(name, value)
+
+
+def expand_search_space(strategy, space, max_trials=None, seed=None):
+    """Parameter dicts of every trial of a sweep
+
+    'grid' is the cartesian product of the value lists (truncated to
+    max_trials); 'random' draws max_trials samples, picking from lists and
+    sampling {min, max[, log]} ranges uniformly.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unsupported sweep strategy '{strategy}'. Use one of: {', '.join(STRATEGIES)}")
+    if not space:
+        raise ValueError('Search space is empty')
+
+    unknown = sorted(set(space) - set(SEARCHABLE_PARAMS))
+    if unknown:
+        raise ValueError(f"Parameters cannot be searched: {', '.join(unknown)}")
+
+    names = sorted(space)
+    choices = {name: _choices(name, space[name]) for name in names}
+    max_trials = int(max_trials) if max_trials else None
+
+    if strategy == 'grid':
+        ranges = [name for name in names if choices[name] is None]
+        if ranges:
+            raise ValueError(f"Grid search needs value lists, got ranges for: {', '.join(ranges)}")
+        trials = [dict(zip(names, values)) for values in itertools.product(*(choices[n] for n in names))]
+        return trials[:max_trials] if max_trials else trials
+
+    rng = random.Random(seed)
+    return [
+        {
+            name: rng.choice(choices[name]) if choices[name] is not None else _sample_range(name, space[name], rng)
+            for name in names
+        }
+        for _ in range(max_trials or DEFAULT_MAX_TRIALS)
+    ]
+
+
+def halving_rungs(min_epochs, eta, max_epochs):
+    """Epochs at which trials are compared: min_epochs, min_epochs*eta, ... below max_epochs"""
+    rungs = []
+    rung = min_epochs
+    while min_epochs and rung < max_epochs:
+        rungs.append(rung)
+        rung *= eta
+    return rungs
+
+
+def halving_keeps(value, peer_values, eta):
+    """Whether a trial survives a rung: it must rank in the top 1/eta of the trials that reached it"""
+    values = sorted(list(peer_values) + [value], reverse=True)
+    if len(values) < eta:
+        return True  # Too few trials at this rung to judge yet
+    threshold = values[max(1, len(values) // eta) - 1]
+    return value >= threshold
+
+
+class SweepService:
+    """Create sweep trials, prune them by successive halving and rank them"""
+
+    def create(self, dataset, name, strategy, search_space, base_config=None, max_trials=None,
+               max_concurrent=2, halving_min_epochs=None, halving_eta=DEFAULT_ETA, seed=None):
+        """Create a Sweep and one queued Training per trial (caller commits)"""
+        base = dict(BASE_DEFAULTS)
+        base.update({key: value for key, value in (base_config or {}).items() if key in BASE_DEFAULTS})
+        trials = expand_search_space(strategy, search_space, max_trials, seed)
+
+        halving_eta = int(halving_eta or DEFAULT_ETA)
+        if halving_eta < 2:
+            raise ValueError('halving_eta must be at least 2')
+
+        sweep = Sweep(
+            name=name,
+            dataset_id=dataset.id,
+            strategy=strategy,
+            max_trials=len(trials),
+            max_concurrent=max(1, int(max_concurrent or 1)),
+            halving_min_epochs=int(halving_min_epochs) if halving_min_epochs else None,
+            halving_eta=halving_eta,
+            status='running'
+        )
+        sweep.search_space_json = json.dumps(search_space)
+        sweep.base_config_json = json.dumps(base)
+        db.session.add(sweep)
+        db.session.flush()
+
+        for params in trials:
+            db.session.add(self._trial(sweep, base, params))
+        return sweep
+
+    def _trial(self, sweep, base, params):
+        values = dict(base)
+        values.update(params)
+        task_suffix = '' if values['task_type'] == 'detect' else f"-{values['task_type']}"
+
+        training = Training(
+            dataset_id=sweep.dataset_id,
+            sweep_id=sweep.id,
+            model_version=values['model_version'],
+            task_type=values['task_type'],
+            device=values['device'],
+            epochs=int(values['epochs']),
+            batch_size=int(values['batch_size']),
+            img_size=int(values['img_size']),
+            learning_rate=float(values['learning_rate']),
+            patience=int(values['patience']),
+            workers=int(values['workers']),
+            save_checkpoints=bool(values['save_checkpoints']),
+            use_augmentation=bool(values['use_augmentation']),
+            priority=int(values['priority']),
+            status='queued'
+        )
+        training.set_config({
+            'epochs': training.epochs,
+            'batch_size': training.batch_size,
+            'img_size': training.img_size,
+            'lr': training.learning_rate,
+            'patience': training.patience,
+            'workers': training.workers,
+            'save_checkpoints': training.save_checkpoints,
+            'use_augmentation': training.use_augmentation,
+            'model_version': training.model_version,
+            'model_name': f"yolov8{training.model_version}{task_suffix}.pt",
+            'task_type': training.task_type,
+            'device': training.device,
+            'sweep_params': params
+        })
+        return training
+
+    def is_rung(self, training, epoch):
+        """Whether a sweep trial is compared against its peers at this epoch"""
+        sweep = training.sweep
+        if not sweep or not sweep.halving_min_epochs:
+            return False
+        return epoch in halving_rungs(sweep.halving_min_epochs, sweep.halving_eta, training.epochs)
+
+    def should_stop(self, training, epoch, map50):
+        """Successive halving decision for a trial that just finished an epoch (requires an app context)
+
+        At each rung epoch the trial's map50 is ranked against every other
+        trial of the sweep that reached the same epoch; trials outside the
+        top 1/eta are stopped.
+        """
+        if not self.is_rung(training, epoch):
+            return False
+
+        sweep = training.sweep
+        peers = db.session.query(TrainingMetric.map50).join(Training).filter(
+            Training.sweep_id == sweep.id,
+            Training.id != training.id,
+            TrainingMetric.epoch == epoch
+        ).all()
+        return not halving_keeps(map50, [value or 0.0 for value, in peers], sweep.halving_eta)
+
+    def refresh_status(self, sweep):
+        """Mark a running sweep completed once every trial has finished (caller commits)"""
+        if sweep.status == 'running' and sweep.trainings and \
+                all(t.status in TERMINAL_STATUSES for t in sweep.trainings):
+            sweep.status = 'completed'
+        return sweep.status
+
+    def leaderboard(self, sweep):
+        """Trials ranked by best map50, with their parameters and progress"""
+        best = dict(db.session.query(TrainingMetric.training_id, db.func.max(TrainingMetric.map50)).join(Training)
+                    .filter(Training.sweep_id == sweep.id).group_by(TrainingMetric.training_id).all())
+        reached = dict(db.session.query(TrainingMetric.training_id, db.func.max(TrainingMetric.epoch)).join(Training)
+                       .filter(Training.sweep_id == sweep.id).group_by(TrainingMetric.training_id).all())
+
+        entries = [
+            {
+                'training_id': training.id,
+                'status': training.status,
+                'params': training.get_config().get('sweep_params', {}),
+                'best_map50': best.get(training.id),
+                'epochs_completed': reached.get(training.id, 0),
+                'epochs': training.epochs,
+            }
+            for training in sweep.trainings
+        ]
+        entries.sort(key=lambda e: (e['best_map50'] is None, -(e['best_map50'] or 0.0), e['training_id']))
+        for rank, entry in enumerate(entries, start=1):
+            entry['rank'] = rank
+        return entries
@@ -0,0 +1,108 @@
+import time
+
+import numpy as np
+import torch
+
+DEFAULT_TILE_OVERLAP = 0.2
+
+
+def tile_origins(length, tile_size, overlap):
+    """Start offsets of tiles covering [0, length) with the given fractional overlap
+
+    The last tile is shifted back to end at the border, so every tile has
+    the full size (one tile when the image is smaller than tile_size).
+    """
+    if length <= tile_size:
+        return [0]
+    step = max(1, int(tile_size * (1 - overlap)))
+    origins = list(range(0, length - tile_size, step))
+    origins.append(length - tile_size)
+    return origins
+
+
+def tile_views(image, tile_size, overlap=DEFAULT_TILE_OVERLAP):
+    """Split an HxWxC image into (x0, y0, view) tiles
+
+    Tiles are numpy views into the decoded buffer; no pixel data is copied.
+    """
+    height, width = image.shape[:2]
+    return [
+        (x0, y0, image[y0:y0 + tile_size, x0:x0 + tile_size])
+        for y0 in tile_origins(height, tile_size, overlap)
+        for x0 in tile_origins(width, tile_size, overlap)
+    ]
+
+
+def nms(xyxy, conf, cls, iou_threshold):
+    """Class-aware greedy NMS; returns the indices of the kept boxes"""
+    if len(conf) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # Offset boxes per class so boxes of different classes never overlap
+    offset = cls.astype(np.float32)[:, None] * (xyxy.max() + 1)
+    boxes = xyxy + offset
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+    order = np.argsort(-conf)
+    keep = []
+    while order.size:
+        best, rest = order[0], order[1:]
+        keep.append(best)
+        tl = np.maximum(boxes[best, :2], boxes[rest, :2])
+        br = np.minimum(boxes[best, 2:], boxes[rest, 2:])
+        inter = np.prod(np.clip(br - tl, 0, None), axis=1)
+        iou = inter / np.maximum(areas[best] + areas[rest] - inter, 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def predict_tiled(model, image, tile_size, overlap=DEFAULT_TILE_OVERLAP, conf=0.25, iou=0.45,
+                  img_size=None, batch_size=8):
+    """Run the model over overlapping tiles and merge boxes into one Results
+
+    Returns (result, stats) where result is an ultralytics Results for the
+    full image (so it can be plotted like any other prediction) and stats
+    holds the tile count and timings in milliseconds.
+    """
+    from ultralytics.engine.results import Results
+
+    tiles = tile_views(image, tile_size, overlap)
+    img_size = img_size or tile_size
+    batch_size = max(1, int(batch_size))
+
+    started = time.perf_counter()
+    xyxy, scores, classes = [], [], []
+    names = None
+    for start in range(0, len(tiles), batch_size):
+        batch = tiles[start:start + batch_size]
+        results = model([view for _, _, view in batch], conf=conf, iou=iou, imgsz=img_size, verbose=False)
+        for (x0, y0, _), result in zip(batch, results):
+            names = result.names
+            boxes = result.boxes
+            if boxes is None or len(boxes) == 0:
+                continue
+            xyxy.append(boxes.xyxy.cpu().numpy() + np.array([x0, y0, x0, y0], dtype=np.float32))
+            scores.append(boxes.conf.cpu().numpy())
+            classes.append(boxes.cls.cpu().numpy())
+    inference_ms = (time.perf_counter() - started) * 1000
+
+    raw_detections = sum(len(s) for s in scores)
+    started = time.perf_counter()
+    if xyxy:
+        xyxy, scores, classes = np.concatenate(xyxy), np.concatenate(scores), np.concatenate(classes)
+        keep = nms(xyxy, scores, classes, iou)
+        data = np.column_stack([xyxy[keep], scores[keep], classes[keep]]).astype(np.float32)
+    else:
+        data = np.empty((0, 6), dtype=np.float32)
+    merge_ms = (time.perf_counter() - started) * 1000
+
+    result = Results(image, path=None, names=names or model.names, boxes=torch.from_numpy(data))
+    stats = {
+        'tiles': len(tiles),
+        'tile_size': tile_size,
+        'tile_overlap': overlap,
+        'raw_detections': raw_detections,
+        'inference_ms': round(inference_ms, 2),
+        'merge_ms': round(merge_ms, 2),
+    }
+    return result, stats
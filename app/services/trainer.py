@@ -1,53 +1,132 @@
-from threading import Thread
+import multiprocessing
+import queue
+import re
+import threading
 import os
 import time
 from datetime import datetime
+from flask import current_app
 from app.models import Training, Dataset, TrainingMetric, Checkpoint
 from app import db, socketio
+from app.services.scheduler import TrainingScheduler
+from app.services.training_worker import run_training_process
+from app.services.metrics_sink import MetricsSink, live_metric
+from app.services.sweeps import SweepService
+from app.services.results_csv import load_results
+from app.services.profiling import PROFILE_FIELDS
+from app.services.preprocess_cache import PreprocessCache, cache_enabled
+from app.services.stopping import STOP_MESSAGES
+
+PERIODIC_CHECKPOINT = re.compile(r'^epoch(\d+)\.pt$')
+RESUMABLE_STATUSES = ('interrupted', 'failed', 'canceled')
+
+# Seconds a canceled worker gets to stop at an epoch boundary before it is killed
+CANCEL_GRACE_SECONDS = float(os.getenv('TRAINING_CANCEL_GRACE', 30))
+PROCESS_JOIN_TIMEOUT = 10
+
+
+def resolve_device(selected_device):
+    """Configure device based on selection with graceful fallback across vendors"""
+    import torch
+    
+    selected = (selected_device or 'auto').lower()
+
+    has_cuda = bool(torch.cuda.is_available())
+    has_mps = bool(
+        hasattr(torch.backends, 'mps')
+        and torch.backends.mps.is_available()
+    )
+    has_xpu = bool(
+        hasattr(torch, 'xpu')
+        and hasattr(torch.xpu, 'is_available')
+        and torch.xpu.is_available()
+    )
+
+    if selected == 'auto':
+        if has_cuda:
+            return 0
+        if has_xpu:
+            return 'xpu'
+        if has_mps:
+            return 'mps'
+        return 'cpu'
+
+    if selected == 'cuda':
+        # NVIDIA CUDA and AMD ROCm commonly expose cuda backend in PyTorch.
+        return 0 if has_cuda else 'cpu'
+
+    if selected == 'xpu':
+        return 'xpu' if has_xpu else 'cpu'
+
+    if selected == 'mps':
+        return 'mps' if has_mps else 'cpu'
+
+    if selected == 'cpu':
+        return 'cpu'
+
+    # Unknown value: keep resilient behavior.
+    return 'cpu'
 
 
 class TrainingService:
     def __init__(self, storage_service):
         self.storage = storage_service
         self.active_trainings = {}
+        self.scheduler = TrainingScheduler(self._run_training)
+        self.metrics = MetricsSink()
+        self.sweeps = SweepService()
+        self.preprocess_cache = PreprocessCache(storage_service.cache_dir)
     
     def start_training(self, training_id):
-        """Start a new training process in a background thread"""
-        if training_id in self.active_trainings:
+        """Queue a training; the scheduler starts it when a device slot is free"""
+        if training_id in self.active_trainings or training_id in self.scheduler.running:
             return False  # Training already running
         
-        # Mark as active
-        self.active_trainings[training_id] = {
-            'thread': None,
-            'canceled': False
-        }
-        
-        # Start training thread
-        thread = Thread(target=self._run_training, args=(training_id,))
-        self.active_trainings[training_id]['thread'] = thread
-        thread.start()
-        
-        return True
+        return self.scheduler.submit(current_app._get_current_object(), training_id)
     
-    def _run_training(self, training_id):
-        """Run the actual training process"""
-        from app import create_app
-        
-        # Create application context for this thread
-        app = create_app()
-        with app.app_context():
+    def _run_training(self, training_id, device=None):
+        """Run one training in a worker process on the device of the assigned slot
+
+        This thread only waits on the worker's progress messages, writes them
+        to the database and emits the Socket.IO events; the training itself
+        never shares the server's interpreter.
+        """
+        self.metrics.start(self.scheduler.app)
+        with self.scheduler.app.app_context():
             training = None
-            torch = None
-            original_torch_load = None
             try:
                 # Get training record
                 training = Training.query.get(training_id)
-                if not training:
-                    return
+                if not training or training.status != 'queued':
+                    return  # Canceled while waiting for a slot
+                
+                # Mark as active; the control event exists up front so a cancel before the spawn is not lost
+                context = multiprocessing.get_context('spawn')
+                self.active_trainings[training_id] = {
+                    'thread': threading.current_thread(),
+                    'process': None,
+                    'control': context.Event(),
+                    'canceled': False,
+                    'pruned': False,
+                    'stopped_epoch': None
+                }
+                
+                # Create training directory
+                training_dir = os.path.join(self.storage.models_dir, str(training.id))
+                os.makedirs(training_dir, exist_ok=True)
+                
+                # A resume request continues from run/weights/last.pt with the checkpoint's own arguments
+                train_config = training.get_config() or {}
+                resume_from = self.last_checkpoint(training) if train_config.pop('resume', False) else None
+                training.set_config(train_config)
                 
                 # Update status to running
                 training.status = 'running'
-                training.started_at = datetime.utcnow()
+                training.model_dir = training_dir  # lets startup reconciliation find last.pt
+                if not resume_from or not training.started_at:
+                    training.started_at = datetime.utcnow()
+                training.finished_at = None
+                training.stop_reason = None
                 db.session.commit()
                 
                 # Get dataset and validate
@@ -55,103 +134,25 @@ class TrainingService:
                 if not dataset:
                     raise ValueError("Dataset not found")
                 
-                # Create training directory
-                import os
-                training_dir = os.path.join(self.storage.models_dir, str(training.id))
-                os.makedirs(training_dir, exist_ok=True)
-                
                 # Setup training configuration
                 dataset_path = os.path.join(dataset.path, 'dataset.yaml')
                 if not os.path.exists(dataset_path):
                     raise FileNotFoundError(f"Dataset YAML not found: {dataset_path}")
 
                 # Resolve model name from persisted config first (MVP-friendly, no DB migration needed).
-                train_config = training.get_config() or {}
                 if train_config.get('model_name'):
                     model_name = train_config['model_name']
                 else:
                     task_suffix = '' if training.task_type == 'detect' else f'-{training.task_type}'
                     model_name = f"yolov8{training.model_version}{task_suffix}.pt"
                 
-                # Temporary workaround for PyTorch 2.6 weights_only issue
-                import torch
-                
-                # Monkey patch torch.load to use weights_only=False during entire YOLO training process
-                # This is needed for both model initialization and final model optimization
-                original_torch_load = torch.load
-                def patched_torch_load(*args, **kwargs):
-                    kwargs.setdefault('weights_only', False)
-                    return original_torch_load(*args, **kwargs)
-                
-                torch.load = patched_torch_load
-                
-                # Initialize YOLO model
-                from ultralytics import YOLO
-                model = YOLO(model_name)
-                
-                # Emit training started event
-                socketio.emit('training_status', {
-                    'training_id': training_id,
-                    'status': 'running',
-                    'message': f'Training started with YOLOv8{training.model_version} ({training.task_type})'
-                }, namespace='/ws/trainings')
-                
                 # Emit training log
-                socketio.emit('training_log', {
-                    'training_id': training_id,
-                    'timestamp': datetime.now().strftime('%H:%M:%S'),
-                    'level': 'info',
-                    'message': f'Iniciando treinamento do modelo YOLOv8{training.model_version}...'
-                }, namespace='/ws/trainings')
+                self.metrics.log(training_id, f'Iniciando treinamento do modelo YOLOv8{training.model_version}...',
+                                 immediate=True)
+                self.metrics.log(training_id, f'Dataset: {training.dataset.name} | Épocas: {training.epochs} | '
+                                              f'Tamanho da imagem: {training.img_size}px', immediate=True)
                 
-                socketio.emit('training_log', {
-                    'training_id': training_id,
-                    'timestamp': datetime.now().strftime('%H:%M:%S'),
-                    'level': 'info',
-                    'message': f'Dataset: {training.dataset.name} | Épocas: {training.epochs} | Tamanho da imagem: {training.img_size}px'
-                }, namespace='/ws/trainings')
-                
-                # Configure device based on selection with graceful fallback across vendors.
-                def resolve_device(selected_device):
-                    selected = (selected_device or 'auto').lower()
-
-                    has_cuda = bool(torch.cuda.is_available())
-                    has_mps = bool(
-                        hasattr(torch.backends, 'mps')
-                        and torch.backends.mps.is_available()
-                    )
-                    has_xpu = bool(
-                        hasattr(torch, 'xpu')
-                        and hasattr(torch.xpu, 'is_available')
-                        and torch.xpu.is_available()
-                    )
-
-                    if selected == 'auto':
-                        if has_cuda:
-                            return 0
-                        if has_xpu:
-                            return 'xpu'
-                        if has_mps:
-                            return 'mps'
-                        return 'cpu'
-
-                    if selected == 'cuda':
-                        # NVIDIA CUDA and AMD ROCm commonly expose cuda backend in PyTorch.
-                        return 0 if has_cuda else 'cpu'
-
-                    if selected == 'xpu':
-                        return 'xpu' if has_xpu else 'cpu'
-
-                    if selected == 'mps':
-                        return 'mps' if has_mps else 'cpu'
-
-                    if selected == 'cpu':
-                        return 'cpu'
-
-                    # Unknown value: keep resilient behavior.
-                    return 'cpu'
-
-                device_config = resolve_device(training.device)
+                device_config = device if device is not None else resolve_device(training.device)
                 
                 # Training arguments using specific fields
                 train_args = {
@@ -171,66 +172,51 @@ class TrainingService:
                 
                 train_args['device'] = device_config
                 
-                # Custom callback for tracking progress
-                def on_train_epoch_end(trainer):
-                    if training_id in self.active_trainings and self.active_trainings[training_id].get('canceled', False):
-                        raise KeyboardInterrupt("Training was canceled")
-                    
-                    # Get current epoch metrics
-                    if hasattr(trainer, 'metrics') and trainer.metrics:
-                        epoch = trainer.epoch + 1
-                        
-                        # Create metric record
-                        metric = TrainingMetric(
-                            training_id=training_id,
-                            epoch=epoch,
-                            loss=float(trainer.metrics.get('train/box_loss', 0)),
-                            accuracy=float(trainer.metrics.get('metrics/mAP50', 0)),
-                            val_loss=float(trainer.metrics.get('val/box_loss', 0)),
-                            val_accuracy=float(trainer.metrics.get('val/mAP50', 0)),
-                            map50=float(trainer.metrics.get('metrics/mAP50', 0)),
-                            map=float(trainer.metrics.get('metrics/mAP50-95', 0))
-                        )
-                        db.session.add(metric)
-                        db.session.commit()
-                        
-                        # Emit progress update
-                        socketio.emit('training_progress', {
-                            'training_id': training_id,
-                            'epoch': epoch,
-                            'total_epochs': training.epochs,
-                            'loss': metric.loss,
-                            'accuracy': metric.accuracy,
-                            'val_loss': metric.val_loss,
-                            'val_accuracy': metric.val_accuracy,
-                            'map50': metric.map50,
-                            'map5095': metric.map
-                        }, namespace='/ws/trainings')
-
-                        # Backward compatibility for dashboards that still listen to training_update
-                        socketio.emit('training_update', {
-                            'training_id': training_id,
-                            'epoch': epoch,
-                            'total_epochs': training.epochs,
-                            'loss': metric.loss,
-                            'map50': metric.map50,
-                            'precision': metric.val_accuracy,
-                            'recall': metric.accuracy
-                        }, namespace='/ws/trainings')
-                        
-                        # Emit detailed training log
-                        socketio.emit('training_log', {
-                            'training_id': training_id,
-                            'timestamp': datetime.now().strftime('%H:%M:%S'),
-                            'level': 'train',
-                            'message': f'Época {epoch}/{training.epochs} - Loss: {metric.loss:.4f} | mAP50: {metric.map50:.2f}% | Accuracy: {metric.accuracy:.2f}%'
-                        }, namespace='/ws/trainings')
+                if resume_from:
+                    # ultralytics restores epochs, optimizer and every other argument from last.pt
+                    model_name = resume_from
+                    train_args = {'resume': True, 'device': device_config}  # keep the scheduler's slot
+                    self._import_results_csv(training_id, training_dir)
+                    self.metrics.log(training_id, f'Retomando treinamento a partir de {resume_from}', immediate=True)
                 
-                # Add callback to model
-                model.add_callback('on_train_epoch_end', on_train_epoch_end)
+                # Resized images shared by every training on this dataset and img_size
+                preprocess_cache = None
+                if cache_enabled() and training.task_type != 'classify':
+                    preprocess_cache = self.preprocess_cache.spec(dataset, training.img_size)
+                
+                # Start the worker process (unless the training was canceled while it was being prepared)
+                control = self.active_trainings[training_id]['control']
+                if control.is_set():
+                    raise KeyboardInterrupt("Training was canceled")
+                events = context.Queue()
+                process = context.Process(
+                    target=run_training_process,
+                    args=({'training_id': training_id, 'model_name': model_name, 'train_args': train_args,
+                           'auto_tune': bool(training.auto_tune) and not resume_from,
+                           'preprocess_cache': preprocess_cache,
+                           'stop_rules': training.get_stop_rules(),
+                           'deadline': self._deadline(training)},
+                          events, control),
+                    name=f'training-{training_id}'
+                )
+                process.start()
+                self.active_trainings[training_id]['process'] = process
+                if control.is_set():
+                    # Canceled between the check above and the spawn: cancel_training had no process to stop
+                    threading.Thread(target=self._stop_process, args=(process,), daemon=True).start()
                 
-                # Start training
-                results = model.train(**train_args)
+                kind, payload = self._follow_training_process(training, process, events)
+                
+                # Buffered epochs must be stored before results.csv replaces them
+                self.metrics.flush()
+                
+                active = self.active_trainings[training_id]
+                if kind == 'canceled' or active['canceled'] or active['pruned']:
+                    raise KeyboardInterrupt("Training was canceled")
+                if kind != 'completed':
+                    if payload.get('traceback'):
+                        print(f"DEBUG: Traceback: {payload['traceback']}")
+                    raise RuntimeError(payload.get('error', 'Training process failed'))
                 
                 # Training completed successfully
                 training.status = 'completed'
@@ -239,20 +225,17 @@ class TrainingService:
                 training.model_dir = training_dir
                 
                 # Emit completion log
-                socketio.emit('training_log', {
-                    'training_id': training_id,
-                    'timestamp': datetime.now().strftime('%H:%M:%S'),
-                    'level': 'success',
-                    'message': f'Treinamento concluído com sucesso! Modelo salvo em data/models/{training_id}/run/weights/'
-                }, namespace='/ws/trainings')
+                self.metrics.log(training_id, f'Treinamento concluído com sucesso! Modelo salvo em '
+                                              f'data/models/{training_id}/run/weights/', level='success', immediate=True)
                 
                 # Import metrics from results.csv
                 self._import_results_csv(training_id, training_dir)
+                self._register_checkpoints(training)
                 
-                # Save final checkpoint
+                # Save final checkpoint (best.pt of the epochs actually run when a stopping rule ended it)
                 checkpoint = Checkpoint(
                     training_id=training_id,
-                    epoch=training.epochs,
+                    epoch=active['stopped_epoch'] or training.epochs,
                     file_path=training.model_path,
                     is_final=True
                 )
@@ -267,16 +250,18 @@ class TrainingService:
                 }, namespace='/ws/trainings')
                 
             except KeyboardInterrupt:
-                # Handle cancellation
+                # Handle cancellation (or early termination of a sweep trial)
+                pruned = self.active_trainings.get(training_id, {}).get('pruned', False)
+                status = 'pruned' if pruned else 'canceled'
                 if training:
-                    training.status = 'canceled'
+                    training.status = status
                     training.finished_at = datetime.utcnow()
                     db.session.commit()
                 
                 socketio.emit('training_status', {
                     'training_id': training_id,
-                    'status': 'canceled',
-                    'message': 'Training was canceled'
+                    'status': status,
+                    'message': 'Training was stopped by successive halving' if pruned else 'Training was canceled'
                 }, namespace='/ws/trainings')
                 
             except Exception as e:
@@ -298,18 +283,196 @@ class TrainingService:
                 }, namespace='/ws/trainings')
                 
             finally:
-                # Restore original torch.load after training completes
-                if torch is not None and original_torch_load is not None:
-                    torch.load = original_torch_load
+                # Nothing buffered for this training may be lost on cancel or failure
+                self.metrics.flush()
+                self.metrics.forget(training_id)
                 
                 # Clean up
-                if training_id in self.active_trainings:
-                    del self.active_trainings[training_id]
+                active = self.active_trainings.pop(training_id, None)
+                if active and active.get('process') is not None:
+                    self._stop_process(active['process'], grace=0)
+    
+    def _follow_training_process(self, training, process, events):
+        """Relay worker messages until it reports an outcome or exits; returns (kind, payload)"""
+        while True:
+            try:
+                kind, payload = events.get(timeout=1.0)
+            except queue.Empty:
+                if process.is_alive():
+                    continue
+                # Exited (or was killed) without reporting an outcome
+                return 'failed', {'error': f'Training process exited with code {process.exitcode}'}
+            
+            if kind == 'started':
+                socketio.emit('training_status', {
+                    'training_id': training.id,
+                    'status': 'running',
+                    'message': f'Training started with YOLOv8{training.model_version} ({training.task_type})'
+                }, namespace='/ws/trainings')
+            elif kind == 'metric':
+                self.metrics.record_epoch(training, payload['epoch'], payload['metrics'], payload.get('profile'))
+                if training.sweep_id:
+                    self._apply_halving(training, payload['epoch'], payload['metrics'])
+            elif kind == 'checkpoint':
+                self._register_checkpoints(training)
+            elif kind == 'log':
+                self.metrics.log(training.id, payload['message'], immediate=True)
+            elif kind == 'tuned':
+                self._apply_tuning(training, payload['result'])
+            elif kind == 'stop':
+                self._record_stop(training, payload['reason'], payload['epoch'])
+            else:
+                process.join(PROCESS_JOIN_TIMEOUT)
+                return kind, payload
+    
+    def _deadline(self, training):
+        """Absolute time.time() at which the wall-clock budget runs out, counted from started_at"""
+        minutes = training.get_stop_rules().get('max_duration_minutes')
+        if not minutes or not training.started_at:
+            return None
+        elapsed = (datetime.utcnow() - training.started_at).total_seconds()
+        return time.time() - elapsed + minutes * 60
+    
+    def _record_stop(self, training, reason, epoch):
+        """A stopping rule fired in the worker; the run finishes with best.pt as usual"""
+        training.stop_reason = reason
+        db.session.commit()
+        
+        active = self.active_trainings.get(training.id)
+        if active is not None:
+            active['stopped_epoch'] = epoch
+        self.metrics.log(training.id, f'Época {epoch}: encerrando o treinamento ({STOP_MESSAGES.get(reason, reason)})',
+                         level='warning')
+    
+    def _apply_tuning(self, training, result):
+        """Record the batch size and workers the worker picked by auto-tune"""
+        if not result:
+            self.metrics.log(training.id, 'Auto-tune: nenhum batch coube na memoria, mantendo a configuracao original',
+                             level='warning', immediate=True)
+            return
+        
+        training.batch_size = result['batch_size']
+        if result['workers'] is not None:
+            training.workers = result['workers']
+        training.tuned_images_per_sec = result['images_per_sec']
+        
+        config = training.get_config()
+        config.update(batch_size=training.batch_size, workers=training.workers,
+                      auto_tune_trials={'batch': result['batch_trials'], 'workers': result['worker_trials']})
+        training.set_config(config)
+        db.session.commit()
+        
+        self.metrics.log(training.id, f'Auto-tune: batch {training.batch_size}, {training.workers} workers '
+                                      f'({training.tuned_images_per_sec:.1f} img/s)', level='success', immediate=True)
+    
+    def _apply_halving(self, training, epoch, metrics):
+        """Stop a sweep trial whose map50 falls outside the top 1/eta at a rung epoch"""
+        if not self.sweeps.is_rung(training, epoch):
+            return
+        
+        # Peers are compared on stored rows, so buffered epochs must be written first
+        self.metrics.flush()
+        if not self.sweeps.should_stop(training, epoch, live_metric(metrics, 'map50', metrics.get('metrics/mAP50', 0))):
+            return
+        
+        active = self.active_trainings.get(training.id)
+        if active and not active['pruned']:
+            active['pruned'] = True
+            active['control'].set()
+            self.metrics.log(training.id, f'Época {epoch}: mAP50 abaixo dos melhores trials do sweep, '
+                                          f'encerrando o trial', level='warning')
+    
+    def _weights_dir(self, training):
+        training_dir = training.model_dir or os.path.join(self.storage.models_dir, str(training.id))
+        return os.path.join(training_dir, 'run', 'weights')
+    
+    def last_checkpoint(self, training):
+        """Path of run/weights/last.pt for a training, or None"""
+        last = os.path.join(self._weights_dir(training), 'last.pt')
+        return last if os.path.exists(last) else None
+    
+    def _register_checkpoints(self, training):
+        """Add Checkpoint rows for the epochN.pt files written by save_period"""
+        weights_dir = self._weights_dir(training)
+        if not os.path.isdir(weights_dir):
+            return 0
+        
+        known = {c.file_path for c in Checkpoint.query.filter_by(training_id=training.id).all()}
+        added = 0
+        for file_name in os.listdir(weights_dir):
+            match = PERIODIC_CHECKPOINT.match(file_name)
+            file_path = os.path.join(weights_dir, file_name)
+            if not match or file_path in known:
+                continue
+            # ultralytics names the file after the 0-based epoch index
+            db.session.add(Checkpoint(training_id=training.id, epoch=int(match.group(1)) + 1, file_path=file_path))
+            added += 1
+        
+        if added:
+            db.session.commit()
+        return added
+    
+    def prepare_resume(self, training):
+        """Queue an interrupted, failed or canceled training to continue from last.pt"""
+        config = training.get_config() or {}
+        config['resume'] = True
+        training.set_config(config)
+        training.status = 'queued'
+        training.finished_at = None
+    
+    def recover_interrupted(self):
+        """Startup reconciliation of trainings left 'running' by a dead server (requires an app context)
+
+        Trainings with a last.pt become 'interrupted' (resumable), the others
+        'failed'. With TRAINING_AUTO_RESUME=true interrupted ones are queued
+        again right away. Call it once per server, before the scheduler
+        resumes: any other live process would see its running trainings
+        here as orphans (run.start_services does this).
+        """
+        auto_resume = os.getenv('TRAINING_AUTO_RESUME', 'false').lower() == 'true'
+        recovered = []
+        for training in Training.query.filter_by(status='running').all():
+            if training.id in self.active_trainings:
+                continue
+            
+            self._register_checkpoints(training)
+            if training.model_dir:
+                self._import_results_csv(training.id, training.model_dir)
+            
+            if not self.last_checkpoint(training):
+                training.status = 'failed'
+                training.finished_at = datetime.utcnow()
+            elif auto_resume:
+                self.prepare_resume(training)
+            else:
+                training.status = 'interrupted'
+            recovered.append((training.id, training.status))
+        
+        db.session.commit()
+        for training_id, status in recovered:
+            print(f"Recovered orphaned training {training_id}: {status}")
+        return recovered
+    
+    def _stop_process(self, process, grace=CANCEL_GRACE_SECONDS):
+        """Hard-kill a worker process that did not stop within the grace period"""
+        process.join(grace)
+        if process.is_alive():
+            process.terminate()
+            process.join(PROCESS_JOIN_TIMEOUT)
+        if process.is_alive():
+            process.kill()
     
     def cancel_training(self, training_id):
         """Cancel an active training"""
         if training_id in self.active_trainings:
-            self.active_trainings[training_id]['canceled'] = True
+            active = self.active_trainings[training_id]
+            active['canceled'] = True
+            
+            # Ask the worker to stop at the end of the epoch, then kill it if it does not.
+            # Before the spawn the event alone keeps the worker from starting.
+            active['control'].set()
+            if active.get('process') is not None:
+                threading.Thread(target=self._stop_process, args=(active['process'],), daemon=True).start()
             return True
         return False
     
@@ -319,14 +482,25 @@ class TrainingService:
         if not training:
             return None
         
-        is_active = training_id in self.active_trainings
+        is_active = training_id in self.active_trainings or training_id in self.scheduler.running
         
-        return {
+        status = {
             'id': training.id,
             'status': training.status,
             'progress': self._calculate_progress(training),
-            'is_active': is_active
+            'is_active': is_active,
+            'queue_position': None,
+            'estimated_start_at': None
         }
+        
+        if training.status == 'queued' and not is_active:
+            queued = self.scheduler.queue_snapshot().get(training_id)
+            if queued:
+                status['queue_position'] = queued['queue_position']
+                if queued['estimated_start_at']:
+                    status['estimated_start_at'] = queued['estimated_start_at'].isoformat()
+        
+        return status
     
     def _calculate_progress(self, training):
         """Calculate training progress percentage"""
@@ -343,43 +517,33 @@ class TrainingService:
     
     def _import_results_csv(self, training_id, training_dir):
         """Import metrics from YOLO's results.csv file"""
-        import pandas as pd
-        import os
-        
         results_path = os.path.join(training_dir, 'run', 'results.csv')
         if not os.path.exists(results_path):
             print(f"DEBUG: results.csv not found at {results_path}")
             return
         
         try:
-            # Read CSV file and strip column names
-            df = pd.read_csv(results_path)
-            df.columns = df.columns.str.strip()  # Remove leading/trailing spaces
-            print(f"DEBUG: Found {len(df)} epochs in results.csv")
+            table = load_results(results_path)
+            print(f"DEBUG: Found {len(table)} epochs in results.csv")
             
-            # Clear existing metrics to avoid duplicates
-            TrainingMetric.query.filter_by(training_id=training_id).delete()
-            
-            # Import each epoch's metrics
-            for _, row in df.iterrows():
-                epoch = int(row.get('epoch', 0))
-                
-                metric = TrainingMetric(
-                    training_id=training_id,
-                    epoch=epoch,
-                    loss=float(row.get('train/box_loss', 0)),
-                    accuracy=float(row.get('metrics/mAP50(B)', 0)),
-                    val_loss=float(row.get('val/box_loss', 0)),
-                    val_accuracy=float(row.get('metrics/mAP50(B)', 0)),  # Using same as accuracy for now
-                    map50=float(row.get('metrics/mAP50(B)', 0)),
-                    map=float(row.get('metrics/mAP50-95(B)', 0))
-                )
-                db.session.add(metric)
+            # Replace the live per-epoch rows with the final values in one bulk insert,
+            # keeping the profile the callbacks measured (results.csv has no timings)
+            columns = [getattr(TrainingMetric, field) for field in PROFILE_FIELDS]
+            profiles = {
+                row[0]: dict(zip(PROFILE_FIELDS, row[1:]))
+                for row in db.session.query(TrainingMetric.epoch, *columns).filter_by(training_id=training_id)
+            }
+            rows = table.metric_rows(training_id)
+            for row in rows:
+                row.update(profiles.get(row['epoch'], {}))
             
+            TrainingMetric.query.filter_by(training_id=training_id).delete()
+            db.session.bulk_insert_mappings(TrainingMetric, rows)
             db.session.commit()
-            print(f"DEBUG: Successfully imported {len(df)} metrics from results.csv")
+            print(f"DEBUG: Successfully imported {len(table)} metrics from results.csv")
             
         except Exception as e:
+            db.session.rollback()
             print(f"DEBUG: Error importing results.csv: {e}")
             import traceback
             traceback.print_exc()
@@ -0,0 +1,133 @@
+import traceback
+
+from app.services.metrics_sink import live_metric
+from app.services.profiling import EpochProfiler
+from app.services.stopping import StoppingRules
+
+
+def resume_on_device(trainer_class, device):
+    """Subclass of a task trainer that keeps `device` when resuming
+
+    ultralytics restores every argument from last.pt on resume (only imgsz
+    and batch may be overridden), which would drop the scheduler's slot.
+    """
+
+    class ResumeTrainer(trainer_class):
+        def check_resume(self, overrides):
+            super().check_resume(overrides)
+            if self.resume:
+                self.args.device = device
+
+    return ResumeTrainer
+
+
+def run_training_process(spec, events, control):
+    """Subprocess entry point: train one model and report back over the events queue
+
+    Runs without an app context or database session; the server process
+    turns the ('kind', payload) messages into DB writes and Socket.IO events.
+    Setting the control event stops training at the next epoch boundary.
+    """
+
+    def send(kind, **payload):
+        events.put((kind, payload))
+
+    def log(message):
+        send('log', message=message)
+
+    try:
+        # Workaround for PyTorch 2.6 weights_only default. This process only runs
+        # the training, so the patch no longer leaks into the web server.
+        import torch
+
+        original_torch_load = torch.load
+
+        def patched_torch_load(*args, **kwargs):
+            kwargs.setdefault('weights_only', False)
+            return original_torch_load(*args, **kwargs)
+
+        torch.load = patched_torch_load
+
+        train_args = dict(spec['train_args'])
+        cache_dir = None
+        if spec.get('preprocess_cache'):
+            from app.services.preprocess_cache import build_cache, CacheTooLarge
+            try:
+                cache_dir = build_cache(spec['preprocess_cache'], log=log)
+            except CacheTooLarge as e:
+                log(f'Cache de pre-processamento desativado: {e}')
+
+        if spec.get('auto_tune'):
+            from app.services.autotune import autotune
+            tuned = autotune(spec['model_name'], train_args['data'], train_args['imgsz'], train_args['device'], log=log)
+            if tuned:
+                train_args['batch'] = tuned['batch_size']
+                if tuned['workers'] is not None:
+                    train_args['workers'] = tuned['workers']
+            send('tuned', result=tuned)
+
+        from ultralytics import YOLO
+        model = YOLO(spec['model_name'])
+        if control.is_set():
+            raise KeyboardInterrupt("Training was canceled")  # during the cache build or auto-tune
+        send('started')
+
+        def on_train_epoch_end(trainer):
+            if control.is_set():
+                raise KeyboardInterrupt("Training was canceled")
+
+        reported = set()
+        profiler = EpochProfiler()
+        stopping = StoppingRules(spec.get('stop_rules'), spec.get('deadline'))
+
+        def on_fit_epoch_end(trainer):
+            # Validation has run: trainer.metrics belong to this epoch, training losses come from tloss.
+            # The final validation of best.pt fires this again for the last epoch; it is not reported.
+            if trainer.epoch in reported:
+                return
+            reported.add(trainer.epoch)
+            if hasattr(trainer, 'metrics') and trainer.metrics:
+                metrics = dict(trainer.label_loss_items(trainer.tloss)) if trainer.tloss is not None else {}
+                metrics.update(trainer.metrics)
+                send('metric', epoch=trainer.epoch + 1,
+                     metrics={key: float(value) for key, value in metrics.items()},
+                     profile=profiler.summary(trainer))
+
+                # Platform stopping rules end the run cleanly: best.pt is still validated and saved
+                reason = stopping.check(trainer.epoch + 1,
+                                        live_metric(metrics, 'map50', metrics.get('metrics/mAP50', 0)),
+                                        live_metric(metrics, 'map5095', metrics.get('metrics/mAP50-95', 0)),
+                                        epoch_seconds=trainer.epoch_time)
+                if reason is None and trainer.stop and trainer.epoch + 1 < trainer.epochs:
+                    reason = 'patience'  # ultralytics' own EarlyStopping
+                if reason:
+                    trainer.stop = True
+                    send('stop', reason=reason, epoch=trainer.epoch + 1)
+
+        def on_model_save(trainer):
+            # Periodic epochN.pt files are registered as Checkpoint rows by the server
+            if trainer.save_period > 0 and trainer.epoch > 0 and trainer.epoch % trainer.save_period == 0:
+                send('checkpoint', epoch=trainer.epoch)
+
+        model.add_callback('on_train_epoch_start', profiler.on_train_epoch_start)
+        model.add_callback('on_train_batch_start', profiler.on_train_batch_start)
+        model.add_callback('on_train_batch_end', profiler.on_train_batch_end)
+        model.add_callback('on_train_epoch_end', profiler.on_train_epoch_end)
+        model.add_callback('on_train_epoch_end', on_train_epoch_end)
+        model.add_callback('on_fit_epoch_end', on_fit_epoch_end)
+        model.add_callback('on_model_save', on_model_save)
+
+        # Classification datasets load images differently and do not use the cache
+        trainer_class = None
+        if cache_dir and model.task in ('detect', 'segment', 'pose'):
+            from app.services.cached_training import cached_trainer
+            trainer_class = cached_trainer(model.task_map[model.task]['trainer'], cache_dir, log=log)
+        if train_args.get('resume') and train_args.get('device') is not None:
+            trainer_class = resume_on_device(trainer_class or model.task_map[model.task]['trainer'], train_args['device'])
+        model.train(trainer=trainer_class, **train_args)
+        send('completed')
+
+    except KeyboardInterrupt:
+        send('canceled')
+    except Exception as e:
+        send('failed', error=str(e), error_type=type(e).__name__, traceback=traceback.format_exc())
@@ -0,0 +1,183 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class WebcamSession:
+    """State of one streaming webcam client bound to a single model"""
+
+    def __init__(self, sid, model_path, options):
+        self.sid = sid
+        self.model_path = model_path
+        self.options = options
+        self.opened_at = time.time()
+        self.closed = False
+
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_latency_ms = None
+        self.max_latency_ms = 0.0
+        self._latency_total_ms = 0.0
+
+        self._lock = threading.Lock()
+        self._pending = None
+        self._draining = False
+
+    def offer(self, frame):
+        """Keep only the newest frame; returns True when a drain worker must be started"""
+        with self._lock:
+            self.received += 1
+            if self._pending is not None:
+                # Server fell behind: the older frame is never processed
+                self.dropped += 1
+            self._pending = frame
+            if self._draining:
+                return False
+            self._draining = True
+            return True
+
+    def take(self):
+        """Pop the pending frame, or mark the drain worker idle when there is none"""
+        with self._lock:
+            frame, self._pending = self._pending, None
+            if frame is None or self.closed:
+                self._draining = False
+                return None
+            return frame
+
+    def record_latency(self, latency_ms):
+        with self._lock:
+            self.processed += 1
+            self.last_latency_ms = latency_ms
+            self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+            self._latency_total_ms += latency_ms
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def stats(self):
+        with self._lock:
+            elapsed = max(time.time() - self.opened_at, 1e-6)
+            return {
+                'received': self.received,
+                'processed': self.processed,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'drop_rate': round(self.dropped / self.received, 4) if self.received else 0.0,
+                'last_latency_ms': self.last_latency_ms,
+                'avg_latency_ms': round(self._latency_total_ms / self.processed, 2) if self.processed else None,
+                'max_latency_ms': round(self.max_latency_ms, 2),
+                'processed_fps': round(self.processed / elapsed, 2),
+            }
+
+
+class WebcamStreamService:
+    """Per-client webcam inference sessions with latest-frame-wins dropping"""
+
+    def __init__(self, inference, socketio, namespace='/ws/webcam'):
+        self.inference = inference
+        self.socketio = socketio
+        self.namespace = namespace
+        self.sessions = {}
+        self._lock = threading.Lock()
+
+    def open(self, sid, model_path, options):
+        """Bind a client to a model, warming the shared model cache"""
+        self.close(sid)
+        self.inference.models.get(model_path, options.get('device'))
+        session = WebcamSession(sid, model_path, options)
+        with self._lock:
+            self.sessions[sid] = session
+        return session
+
+    def close(self, sid):
+        """Drop a client session, returning its final stats"""
+        with self._lock:
+            session = self.sessions.pop(sid, None)
+        if session is None:
+            return None
+        session.closed = True
+        return session.stats()
+
+    def get(self, sid):
+        with self._lock:
+            return self.sessions.get(sid)
+
+    def submit(self, sid, image_bytes, seq=None, sent_at=None):
+        """Queue a JPEG/PNG frame for a session; older unprocessed frames are dropped"""
+        session = self.get(sid)
+        if session is None:
+            return False
+
+        frame = {
+            'data': image_bytes,
+            'seq': seq,
+            'sent_at': sent_at,
+            'received_at': time.perf_counter(),
+        }
+        if session.offer(frame):
+            self.socketio.start_background_task(self._drain, session)
+        return True
+
+    def _drain(self, session):
+        while True:
+            frame = session.take()
+            if frame is None:
+                return
+
+            try:
+                payload = self._run_blocking(self._infer, session, frame['data'])
+            except Exception as e:
+                session.record_error()
+                self.socketio.emit('frame_error', {
+                    'seq': frame['seq'],
+                    'error': str(e)
+                }, namespace=self.namespace, to=session.sid)
+                continue
+
+            latency_ms = (time.perf_counter() - frame['received_at']) * 1000
+            session.record_latency(latency_ms)
+
+            payload.update({
+                'seq': frame['seq'],
+                'sent_at': frame['sent_at'],
+                'latency_ms': round(latency_ms, 2),
+                'stats': session.stats(),
+            })
+            self.socketio.emit('frame_result', payload, namespace=self.namespace, to=session.sid)
+
+    def _infer(self, session, image_bytes):
+        options = session.options
+        frame = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError('Could not decode frame')
+
+        detections, annotated = self.inference.infer_frame(
+            session.model_path, frame,
+            options.get('conf_threshold', 0.25),
+            options.get('iou_threshold', 0.45),
+            options.get('img_size', 640),
+            options.get('device'),
+            annotate=options.get('annotate', False),
+            detection_format=options.get('detection_format', 'full'),
+        )
+
+        payload = {'detections': detections}
+        if annotated is not None:
+            quality = int(options.get('jpeg_quality', 80))
+            _, buffer = cv2.imencode('.jpg', annotated, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            # Sent as a binary attachment, no base64 round trip
+            payload['annotated_frame'] = buffer.tobytes()
+        return payload
+
+    def _run_blocking(self, func, *args):
+        """Keep the eventlet hub responsive while the model runs"""
+        if getattr(self.socketio, 'async_mode', None) == 'eventlet':
+            from eventlet import tpool
+            return tpool.execute(func, *args)
+        return func(*args)
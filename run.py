@@ -1,15 +1,58 @@
 #!/usr/bin/env python3
 
 import os
+from werkzeug.serving import is_running_from_reloader
+
 from app import create_app, socketio
 
-app = create_app()
+
+def start_services(app):
+    """Reconcile work orphaned by a previous server process, then resume background work
+
+    Must run exactly once per server: reconciliation first (it fails or
+    requeues what a dead process left behind), then the training scheduler
+    and the stats reconciler.
+    """
+    from app.routes.trainings import trainer
+    from app.routes.datasets import ingestor, stats_reconciler
+    from app.routes.tests import inference_queue
+    with app.app_context():
+        trainer.recover_interrupted()
+        ingestor.recover_interrupted()
+        inference_queue.recover_interrupted()
+    trainer.scheduler.resume(app)
+    stats_reconciler.start(app)
+
+
+def create_server():
+    """Build the app and start its background services
+
+    Kept out of module level: spawned worker processes (trainings, dataset
+    ingestion) re-import this script as __mp_main__ and must not rebuild the
+    app, its database engine or its background threads.
+    WSGI servers use the factory, e.g. gunicorn "run:create_server()".
+    """
+    app = create_app()
+    start_services(app)
+    return app
+
+
+def serves_requests(use_reloader):
+    """False in the reloader's watcher process, which only restarts the serving child"""
+    return not use_reloader or is_running_from_reloader()
+
 
 if __name__ == '__main__':
     # Get configuration from environment
     host = os.getenv('HOST', '0.0.0.0')
     port = int(os.getenv('PORT', 5000))
     debug = os.getenv('DEBUG', 'True').lower() == 'true'
-    
+    use_reloader = debug
+
+    app = create_app()
+    if serves_requests(use_reloader):
+        start_services(app)
+
     # Run the application with SocketIO
-    socketio.run(app, host=host, port=port, debug=debug, allow_unsafe_werkzeug=True)
\ No newline at end of file
+    socketio.run(app, host=host, port=port, debug=debug, use_reloader=use_reloader,
+                 allow_unsafe_werkzeug=True)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-box vs vectorised detection extraction
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.infer import extract_detections
+
+
+def make_result(num_boxes, num_classes=80, seed=0):
+    """Build a Results object with random boxes on a 1080p frame"""
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform(0, 1800, size=(num_boxes, 2))
+    wh = rng.uniform(5, 120, size=(num_boxes, 2))
+    data = np.column_stack([
+        xy, xy + wh,
+        rng.uniform(0.25, 1.0, size=num_boxes),
+        rng.integers(0, num_classes, size=num_boxes),
+    ]).astype(np.float32)
+
+    names = {i: f'class_{i}' for i in range(num_classes)}
+    orig_img = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    return Results(orig_img, path='bench.jpg', names=names, boxes=torch.from_numpy(data))
+
+
+def extract_per_box(result):
+    """Previous implementation: one tensor -> python conversion per box"""
+    detections = []
+    if result.boxes is not None and len(result.boxes) > 0:
+        for box in result.boxes:
+            detections.append({
+                'bbox': box.xyxy[0].tolist(),
+                'confidence': float(box.conf[0]),
+                'class': int(box.cls[0]),
+                'class_name': result.names[int(box.cls[0])]
+            })
+    return detections
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark detection extraction')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'boxes':>6} {'per-box ms':>12} {'full ms':>10} {'compact ms':>11} {'speedup':>8}")
+    for size in args.sizes:
+        result = make_result(size)
+        assert len(extract_per_box(result)) == len(extract_detections(result)) == size
+
+        number = max(1, 2000 // size)
+        timings = {}
+        for label, func in (
+            ('per_box', lambda: extract_per_box(result)),
+            ('full', lambda: extract_detections(result)),
+            ('compact', lambda: extract_detections(result, 'compact')),
+        ):
+            best = min(timeit.repeat(func, number=number, repeat=args.repeat))
+            timings[label] = best / number * 1000
+
+        speedup = timings['per_box'] / timings['full']
+        print(f"{size:>6} {timings['per_box']:>12.3f} {timings['full']:>10.3f} "
+              f"{timings['compact']:>11.3f} {speedup:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
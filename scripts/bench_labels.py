@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: line-by-line vs vectorised YOLO label validation over a synthetic dataset
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.label_validation import label_files, validate_label_directories, validate_label_files
+
+
+def make_labels(directory, num_files, num_classes=80, max_boxes=20, invalid_every=50, seed=0):
+    """Write num_files detection labels; every invalid_every-th file has one bad line"""
+    rng = np.random.default_rng(seed)
+    for index in range(num_files):
+        boxes = rng.integers(1, max_boxes + 1)
+        rows = np.column_stack([
+            rng.integers(0, num_classes, size=boxes),
+            rng.uniform(0.05, 0.95, size=(boxes, 4)),
+        ])
+        lines = [f'{int(row[0])} {row[1]:.6f} {row[2]:.6f} {row[3]:.6f} {row[4]:.6f}' for row in rows]
+        if invalid_every and index % invalid_every == 0:
+            lines[-1] = f'{num_classes} 0.5 0.5 1.2 0.1'
+        with open(os.path.join(directory, f'{index:06d}.txt'), 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+
+def validate_line_by_line(label_path, num_classes):
+    """Previous StorageService.validate_yolo_label: split()/float() per line, stops at the first problem"""
+    try:
+        with open(label_path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+
+                parts = line.split()
+                if len(parts) != 5:
+                    return False
+
+                class_idx = int(parts[0])
+                if class_idx < 0 or class_idx >= num_classes:
+                    return False
+
+                for coord in parts[1:]:
+                    val = float(coord)
+                    if val < 0 or val > 1:
+                        return False
+
+        return True
+    except Exception:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark YOLO label validation')
+    parser.add_argument('--files', type=int, default=100_000)
+    parser.add_argument('--classes', type=int, default=80)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        make_labels(directory, args.files, args.classes)
+        print(f"Generated {args.files} label files in {time.perf_counter() - started:.1f}s")
+        paths = label_files([directory])
+
+        timings = {}
+        started = time.perf_counter()
+        legacy_invalid = sum(not validate_line_by_line(path, args.classes) for path in paths)
+        timings['line-by-line'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        invalid = 0
+        for start in range(0, len(paths), 512):
+            results = validate_label_files(paths[start:start + 512], args.classes)
+            invalid += sum(bool(errors) for errors in results.values())
+        timings['vectorised'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        report = validate_label_directories([directory], args.classes, workers=args.workers)
+        timings[f'vectorised x{args.workers}'] = time.perf_counter() - started
+
+        assert legacy_invalid == invalid == report['invalid_files'], (legacy_invalid, invalid, report['invalid_files'])
+
+        print(f"{'validator':>16} {'seconds':>9} {'files/s':>10} {'speedup':>8}")
+        for label, seconds in timings.items():
+            print(f"{label:>16} {seconds:>9.2f} {len(paths) / seconds:>10.0f} "
+                  f"{timings['line-by-line'] / seconds:>7.1f}x")
+        print(f"Invalid files: {invalid} (with per-line errors in the report)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+import uuid
+import zipfile
+
+from PIL import Image
+
+from app import create_app
+from app.services.archive_import import (
+    ArchiveImportError, import_archive, member_target, safe_member_path, yaml_classes
+)
+
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class TestArchiveImport(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dataset_path = os.path.join(self.tmpdir.name, 'dataset')
+        os.makedirs(self.dataset_path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_member_paths(self):
+        self.assertEqual(safe_member_path('./export/images/train/a.jpg'), 'export/images/train/a.jpg')
+        for name in ('../a.jpg', 'images/../../a.jpg', '/etc/passwd', 'C:\\images\\a.jpg', '..'):
+            self.assertIsNone(safe_member_path(name), name)
+
+        self.assertEqual(member_target('images/train/a.jpg'), ('train', 'image', 'a.jpg'))
+        self.assertEqual(member_target('export/valid/labels/a.txt'), ('val', 'label', 'a.txt'))
+        self.assertEqual(member_target('labels/a.txt'), ('train', 'label', 'a.txt'))
+        self.assertIsNone(member_target('images/train/notes.txt'))
+        self.assertIsNone(member_target('README.md'))
+
+    def test_yaml_classes(self):
+        self.assertEqual(yaml_classes('names: [car, person]'), ['car', 'person'])
+        self.assertEqual(yaml_classes('names: {1: person, 0: car}'), ['car', 'person'])
+        self.assertIsNone(yaml_classes('nc: 2'))
+        self.assertIsNone(yaml_classes(': not yaml ['))
+
+    def test_zip_is_streamed_into_splits(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('export/data.yaml', 'names: [car]\n')
+            archive.writestr('export/images/train/a.png', png_bytes())
+            archive.writestr('export/labels/train/a.txt', '0 0.5 0.5 0.1 0.1\n')
+            archive.writestr('export/valid/images/b.png', png_bytes())
+            archive.writestr('../../escape.png', png_bytes())
+            archive.writestr('export/README.md', 'hello')
+        buffer.seek(0)
+
+        result = import_archive(buffer, 'export.zip', self.dataset_path)
+
+        self.assertEqual(result['classes'], ['car'])
+        self.assertEqual(sorted(result['files'].values()), [('train', 'image'), ('train', 'label'), ('val', 'image')])
+        self.assertTrue(os.path.exists(os.path.join(self.dataset_path, 'images', 'val', 'b.png')))
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir.name, 'escape.png')))
+        self.assertEqual((result['stats']['unsafe'], result['stats']['skipped']), (1, 1))
+        self.assertGreater(result['stats']['mb_per_sec'], 0)
+
+    def test_tar_stream_skips_links_and_enforces_size_limit(self):
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w:gz') as archive:
+            data = png_bytes()
+            info = tarfile.TarInfo('images/test/a.png')
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+            link = tarfile.TarInfo('images/test/link.png')
+            link.type, link.linkname = tarfile.SYMTYPE, '/etc/passwd'
+            archive.addfile(link)
+        buffer.seek(0)
+
+        result = import_archive(buffer, 'export.tar.gz', self.dataset_path)
+        self.assertEqual(list(result['files'].values()), [('test', 'image')])
+        self.assertFalse(os.path.lexists(os.path.join(self.dataset_path, 'images', 'test', 'link.png')))
+
+        buffer.seek(0)
+        with self.assertRaises(ArchiveImportError):
+            import_archive(buffer, 'export.tar.gz', self.dataset_path, max_bytes=10)
+
+        with self.assertRaises(ArchiveImportError):
+            import_archive(io.BytesIO(b'not an archive'), 'broken.tar', self.dataset_path)
+
+
+class TestArchiveImportEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self._database_url = os.environ.get('DATABASE_URL')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(self.tmpdir.name, 'import.db')
+        self.app = create_app()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        from app import db
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        if self._database_url is None:
+            os.environ.pop('DATABASE_URL', None)
+        else:
+            os.environ['DATABASE_URL'] = self._database_url
+        self.tmpdir.cleanup()
+
+    def test_import_registers_valid_files(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('data.yaml', 'names: [car, person]\n')
+            archive.writestr('images/train/a.png', png_bytes())
+            archive.writestr('labels/train/a.txt', '1 0.5 0.5 0.1 0.1\n')
+            archive.writestr('labels/train/bad.txt', '5 0.5 0.5 0.1 0.1\n')
+        buffer.seek(0)
+
+        name = f'import_{uuid.uuid4().hex[:8]}'
+        response = self.client.post('/api/datasets/import', data={'name': name, 'archive': (buffer, 'ds.zip')},
+                                    content_type='multipart/form-data')
+
+        self.assertEqual(response.status_code, 201, response.json)
+        self.assertEqual(response.json['uploaded_files_count'], 2)
+        self.assertEqual(response.json['import']['files'], 3)
+        self.assertEqual([c['class_name'] for c in response.json['dataset']['classes']], ['car', 'person'])
+
+        missing_classes = self.client.post(
+            '/api/datasets/import',
+            data={'name': f'{name}_2', 'archive': (io.BytesIO(zipfile_without_yaml()), 'ds.zip')},
+            content_type='multipart/form-data'
+        )
+        self.assertEqual(missing_classes.status_code, 400)
+
+        self.assertEqual(self.client.delete(f"/api/datasets/{response.json['dataset']['id']}").status_code, 200)
+
+
+def zipfile_without_yaml():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('images/train/a.png', png_bytes())
+    return buffer.getvalue()
+
+
+if __name__ == '__main__':
+    unittest.main()
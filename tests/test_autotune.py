@@ -0,0 +1,37 @@
+import unittest
+
+from app.services.autotune import pick_configuration, worker_candidates
+
+
+class TestAutoTune(unittest.TestCase):
+    def test_fastest_fitting_batch_is_chosen(self):
+        batch_trials = [
+            {'batch_size': 8, 'images_per_sec': 40.0, 'fits': True},
+            {'batch_size': 16, 'images_per_sec': 55.0, 'fits': True},
+            {'batch_size': 32, 'images_per_sec': 70.0, 'fits': False},
+        ]
+        worker_trials = [
+            {'workers': 0, 'images_per_sec': 30.0},
+            {'workers': 4, 'images_per_sec': 120.0},
+            {'workers': 8, 'images_per_sec': 120.0},
+        ]
+
+        batch_size, workers, images_per_sec = pick_configuration(batch_trials, worker_trials)
+        self.assertEqual(batch_size, 16)
+        self.assertEqual(workers, 4)  # Same throughput with fewer processes
+        self.assertEqual(images_per_sec, 55.0)
+
+    def test_data_pipeline_bounds_throughput(self):
+        result = pick_configuration([{'batch_size': 16, 'images_per_sec': 90.0, 'fits': True}],
+                                    [{'workers': 2, 'images_per_sec': 60.0}])
+        self.assertEqual(result, (16, 2, 60.0))
+
+    def test_nothing_fits(self):
+        self.assertIsNone(pick_configuration([{'batch_size': 8, 'images_per_sec': 0.0, 'fits': False}], []))
+
+    def test_worker_candidates_are_capped_by_cpus(self):
+        self.assertEqual(worker_candidates((0, 2, 4, 8), cpu_count=4), [0, 2, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
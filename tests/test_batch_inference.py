@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+from app.services.infer import InferenceService
+
+
+class ShadeModel:
+    """Fake model reporting shade // 10 boxes for an image filled with one shade"""
+
+    names = {0: 'object'}
+
+    def __init__(self, unplottable=()):
+        self.unplottable = set(unplottable)
+        self.batches = []
+
+    def __call__(self, frames, **kwargs):
+        self.batches.append(len(frames))
+        results = []
+        for frame in frames:
+            shade = int(frame[0, 0, 0])
+            boxes = torch.tensor([[0, 0, 10, 10, 0.9, 0]] * (shade // 10), dtype=torch.float32).reshape(-1, 6)
+            result = Results(frame, path=None, names=self.names, boxes=boxes)
+            if shade in self.unplottable:
+                result.plot = mock.Mock(side_effect=RuntimeError('plot failed'))
+            results.append(result)
+        return results
+
+
+class TestBatchInference(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.input_dir = os.path.join(self.tmpdir.name, 'input')
+        self.output_dir = os.path.join(self.tmpdir.name, 'output')
+        os.makedirs(self.input_dir)
+        for name, shade in [('a.jpg', 10), ('b.png', 20), ('d.jpg', 40), ('e.bmp', 50), ('f.png', 60)]:
+            cv2.imwrite(os.path.join(self.input_dir, name), np.full((32, 48, 3), shade, dtype=np.uint8))
+        with open(os.path.join(self.input_dir, 'c.jpg'), 'wb') as f:
+            f.write(b'not an image')
+        self.service = InferenceService(models=object(), exporter=object())
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _run(self, model, **kwargs):
+        return self.service._process_directory(model, self.input_dir, self.output_dir, 0.25, 0.45, 64,
+                                               batch_size=2, workers=3, **kwargs)
+
+    def test_results_keep_input_order_and_skip_unreadable_images(self):
+        model = ShadeModel()
+        summary = self._run(model)
+
+        names = [os.path.basename(r['input_path']) for r in summary['results']]
+        self.assertEqual(names, ['a.jpg', 'b.png', 'd.jpg', 'e.bmp', 'f.png'])
+        self.assertEqual([r['detection_count'] for r in summary['results']], [1, 2, 4, 5, 6])
+        self.assertEqual(summary['total_detections'], 18)
+        self.assertEqual(model.batches, [2, 1, 2])  # c.jpg is dropped from the second batch
+
+        # Outputs keep the source file names
+        self.assertEqual(sorted(os.listdir(summary['output_dir'])),
+                         ['annotated_a.jpg', 'annotated_b.png', 'annotated_d.jpg', 'annotated_e.bmp', 'annotated_f.png'])
+
+    def test_compact_format_matches_the_image_result_shape(self):
+        full = self._run(ShadeModel(), output_mode='detections_only')
+        compact = self._run(ShadeModel(), output_mode='detections_only', detection_format='compact')
+
+        self.assertNotIn('class_names', full)
+        self.assertEqual(compact['class_names'], ShadeModel.names)
+        self.assertEqual(full['results'][1]['detections'][0]['class_name'], 'object')
+        self.assertEqual(compact['results'][1]['detections'][0][5], 0)
+        self.assertEqual([len(r['detections']) for r in compact['results']], [1, 2, 4, 5, 6])
+
+    def test_failed_write_does_not_affect_other_images(self):
+        summary = self._run(ShadeModel(unplottable={20}))
+
+        self.assertEqual(summary['processed_images'], 5)
+        written = sorted(os.listdir(summary['output_dir']))
+        self.assertNotIn('annotated_b.png', written)
+        self.assertEqual(len(written), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
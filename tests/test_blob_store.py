@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+import unittest
+import uuid
+
+from PIL import Image
+
+from app import create_app, db
+from app.models import Blob, Dataset
+from app.services.blob_store import BlobStore
+from app.services.ingestion import DatasetIngestor
+
+
+class TestBlobStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self._database_url = os.environ.get('DATABASE_URL')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(self.tmpdir.name, 'blobs.db')
+        self.app = create_app()
+        self.store = BlobStore(os.path.join(self.tmpdir.name, 'blobs'))
+        self.ingestor = DatasetIngestor(blob_store=self.store)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        if self._database_url is None:
+            os.environ.pop('DATABASE_URL', None)
+        else:
+            os.environ['DATABASE_URL'] = self._database_url
+        self.tmpdir.cleanup()
+
+    def _dataset(self, colors):
+        """A dataset with one image per color, ingested through the blob store"""
+        path = os.path.join(self.tmpdir.name, uuid.uuid4().hex[:8])
+        os.makedirs(path)
+        items = []
+        for index, color in enumerate(colors):
+            image_path = os.path.join(path, f'{index}.png')
+            Image.new('RGB', (16, 16), color).save(image_path)
+            items.append(('train', 'image', image_path, 1))
+        label_path = os.path.join(path, '0.txt')
+        with open(label_path, 'w') as f:
+            f.write('0 0.5 0.5 0.1 0.1\n')
+        items.append(('train', 'label', label_path, 1))
+
+        dataset = Dataset(name=os.path.basename(path), path=path, nc=1)
+        db.session.add(dataset)
+        db.session.commit()
+        self.ingestor.ingest(dataset.id, items)
+        return dataset
+
+    def _delete(self, dataset):
+        shutil.rmtree(dataset.path)
+        freed = self.store.release(dataset.id)
+        db.session.delete(dataset)
+        db.session.commit()
+        self.store.purge(freed)
+        return freed
+
+    def test_shared_images_are_stored_once(self):
+        with self.app.app_context():
+            first = self._dataset(['red', 'green', 'red'])
+            second = self._dataset(['green', 'blue'])
+
+            self.assertEqual(Blob.query.count(), 3)  # red, green, blue
+            first_files = sorted(f.file_path for f in first.files if f.blob_hash)
+            self.assertTrue(os.path.samefile(first_files[0], first_files[2]))  # Both red images
+            green = os.path.join(second.path, '0.png')
+            self.assertTrue(os.path.samefile(os.path.join(first.path, '1.png'), green))
+
+            report = self.store.report(first.id)
+            size = os.path.getsize(green)
+            self.assertEqual((report['files'], report['blobs'], report['untracked_files']), (3, 2, 0))
+            self.assertEqual(report['shared_bytes'], size)
+            self.assertEqual(report['duplicate_bytes'], os.path.getsize(first_files[0]))
+            self.assertEqual(report['shared_with'], [{'dataset_id': second.id, 'name': second.name, 'files': 1}])
+
+            # Deleting the first dataset keeps the green blob the second one still uses
+            freed = self._delete(first)
+            self.assertEqual(len(freed), 1)
+            green_blob = db.session.get(Blob, next(f.blob_hash for f in second.files if f.blob_hash and
+                                                   f.file_path == green))
+            self.assertEqual(green_blob.refcount, 1)
+            self.assertTrue(os.path.exists(self.store.blob_path(green_blob.hash)))
+            self.assertTrue(all(not os.path.exists(self.store.blob_path(digest)) for digest in freed))
+
+            self._delete(second)
+            self.assertEqual(Blob.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
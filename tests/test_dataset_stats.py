@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+import uuid
+from unittest import mock
+
+from PIL import Image
+
+from app import create_app, db
+from app.models import Dataset
+from app.services.dataset_stats import DatasetStatsReconciler, reconcile
+from app.services.ingestion import DatasetIngestor
+
+
+class TestDatasetStats(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self._database_url = os.environ.get('DATABASE_URL')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(self.tmpdir.name, 'stats.db')
+        self.app = create_app()
+        self.path = os.path.join(self.tmpdir.name, 'dataset')
+        for split in ('train', 'val', 'test'):
+            os.makedirs(os.path.join(self.path, 'images', split))
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        if self._database_url is None:
+            os.environ.pop('DATABASE_URL', None)
+        else:
+            os.environ['DATABASE_URL'] = self._database_url
+        self.tmpdir.cleanup()
+
+    def _image(self, split, name):
+        path = os.path.join(self.path, 'images', split, name)
+        Image.new('RGB', (8, 8)).save(path)
+        return path
+
+    def test_ingestion_counts_and_reconciliation(self):
+        with self.app.app_context():
+            dataset = Dataset(name=f'ds-{uuid.uuid4().hex[:8]}', path=self.path, nc=1)
+            db.session.add(dataset)
+            db.session.commit()
+
+            items = [('train', 'image', self._image('train', f'{i}.png'), 1) for i in range(3)]
+            items.append(('val', 'image', self._image('val', 'a.png'), 1))
+            DatasetIngestor(chunk_size=2).ingest(dataset.id, items)
+
+            db.session.refresh(dataset)
+            self.assertEqual(dataset.file_counts(), {'train': 3, 'val': 1, 'test': 0})
+            self.assertEqual(dataset.file_bytes()['val'], os.path.getsize(items[-1][2]))
+
+            # First scan agrees with the incremental counts and records the directory mtimes
+            self.assertEqual(DatasetStatsReconciler().reconcile_all(), {})
+
+            # Unchanged directories are not listed again
+            with mock.patch('app.services.dataset_stats.scan_dataset_splits') as scan:
+                self.assertEqual(reconcile(dataset), [])
+                scan.assert_not_called()
+
+            # Files removed behind the application's back are detected through the mtime
+            os.remove(items[0][2])
+            self._image('test', 'new.png')
+            os.utime(os.path.join(self.path, 'images', 'train'), ns=(1, 1))
+            self.assertEqual(DatasetStatsReconciler().reconcile_all(), {dataset.id: ['train', 'test']})
+            self.assertEqual(db.session.get(Dataset, dataset.id).file_counts(), {'train': 2, 'val': 1, 'test': 1})
+
+    def test_every_accepted_image_format_is_counted_by_the_scan(self):
+        with self.app.app_context():
+            dataset = Dataset(name=f'ds-{uuid.uuid4().hex[:8]}', path=self.path, nc=1)
+            db.session.add(dataset)
+            db.session.commit()
+
+            items = [('train', 'image', self._image('train', name), 1) for name in ('a.webp', 'b.tif', 'c.jpg')]
+            # PIL opens GIFs, but they are not a training format: rejected instead of counted
+            items.append(('train', 'image', self._image('train', 'd.gif'), 1))
+            self.assertEqual(DatasetIngestor().ingest(dataset.id, items), 3)
+
+            self.assertEqual(db.session.get(Dataset, dataset.id).file_counts()['train'], 3)
+            self.assertEqual(DatasetStatsReconciler().reconcile_all(), {})
+
+    def test_list_endpoint_does_no_filesystem_io(self):
+        with self.app.app_context():
+            dataset = Dataset(name=f'ds-{uuid.uuid4().hex[:8]}', path=self.path, nc=1)
+            dataset.add_split_stats({'train': (5, 500)})
+            db.session.add(dataset)
+            db.session.commit()
+
+        client = self.app.test_client()
+        with mock.patch('os.scandir') as scandir, mock.patch('os.listdir') as listdir:
+            response = client.get('/api/datasets')
+            scandir.assert_not_called()
+            listdir.assert_not_called()
+
+        listed = response.json['datasets'][0]
+        self.assertEqual(listed['file_counts'], {'train': 5, 'val': 0, 'test': 0})
+        self.assertEqual(listed['file_bytes']['train'], 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
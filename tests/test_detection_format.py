@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+from app.services.infer import InferenceService, extract_detections
+
+NAMES = {0: 'person', 1: 'car', 2: 'dog'}
+
+
+def make_result(rows):
+    image = np.zeros((100, 200, 3), dtype=np.uint8)
+    boxes = torch.tensor(rows, dtype=torch.float32).reshape(-1, 6)
+    return Results(image, path=None, names=NAMES, boxes=boxes)
+
+
+class PathModel:
+    names = NAMES
+
+    def __call__(self, source, **kwargs):
+        return [make_result([[10, 20, 30, 40, 0.9, 1], [0, 0, 5, 5, 0.3, 2]])]
+
+
+class TestDetectionFormat(unittest.TestCase):
+    def test_compact_rows_match_full_dicts(self):
+        result = make_result([[10.5, 20, 30, 40.25, 0.9, 1], [0, 0, 5, 5, 0.3, 2], [1, 2, 3, 4, 0.5, 0]])
+
+        full = extract_detections(result, 'full')
+        compact = extract_detections(result, 'compact')
+
+        self.assertEqual(len(full), len(compact))
+        for row, detection in zip(compact, full):
+            x1, y1, x2, y2, confidence, class_id = row
+            self.assertEqual([x1, y1, x2, y2], detection['bbox'])
+            self.assertEqual(confidence, detection['confidence'])
+            self.assertEqual(class_id, detection['class'])
+            self.assertEqual(result.names[class_id], detection['class_name'])
+        self.assertEqual(extract_detections(make_result([]), 'compact'), [])
+
+    def test_image_results_carry_class_names_only_when_compact(self):
+        service = InferenceService(models=object(), exporter=object())
+        with tempfile.TemporaryDirectory() as tmpdir:
+            image_path = os.path.join(tmpdir, 'a.jpg')
+            cv2.imwrite(image_path, np.zeros((100, 200, 3), dtype=np.uint8))
+
+            compact = service._process_image(PathModel(), image_path, tmpdir, 0.25, 0.45, 64,
+                                             detection_format='compact', output_mode='detections_only')
+            full = service._process_image(PathModel(), image_path, tmpdir, 0.25, 0.45, 64,
+                                          output_mode='detections_only')
+
+        self.assertEqual(compact['class_names'], NAMES)
+        self.assertEqual(compact['detections'][0], [10.0, 20.0, 30.0, 40.0, compact['detections'][0][4], 1])
+        self.assertNotIn('class_names', full)
+        self.assertEqual(full['detections'][0]['class_name'], 'car')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import gc
+import tempfile
+import unittest
+import weakref
+from unittest import mock
+
+import numpy as np
+
+from app.services.detections_store import DetectionReader, DetectionWriter
+
+
+class TestDetectionsStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.directory = self.tmpdir.name
+
+        with DetectionWriter(self.directory, {0: 'person', 1: 'car'}) as writer:
+            # Frame 0: two boxes, frame 5: none, frame 10: one box
+            writer.append(0, [[0, 0, 10, 10], [5, 5, 20, 20]], [0.9, 0.5], [0, 1])
+            writer.append(5, np.empty((0, 4)), [], [])
+            writer.append(10, [[1, 2, 3, 4]], [0.75], [1])
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_totals(self):
+        reader = DetectionReader(self.directory)
+        self.assertTrue(DetectionReader.exists(self.directory))
+        self.assertEqual(reader.total_frames, 3)
+        self.assertEqual(reader.total_rows, 3)
+
+    def test_read_full_range(self):
+        page = DetectionReader(self.directory).read(0, 10)
+
+        self.assertEqual([frame['frame'] for frame in page], [0, 5, 10])
+        self.assertEqual([frame['detection_count'] for frame in page], [2, 0, 1])
+        first = page[0]['detections'][0]
+        self.assertEqual(first['bbox'], [0.0, 0.0, 10.0, 10.0])
+        self.assertEqual(first['class_name'], 'person')
+        self.assertAlmostEqual(first['confidence'], 0.9, places=4)
+
+    def test_read_slice_and_compact_format(self):
+        page = DetectionReader(self.directory).read(1, 2, compact=True)
+
+        self.assertEqual([frame['frame'] for frame in page], [5, 10])
+        self.assertEqual(page[0]['detections'], [])
+        self.assertEqual(page[1]['detections'], [[1.0, 2.0, 3.0, 4.0, 0.75, 1]])
+
+    def test_close_releases_every_map(self):
+        maps = []
+        memmap = np.memmap
+
+        def tracked(*args, **kwargs):
+            mapped = memmap(*args, **kwargs)
+            maps.append(weakref.ref(mapped))
+            return mapped
+
+        with mock.patch('app.services.detections_store.np.memmap', side_effect=tracked):
+            with DetectionReader(self.directory) as reader:
+                page = reader.read(0, 10, compact=True)
+
+        gc.collect()
+        self.assertTrue(maps)
+        self.assertEqual([ref for ref in maps if ref() is not None], [])
+        self.assertEqual(page[2]['detections'], [[1.0, 2.0, 3.0, 4.0, 0.75, 1]])
+
+    def test_out_of_range_is_empty(self):
+        self.assertEqual(DetectionReader(self.directory).read(3, 10), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
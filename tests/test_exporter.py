@@ -0,0 +1,137 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from app.services.exporter import EXPORT_FORMATS, ExportService, compare_detections
+
+
+def _detections(boxes, conf, cls):
+    return np.array(boxes, dtype=np.float32).reshape(-1, 4), np.array(conf, dtype=np.float32), np.array(cls)
+
+
+class TestCompareDetections(unittest.TestCase):
+    def test_matches_same_class_overlapping_boxes(self):
+        reference = _detections([[0, 0, 10, 10], [20, 20, 40, 40]], [0.9, 0.8], [0, 1])
+        candidate = _detections([[21, 20, 40, 41], [0, 0, 10, 11]], [0.75, 0.92], [1, 0])
+
+        comparison = compare_detections(reference, candidate)
+
+        self.assertEqual(comparison['matched'], 2)
+        self.assertAlmostEqual(max(comparison['conf_deltas']), 0.05, places=5)
+
+    def test_class_mismatch_is_not_matched(self):
+        reference = _detections([[0, 0, 10, 10]], [0.9], [0])
+        candidate = _detections([[0, 0, 10, 10]], [0.9], [3])
+
+        self.assertEqual(compare_detections(reference, candidate)['matched'], 0)
+
+    def test_each_candidate_matches_once(self):
+        reference = _detections([[0, 0, 10, 10], [0, 0, 10, 10]], [0.9, 0.8], [0, 0])
+        candidate = _detections([[0, 0, 10, 10]], [0.9], [0])
+
+        self.assertEqual(compare_detections(reference, candidate)['matched'], 1)
+
+
+class FakeYOLO:
+    """Writes a placeholder artifact next to the weights, like ultralytics' exporter"""
+
+    exports = []
+
+    def __init__(self, weights):
+        self.weights = weights
+
+    def export(self, format, imgsz, **kwargs):
+        FakeYOLO.exports.append((format, imgsz))
+        base = os.path.splitext(self.weights)[0]
+        content = f'graph {imgsz} #{len(FakeYOLO.exports)}'
+        if format == 'openvino':
+            os.makedirs(base + '_openvino_model')
+            with open(os.path.join(base + '_openvino_model', os.path.basename(base) + '.xml'), 'w') as f:
+                f.write(content)
+        else:
+            with open(base + EXPORT_FORMATS[format]['suffix'], 'w') as f:
+                f.write(content)
+
+
+class TestExportService(unittest.TestCase):
+    def setUp(self):
+        FakeYOLO.exports = []
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.tmpdir.name, 'best.pt')
+        with open(self.model_path, 'wb') as f:
+            f.write(b'weights')
+        self.exporter = ExportService(models=mock.Mock())
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_artifacts_live_next_to_checkpoint(self):
+        self.assertEqual(self.exporter.artifact_path(self.model_path, 'onnx'),
+                         os.path.join(self.tmpdir.name, 'best.onnx'))
+        self.assertEqual(self.exporter.artifact_path(self.model_path, 'openvino', 640),
+                         os.path.join(self.tmpdir.name, 'best_640_openvino_model'))
+
+    def test_artifact_older_than_checkpoint_is_stale(self):
+        artifact = self.exporter.artifact_path(self.model_path, 'onnx')
+        with open(artifact, 'wb') as f:
+            f.write(b'graph')
+        self.assertTrue(self.exporter.is_fresh(self.model_path, 'onnx'))
+
+        # Retraining overwrites best.pt after the export
+        later = time.time() + 10
+        os.utime(self.model_path, (later, later))
+        self.assertFalse(self.exporter.is_fresh(self.model_path, 'onnx'))
+
+    def test_dynamic_export_serves_every_size(self):
+        with mock.patch('ultralytics.YOLO', FakeYOLO):
+            first = self.exporter.resolve(self.model_path, 'onnx', 640)
+            second = self.exporter.resolve(self.model_path, 'onnx', 320)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(FakeYOLO.exports), 1)
+        self.assertEqual(sorted(os.listdir(self.tmpdir.name)), ['best.exports.json', 'best.onnx', 'best.pt'])
+
+    def test_static_exports_get_one_artifact_per_size(self):
+        with mock.patch('ultralytics.YOLO', FakeYOLO):
+            path_640, _ = self.exporter.resolve(self.model_path, 'torchscript', 640)
+            with open(path_640, 'rb') as f:
+                before = f.read()
+            path_320, entry = self.exporter.resolve(self.model_path, 'openvino', 320)
+            self.exporter.resolve(self.model_path, 'torchscript', 320)
+            self.exporter.resolve(self.model_path, 'torchscript', 640)
+
+        self.assertEqual(len(FakeYOLO.exports), 3)
+        with open(path_640, 'rb') as f:
+            self.assertEqual(f.read(), before)
+        self.assertEqual(entry['img_size'], 320)
+        self.assertTrue(os.path.exists(os.path.join(path_320, 'best.xml')))
+        listed = [(e['format'], e.get('img_size'), e['available']) for e in self.exporter.list_exports(self.model_path)]
+        self.assertEqual(listed, [('onnx', None, False), ('openvino', 320, True),
+                                  ('torchscript', 640, True), ('torchscript', 320, True)])
+
+    def test_forced_export_replaces_the_artifact_without_writing_in_place(self):
+        with mock.patch('ultralytics.YOLO', FakeYOLO):
+            path, _ = self.exporter.resolve(self.model_path, 'openvino', 640)
+            stale = os.path.join(path, 'best.xml')
+            with open(stale) as reader:
+                self.exporter.export(self.model_path, 'openvino', 640, force=True)
+                self.assertEqual(reader.read(), 'graph 640 #1')
+
+        with open(os.path.join(path, 'best.xml')) as f:
+            self.assertEqual(f.read(), 'graph 640 #2')
+        self.assertEqual([name for name in os.listdir(self.tmpdir.name) if name.startswith('.')], [])
+
+    def test_pytorch_backend_uses_checkpoint(self):
+        self.assertEqual(self.exporter.resolve(self.model_path, 'pytorch'), (self.model_path, None))
+
+    def test_unknown_format_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.exporter.export(self.model_path, 'tflite')
+
+
+if __name__ == '__main__':
+    unittest.main()
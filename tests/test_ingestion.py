@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+import uuid
+
+from PIL import Image
+
+from app import create_app, db
+from app.models import Dataset, DatasetFile
+from app.services.ingestion import DatasetIngestor
+
+
+class TestDatasetIngestor(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self._database_url = os.environ.get('DATABASE_URL')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(self.tmpdir.name, 'ingest.db')
+        self.app = create_app()
+
+        with self.app.app_context():
+            dataset = Dataset(name=f'ds-{uuid.uuid4().hex[:8]}', path=self.tmpdir.name, nc=2,
+                              ingest_status='processing')
+            db.session.add(dataset)
+            db.session.commit()
+            self.dataset_id = dataset.id
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        if self._database_url is None:
+            os.environ.pop('DATABASE_URL', None)
+        else:
+            os.environ['DATABASE_URL'] = self._database_url
+        self.tmpdir.cleanup()
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def _items(self):
+        items = []
+        for index in range(3):
+            path = os.path.join(self.tmpdir.name, f'img{index}.png')
+            Image.new('RGB', (16, 16)).save(path)
+            items.append(('train', 'image', path, 2))
+        items.append(('train', 'image', self._write('broken.jpg', 'not an image'), 2))
+        items.append(('val', 'label', self._write('ok.txt', '1 0.5 0.5 0.2 0.2\n'), 2))
+        items.append(('val', 'label', self._write('bad.txt', '2 0.5 0.5 0.2 0.2\n'), 2))
+        return items
+
+    def test_chunked_ingestion_records_valid_files(self):
+        items = self._items()
+        with self.app.app_context():
+            accepted = DatasetIngestor(chunk_size=2).ingest(self.dataset_id, items)
+            self.assertEqual(accepted, 4)
+
+            files = DatasetFile.query.filter_by(dataset_id=self.dataset_id).all()
+            self.assertEqual(sorted(os.path.basename(f.file_path) for f in files),
+                             ['img0.png', 'img1.png', 'img2.png', 'ok.txt'])
+
+            progress = db.session.get(Dataset, self.dataset_id).ingest_progress()
+            self.assertEqual((progress['status'], progress['done'], progress['rejected']), ('ready', 6, 2))
+
+        # Invalid uploads are removed from disk
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir.name, 'broken.jpg')))
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir.name, 'bad.txt')))
+
+    def test_background_ingestion_uses_a_process_pool(self):
+        ingestor = DatasetIngestor(workers=2, chunk_size=2)
+        ingestor.start(self.app, self.dataset_id, self._items())
+        ingestor._threads[self.dataset_id].join(60)
+        self.assertFalse(ingestor.is_running(self.dataset_id))
+
+        with self.app.app_context():
+            self.assertEqual(DatasetFile.query.filter_by(dataset_id=self.dataset_id).count(), 4)
+            self.assertEqual(db.session.get(Dataset, self.dataset_id).ingest_status, 'ready')
+
+    def test_failed_ingestion_is_reported(self):
+        def broken_map(fn, items):
+            yield fn(items[0])
+            raise RuntimeError('pool died')
+
+        with self.app.app_context():
+            with self.assertRaises(RuntimeError):
+                DatasetIngestor().ingest(self.dataset_id, self._items(), broken_map)
+
+            progress = db.session.get(Dataset, self.dataset_id).ingest_progress()
+            self.assertEqual(progress['status'], 'failed')
+            self.assertEqual(progress['error'], 'pool died')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from app import create_app, db
+from app.models import Test
+from app.services.jobs import LocalInferenceQueue, create_inference_queue
+
+
+class BlockingInference:
+    """Fake InferenceService that records the order of jobs and holds each one until released"""
+
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Semaphore(0)
+        self.release = threading.Event()
+
+    def run_inference(self, model_path, source_type, input_path, test_id, cancel_event=None, **kwargs):
+        self.calls.append(test_id)
+        self.started.release()
+        while not self.release.wait(0.01):
+            if cancel_event is not None and cancel_event.is_set():
+                return {'success': False, 'canceled': True, 'error': 'Inference was canceled'}
+        return {'success': True, 'results': {'model': model_path}}
+
+
+class TestInferenceQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self._database_url = os.environ.get('DATABASE_URL')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(self.tmpdir.name, 'jobs.db')
+        self.app = create_app()
+        self.inference = BlockingInference()
+        self.queue = LocalInferenceQueue(self.inference, workers=1)
+
+    def tearDown(self):
+        self.inference.release.set()
+        self._wait_for(lambda: self.queue.stats()['pending'] + self.queue.stats()['running'] == 0)
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        if self._database_url is None:
+            os.environ.pop('DATABASE_URL', None)
+        else:
+            os.environ['DATABASE_URL'] = self._database_url
+        self.tmpdir.cleanup()
+
+    def _test(self, model_path, status='queued'):
+        with self.app.app_context():
+            test = Test(source='image', input_path='in.jpg', model_path=model_path, status=status)
+            db.session.add(test)
+            db.session.commit()
+            return test.id
+
+    def _submit(self, model_path):
+        test_id = self._test(model_path)
+        self.queue.submit(self.app, test_id, model_path)
+        return test_id
+
+    def _tests(self, *test_ids):
+        with self.app.app_context():
+            return [db.session.get(Test, test_id) for test_id in test_ids]
+
+    def _wait_for(self, condition, timeout=5):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if condition():
+                return True
+            time.sleep(0.01)
+        return False
+
+    def _finished(self, *test_ids):
+        return lambda: all(t.status in ('completed', 'failed', 'canceled') for t in self._tests(*test_ids))
+
+    def test_jobs_on_the_same_model_are_coalesced(self):
+        first = self._submit('a.pt')
+        self.assertTrue(self.inference.started.acquire(timeout=5))
+        other = self._submit('b.pt')
+        same = self._submit('a.pt')
+
+        self.inference.release.set()
+        self.assertTrue(self._wait_for(self._finished(first, other, same)))
+        self.assertEqual(self.inference.calls, [first, same, other])
+        self.assertEqual([t.status for t in self._tests(first, other, same)], ['completed'] * 3)
+
+    def test_queued_tests_get_positions_and_start_estimates(self):
+        running = self._submit('a.pt')
+        self.assertTrue(self.inference.started.acquire(timeout=5))
+        second, third = self._submit('b.pt'), self._submit('c.pt')
+
+        running_test, second_test, third_test = self._tests(running, second, third)
+        self.assertEqual(running_test.status, 'running')
+        self.assertIsNone(running_test.queue_position)
+        self.assertEqual((second_test.queue_position, third_test.queue_position), (1, 2))
+        self.assertLess(second_test.estimated_start_at, third_test.estimated_start_at)
+        self.assertEqual(self.queue.stats()['pending'], 2)
+
+    def test_cancel_queued_and_running_tests(self):
+        running = self._submit('a.pt')
+        self.assertTrue(self.inference.started.acquire(timeout=5))
+        queued = self._submit('a.pt')
+
+        self.assertTrue(self.queue.cancel(queued))
+        self.assertTrue(self.queue.cancel(running))
+        self.assertFalse(self.queue.cancel(12345))
+
+        self.assertTrue(self._wait_for(self._finished(running, queued)))
+        self.assertEqual([t.status for t in self._tests(running, queued)], ['canceled', 'canceled'])
+        self.assertEqual(self.inference.calls, [running])
+
+    def test_recover_interrupted_fails_running_and_requeues_queued(self):
+        running = self._test('a.pt', status='running')
+        queued = self._test('a.pt', status='queued')
+        self.inference.release.set()
+
+        with self.app.app_context():
+            self.assertEqual(self.queue.recover_interrupted(), 1)
+
+        self.assertTrue(self._wait_for(self._finished(queued)))
+        running_test, queued_test = self._tests(running, queued)
+        self.assertEqual((running_test.status, queued_test.status), ('failed', 'completed'))
+        self.assertIn('error', running_test.get_metrics())
+
+    def test_redis_backend_requires_explicit_opt_in(self):
+        with mock.patch.dict(os.environ, {'REDIS_URL': 'redis://localhost:6379/0'}):
+            os.environ.pop('INFERENCE_QUEUE_BACKEND', None)
+            self.assertEqual(create_inference_queue(self.inference).backend, 'local')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+
+from app.services.label_validation import (
+    parse_kpt_shape, validate_label_directories, validate_label_files, validate_label_text
+)
+
+
+class TestLabelValidation(unittest.TestCase):
+    def test_detect_errors_are_reported_per_line(self):
+        text = ('0 0.5 0.5 0.2 0.2\n'
+                '\n'
+                '1 0.5 1.5 0.2 0.2\n'
+                '3 0.1 0.1 0.1 0.1\n'
+                '0 0.1 x 0.1 0.1\n'
+                '0 0.1 0.1\n'
+                '0.5 0.1 0.1 0.1 0.1\n'
+                '0 nan 0.1 0.1 0.1\n'
+                '1 0.1 0.1 0.2 0.1 0.2 0.2\n')
+        errors = validate_label_text(text, num_classes=2)
+
+        self.assertEqual([error['line'] for error in errors], [3, 4, 5, 6, 7, 8])
+        self.assertIn('column 3 outside [0, 1]', errors[0]['error'])
+        self.assertIn('class 3', errors[1]['error'])
+        self.assertIn("'x' at column 3", errors[2]['error'])
+        self.assertIn('found 3', errors[3]['error'])
+        self.assertEqual(validate_label_text('', 2), [])
+
+    def test_segment_and_pose_formats(self):
+        polygon = '0 0.1 0.1 0.2 0.1 0.2 0.2\n'
+        self.assertEqual(validate_label_text(polygon, 1, 'segment'), [])
+        self.assertEqual(validate_label_text('0 0.5 0.5 0.2 0.2\n', 1, 'segment')[0]['line'], 1)
+
+        kpt_shape = parse_kpt_shape('2,3')
+        pose = ('0 0.5 0.5 0.2 0.2 0.1 0.1 2 0.2 0.2 0\n'
+                '0 0.5 0.5 0.2 0.2 0.1 0.1 2 0.2 0.2 3\n'
+                '0 0.5 0.5 0.2 0.2 0.1 0.1\n')
+        errors = validate_label_text(pose, 1, 'pose', kpt_shape)
+        self.assertEqual([error['line'] for error in errors], [2, 3])
+        self.assertIn('visibility 3', errors[0]['error'])
+        self.assertIn('expected 11 values', errors[1]['error'])
+
+        with self.assertRaises(ValueError):
+            parse_kpt_shape('17,4')
+
+    def test_batches_map_errors_back_to_files(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            contents = {
+                'a.txt': '0 0.5 0.5 0.2 0.2\n0 0.5 0.5 0.2 0.2',
+                'b.txt': '0 0.5 0.5 0.2 0.2\n\n0 2 0.5 0.2 0.2\n',
+                'c.txt': '',
+                'd.txt': '5 0.5 0.5 0.2 0.2\n',
+            }
+            for name, content in contents.items():
+                with open(os.path.join(tmpdir, name), 'w') as f:
+                    f.write(content)
+            paths = [os.path.join(tmpdir, name) for name in sorted(contents)]
+
+            results = validate_label_files(paths, num_classes=1)
+            self.assertEqual(results[paths[0]], [])
+            self.assertEqual([error['line'] for error in results[paths[1]]], [3])
+            self.assertEqual(results[paths[2]], [])
+            self.assertEqual([error['line'] for error in results[paths[3]]], [1])
+
+            report = validate_label_directories([tmpdir, os.path.join(tmpdir, 'missing')], 1, workers=2)
+            self.assertEqual((report['files'], report['invalid_files']), (4, 2))
+            self.assertEqual(sorted(report['errors']), [paths[1], paths[3]])
+
+
+if __name__ == '__main__':
+    unittest.main()
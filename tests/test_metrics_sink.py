@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+import uuid
+from unittest import mock
+
+from app import create_app, db
+from app.models import Dataset, Training, TrainingMetric
+from app.services.metrics_sink import MetricsSink
+
+
+class TestMetricsSink(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self._database_url = os.environ.get('DATABASE_URL')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(self.tmpdir.name, 'metrics.db')
+        self.app = create_app()
+
+        with self.app.app_context():
+            dataset = Dataset(name=f'ds-{uuid.uuid4().hex[:8]}', path=self.tmpdir.name)
+            db.session.add(dataset)
+            db.session.flush()
+            training = Training(dataset_id=dataset.id, epochs=3)
+            db.session.add(training)
+            db.session.commit()
+            self.training_id = training.id
+
+        self.sink = MetricsSink(flush_interval=0.05)
+        self.sink.start(self.app)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        if self._database_url is None:
+            os.environ.pop('DATABASE_URL', None)
+        else:
+            os.environ['DATABASE_URL'] = self._database_url
+        self.tmpdir.cleanup()
+
+    def test_epochs_are_written_and_emitted_once_each(self):
+        with mock.patch('app.services.metrics_sink.socketio') as socketio, self.app.app_context():
+            training = db.session.get(Training, self.training_id)
+            self.sink.log(self.training_id, 'warming up')
+            for epoch in range(1, 4):
+                self.sink.record_epoch(training, epoch, {'train/box_loss': 1.0 / epoch, 'metrics/mAP50': 0.1 * epoch})
+            self.assertTrue(self.sink.flush(timeout=5))
+
+            rows = TrainingMetric.query.filter_by(training_id=self.training_id).order_by(TrainingMetric.epoch).all()
+            self.assertEqual([row.epoch for row in rows], [1, 2, 3])
+            self.assertAlmostEqual(rows[1].loss, 0.5)
+
+            events = [call.args for call in socketio.emit.call_args_list]
+            self.assertEqual([name for name, _ in events], ['training_epoch'] * 3)
+            first = events[0][1]
+            self.assertEqual([entry['message'] for entry in first['logs']][0], 'warming up')
+            self.assertEqual(len(first['logs']), 2)
+
+    def test_immediate_logs_are_kept_in_history(self):
+        with mock.patch('app.services.metrics_sink.socketio') as socketio:
+            self.sink.log(self.training_id, 'started', immediate=True)
+        socketio.emit.assert_called_once()
+        self.assertEqual(self.sink.recent_logs(self.training_id)[0]['message'], 'started')
+
+    def test_flush_emits_logs_that_no_epoch_followed(self):
+        with mock.patch('app.services.metrics_sink.socketio') as socketio, self.app.app_context():
+            training = db.session.get(Training, self.training_id)
+            self.sink.record_epoch(training, 3, {'metrics/mAP50': 0.3})
+            self.sink.log(self.training_id, 'stopping rule fired', level='warning')
+            self.assertTrue(self.sink.flush(timeout=5))
+
+            events = [call.args for call in socketio.emit.call_args_list]
+            self.assertEqual([name for name, _ in events], ['training_epoch', 'training_log'])
+            self.assertEqual(events[1][1]['message'], 'stopping rule fired')
+
+            # Nothing is emitted twice
+            self.assertTrue(self.sink.flush(timeout=5))
+            self.assertEqual(socketio.emit.call_count, 2)
+
+        self.sink.forget(self.training_id)
+        self.assertEqual(self.sink.recent_logs(self.training_id), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from app.services.model_cache import ModelCache
+
+
+class FakeModel:
+    def __init__(self, path, device):
+        self.path = path
+        self.device = device
+
+
+class TestModelCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.loads = []
+
+        def loader(path, device):
+            self.loads.append((path, device))
+            return FakeModel(path, device)
+
+        self.cache = ModelCache(max_models=2, max_bytes=0, loader=loader)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _checkpoint(self, name, payload=b'weights'):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'wb') as file_obj:
+            file_obj.write(payload)
+        return path
+
+    def test_hits_reuse_loaded_model(self):
+        path = self._checkpoint('a.pt')
+
+        first = self.cache.get(path)
+        with self.cache.use(path) as second:
+            self.assertIs(first, second.wrapped)
+            self.assertEqual(second.path, path)
+
+        stats = self.cache.stats()
+        self.assertEqual(len(self.loads), 1)
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_concurrent_jobs_share_a_model_and_serialise_each_call(self):
+        path = self._checkpoint('a.pt')
+        calls = {'active': 0, 'overlaps': 0, 'count': 0}
+        guard = threading.Lock()
+
+        def predict(*args, **kwargs):
+            with guard:
+                calls['active'] += 1
+                calls['overlaps'] += calls['active'] > 1
+            time.sleep(0.005)
+            with guard:
+                calls['active'] -= 1
+                calls['count'] += 1
+
+        self.cache.get(path).__class__.__call__ = predict
+        first_job_inside = threading.Event()
+        second_job_done = threading.Event()
+
+        def first_job():
+            with self.cache.use(path) as model:
+                model()
+                first_job_inside.set()
+                # Still borrowing the model: the other job must not wait for this block
+                self.assertTrue(second_job_done.wait(5))
+                model()
+
+        def second_job():
+            self.assertTrue(first_job_inside.wait(5))
+            with self.cache.use(path) as model:
+                for _ in range(5):
+                    model()
+            second_job_done.set()
+
+        threads = [threading.Thread(target=first_job), threading.Thread(target=second_job)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+
+        self.assertEqual(calls['count'], 7)
+        self.assertEqual(calls['overlaps'], 0)
+
+    def test_device_is_part_of_key(self):
+        path = self._checkpoint('a.pt')
+
+        self.assertIsNot(self.cache.get(path, 'cpu'), self.cache.get(path, 'cuda:0'))
+        self.assertEqual(self.cache.stats()['size'], 2)
+
+    def test_lru_eviction_respects_count_budget(self):
+        a, b, c = (self._checkpoint(name) for name in ('a.pt', 'b.pt', 'c.pt'))
+
+        self.cache.get(a)
+        self.cache.get(b)
+        self.cache.get(a)  # a becomes most recently used
+        self.cache.get(c)
+
+        stats = self.cache.stats()
+        cached_paths = {entry['path'] for entry in stats['entries']}
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(cached_paths, {os.path.realpath(a), os.path.realpath(c)})
+
+    def test_changed_checkpoint_evicts_stale_entry(self):
+        path = self._checkpoint('a.pt')
+        stale = self.cache.get(path)
+
+        time.sleep(0.01)
+        self._checkpoint('a.pt', b'retrained weights')
+        fresh = self.cache.get(path)
+
+        stats = self.cache.stats()
+        self.assertIsNot(stale, fresh)
+        self.assertEqual(stats['stale_evictions'], 1)
+        self.assertEqual(stats['size'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
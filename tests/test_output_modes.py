@@ -0,0 +1,108 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+from app.services.infer import InferenceCanceled, InferenceService, THUMBNAIL_SIZE
+
+
+class NoiseModel:
+    """Fake model returning one box on the decoded image (noise keeps JPEG sizes quality-dependent)"""
+
+    names = {0: 'object'}
+
+    def __call__(self, source, **kwargs):
+        frames = [cv2.imread(source)] if isinstance(source, str) else source
+        boxes = torch.tensor([[5, 5, 50, 50, 0.9, 0]], dtype=torch.float32)
+        return [Results(frame, path=None, names=self.names, boxes=boxes) for frame in frames]
+
+
+class TestOutputModes(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.input_dir = os.path.join(self.tmpdir.name, 'input')
+        os.makedirs(self.input_dir)
+        rng = np.random.default_rng(0)
+        for name in ('a.jpg', 'b.png'):
+            cv2.imwrite(os.path.join(self.input_dir, name), rng.integers(0, 255, (480, 800, 3), dtype=np.uint8))
+        self.service = InferenceService(models=object(), exporter=object())
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _image(self, mode, quality=95):
+        output_dir = os.path.join(self.tmpdir.name, f'{mode}-{quality}')
+        os.makedirs(output_dir)
+        return self.service._process_image(NoiseModel(), os.path.join(self.input_dir, 'a.jpg'), output_dir,
+                                           0.25, 0.45, 64, output_mode=mode, output_quality=quality)
+
+    def _directory(self, mode):
+        output_dir = os.path.join(self.tmpdir.name, f'dir-{mode}')
+        return self.service._process_directory(NoiseModel(), self.input_dir, output_dir, 0.25, 0.45, 64,
+                                               batch_size=2, workers=2, output_mode=mode)
+
+    def test_detections_only_renders_nothing(self):
+        result = self._image('detections_only')
+        self.assertIsNone(result['output_path'])
+        self.assertEqual(result['detection_count'], 1)
+        self.assertEqual(os.listdir(os.path.join(self.tmpdir.name, 'detections_only-95')), [])
+
+        summary = self._directory('detections_only')
+        self.assertIsNone(summary['output_dir'])
+        self.assertEqual([r['output_path'] for r in summary['results']], [None, None])
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir.name, 'dir-detections_only', 'annotated_images')))
+
+    def test_canceled_image_writes_no_output(self):
+        cancel_event = threading.Event()
+        image_path = os.path.join(self.input_dir, 'a.jpg')
+        output_dir = os.path.join(self.tmpdir.name, 'canceled')
+        os.makedirs(output_dir)
+
+        class CancelingModel(NoiseModel):
+            def __call__(self, source, **kwargs):
+                cancel_event.set()  # cancel arrives while the model runs
+                return super().__call__(source, **kwargs)
+
+        with self.assertRaises(InferenceCanceled):
+            self.service._process_image(CancelingModel(), image_path, output_dir, 0.25, 0.45, 64,
+                                        output_mode='annotated_jpeg', cancel_event=cancel_event)
+        self.assertEqual(os.listdir(output_dir), [])
+
+        model = mock.Mock(side_effect=AssertionError('model ran after the cancel'))
+        with self.assertRaises(InferenceCanceled):
+            self.service._process_image(model, image_path, output_dir, 0.25, 0.45, 64, cancel_event=cancel_event)
+
+    def test_annotated_jpeg_uses_the_requested_quality(self):
+        high, low = self._image('annotated_jpeg', 95), self._image('annotated_jpeg', 20)
+
+        self.assertTrue(high['output_path'].endswith('annotated_image.jpg'))
+        self.assertEqual(cv2.imread(high['output_path']).shape, (480, 800, 3))
+        self.assertLess(os.path.getsize(low['output_path']), os.path.getsize(high['output_path']))
+
+    def test_annotated_webp(self):
+        result = self._image('annotated_webp')
+        self.assertTrue(result['output_path'].endswith('annotated_image.webp'))
+        with open(result['output_path'], 'rb') as f:
+            header = f.read(12)
+        self.assertEqual((header[:4], header[8:]), (b'RIFF', b'WEBP'))
+
+        summary = self._directory('annotated_webp')
+        self.assertEqual(sorted(os.listdir(summary['output_dir'])), ['annotated_a.jpg.webp', 'annotated_b.png.webp'])
+
+    def test_thumbnails_are_scaled_to_the_longest_side(self):
+        result = self._image('thumbnails')
+        self.assertEqual(cv2.imread(result['output_path']).shape[:2], (192, THUMBNAIL_SIZE))
+
+        summary = self._directory('thumbnails')
+        for entry in summary['results']:
+            self.assertEqual(cv2.imread(entry['output_path']).shape[:2], (192, THUMBNAIL_SIZE))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from app.services.preprocess_cache import (
+    CacheReader, CacheTooLarge, build_cache, dataset_fingerprint, is_built, resize_for_training
+)
+
+
+class TestPreprocessCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        self.images = []
+        for index, (h, w) in enumerate([(120, 200), (300, 90), (32, 32)]):
+            path = os.path.join(self.tmpdir.name, f'img{index}.png')
+            cv2.imwrite(path, rng.integers(0, 255, (h, w, 3), dtype=np.uint8))
+            self.images.append(path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _spec(self, images, img_size=64):
+        fingerprint = dataset_fingerprint([('train', path) for path in images], img_size)
+        return {
+            'dir': os.path.join(self.tmpdir.name, 'cache', '1', str(img_size), fingerprint),
+            'fingerprint': fingerprint,
+            'img_size': img_size,
+            'images': images,
+        }
+
+    def test_cached_images_match_the_loader(self):
+        cache_dir = build_cache(self._spec(self.images), workers=2)
+        reader = CacheReader(cache_dir)
+        self.assertEqual(len(reader), 3)
+
+        for path in self.images:
+            expected, hw0 = resize_for_training(cv2.imread(path), 64)
+            image, original = reader.get(reader.slot(path))
+            np.testing.assert_array_equal(image, expected)
+            self.assertEqual(original, hw0)
+            self.assertEqual(max(image.shape[:2]), 64)  # Long side, up- or downscaled
+
+        self.assertIsNone(reader.slot(os.path.join(self.tmpdir.name, 'missing.png')))
+
+        # Spawned dataloader workers receive the reader without its memory maps
+        reader.get(0)
+        copy = pickle.loads(pickle.dumps(reader))
+        self.assertEqual(copy._shards, {})
+        np.testing.assert_array_equal(copy.get(1)[0], reader.get(1)[0])
+
+    def test_reuploaded_file_changes_the_fingerprint(self):
+        before = dataset_fingerprint([('train', path) for path in self.images], 64)
+        # Same name, new pixels (uploads delete and rewrite the file)
+        cv2.imwrite(self.images[0], np.zeros((120, 200, 3), dtype=np.uint8))
+        later = os.path.getmtime(self.images[0]) + 10
+        os.utime(self.images[0], (later, later))
+
+        self.assertNotEqual(dataset_fingerprint([('train', path) for path in self.images], 64), before)
+
+    def test_changed_files_replace_the_old_build(self):
+        old_dir = build_cache(self._spec(self.images[:2]))
+        new_spec = self._spec(self.images)
+        self.assertNotEqual(old_dir, new_spec['dir'])
+
+        new_dir = build_cache(new_spec)
+        self.assertTrue(is_built(new_dir))
+        self.assertFalse(os.path.exists(old_dir))
+
+    def test_oversized_cache_is_abandoned(self):
+        spec = self._spec(self.images)
+        with self.assertRaises(CacheTooLarge):
+            build_cache(spec, max_bytes=1000)
+        self.assertEqual(os.listdir(os.path.dirname(spec['dir'])), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
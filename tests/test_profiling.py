@@ -0,0 +1,49 @@
+import time
+import unittest
+from types import SimpleNamespace
+
+from app.services.profiling import EpochProfiler, profile_summary
+
+
+class TestEpochProfiler(unittest.TestCase):
+    def test_data_wait_and_compute_are_separated(self):
+        trainer = SimpleNamespace(device=SimpleNamespace(type='cpu'),
+                                  train_loader=SimpleNamespace(dataset=list(range(20))))
+        profiler = EpochProfiler()
+
+        profiler.on_train_epoch_start(trainer)
+        for _ in range(2):
+            time.sleep(0.02)  # Waiting on the dataloader
+            profiler.on_train_batch_start(trainer)
+            time.sleep(0.01)  # Forward/backward
+            profiler.on_train_batch_end(trainer)
+        profiler.on_train_epoch_end(trainer)
+        profile = profiler.summary(trainer)
+
+        self.assertGreater(profile['data_time'], profile['compute_time'])
+        self.assertGreaterEqual(profile['compute_time'], 0.02)
+        self.assertGreaterEqual(profile['epoch_time'], profile['data_time'] + profile['compute_time'])
+        self.assertAlmostEqual(profile['images_per_sec'], 20 / profile['train_time'])
+        self.assertIsNone(profile['device_mem_mb'])
+
+    def test_summary_reports_bottleneck(self):
+        epochs = [
+            {'epoch': 1, 'epoch_time': 10.0, 'images_per_sec': 100.0, 'data_time': 6.0, 'compute_time': 3.0,
+             'peak_rss_mb': 900.0, 'device_mem_mb': None},
+            {'epoch': 2, 'epoch_time': 8.0, 'images_per_sec': 120.0, 'data_time': 5.0, 'compute_time': 2.0,
+             'peak_rss_mb': 950.0, 'device_mem_mb': None},
+            {'epoch': 3, 'epoch_time': None},
+        ]
+        summary = profile_summary(epochs)
+
+        self.assertEqual(summary['epochs_profiled'], 2)
+        self.assertEqual(summary['bound'], 'input')
+        self.assertAlmostEqual(summary['avg_images_per_sec'], 110.0)
+        self.assertAlmostEqual(summary['data_fraction'], 11 / 16)
+        self.assertEqual(summary['peak_rss_mb'], 950.0)
+        self.assertIsNone(summary['peak_device_mem_mb'])
+        self.assertIsNone(profile_summary([{'epoch': 1}])['bound'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import time
+import unittest
+
+from app.services.results_csv import load_results
+
+SEGMENT_CSV = (
+    '                  epoch,      train/box_loss,      train/seg_loss,   metrics/precision(B),'
+    '      metrics/recall(B),     metrics/mAP50(B),  metrics/mAP50-95(B),      metrics/mAP50(M),'
+    '   metrics/mAP50-95(M),        val/box_loss\n'
+    '                      1,               1.5,                 2.5,                  0.4,'
+    '                   0.3,                 0.2,                  0.1,                  0.15,'
+    '                  0.05,                 1.6\n'
+    '                      2,               1.2,                 2.0,                  0.5,'
+    '                   0.4,                 0.3,                  0.2,                   0.25,'
+    '                  0.08,                 1.3\n'
+)
+
+CLASSIFY_CSV = (
+    'epoch,train/loss,metrics/accuracy_top1,metrics/accuracy_top5,val/loss\n'
+    '1,2.0,0.6,0.9,2.1\n'
+)
+
+
+class TestResultsCsv(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write(self, content, name='results.csv'):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_segmentation_columns_are_kept(self):
+        table = load_results(self._write(SEGMENT_CSV))
+        metrics = table.api_metrics()
+
+        self.assertEqual([m['epoch'] for m in metrics], [1, 2])
+        self.assertEqual(metrics[1]['map50'], 0.3)
+        self.assertEqual(metrics[1]['extra']['metrics/mAP50(M)'], 0.25)
+        self.assertEqual(metrics[0]['extra']['train/seg_loss'], 2.5)
+
+        rows = table.metric_rows(7)
+        self.assertEqual(rows[0]['training_id'], 7)
+        self.assertEqual(rows[0]['map'], 0.1)
+        self.assertIn('metrics/mAP50-95(M)', rows[0]['extra_json'])
+
+    def test_classification_uses_top1(self):
+        metrics = load_results(self._write(CLASSIFY_CSV, 'cls.csv')).api_metrics()
+
+        self.assertEqual(metrics[0]['loss'], 2.0)
+        self.assertEqual(metrics[0]['val_loss'], 2.1)
+        self.assertEqual(metrics[0]['accuracy'], 0.6)
+        self.assertEqual(metrics[0]['extra']['metrics/accuracy_top5'], 0.9)
+
+    def test_cached_until_file_changes(self):
+        path = self._write(CLASSIFY_CSV, 'cached.csv')
+        first = load_results(path)
+        self.assertIs(load_results(path), first)
+
+        with open(path, 'a') as f:
+            f.write('2,1.0,0.7,0.95,1.1\n')
+        later = time.time() + 5
+        os.utime(path, (later, later))
+
+        refreshed = load_results(path)
+        self.assertIsNot(refreshed, first)
+        self.assertEqual(len(refreshed), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
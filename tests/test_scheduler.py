@@ -0,0 +1,113 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+
+from app import create_app, db
+from app.models import Dataset, Training
+from app.services.scheduler import TrainingScheduler
+
+
+class TestTrainingScheduler(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self._database_url = os.environ.get('DATABASE_URL')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(self.tmpdir.name, 'scheduler.db')
+        self.app = create_app()
+
+        self.release = threading.Event()
+        self.started = []
+
+        def run_job(training_id, device):
+            self.started.append((training_id, device))
+            self.release.wait(5)
+            with self.app.app_context():
+                db.session.get(Training, training_id).status = 'completed'
+                db.session.commit()
+
+        self.scheduler = TrainingScheduler(run_job, pools=['cpu', 'cuda:0'], cpu_slots=1, gpu_slots=1,
+                                           max_concurrent=2)
+
+        with self.app.app_context():
+            dataset = Dataset(name=f'ds-{uuid.uuid4().hex[:8]}', path=self.tmpdir.name)
+            db.session.add(dataset)
+            db.session.flush()
+            self.dataset_id = dataset.id
+
+    def tearDown(self):
+        self.release.set()
+        deadline = time.time() + 5
+        while self.scheduler.running and time.time() < deadline:
+            time.sleep(0.01)
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        if self._database_url is None:
+            os.environ.pop('DATABASE_URL', None)
+        else:
+            os.environ['DATABASE_URL'] = self._database_url
+        self.tmpdir.cleanup()
+
+    def _queue(self, device='auto', priority=0):
+        with self.app.app_context():
+            training = Training(dataset_id=self.dataset_id, device=device, priority=priority, epochs=10)
+            db.session.add(training)
+            db.session.commit()
+            return training.id
+
+    def _wait_for(self, count):
+        deadline = time.time() + 5
+        while len(self.started) < count and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_priority_first_and_slots_per_device(self):
+        low_cpu = self._queue('cpu')
+        high_cpu = self._queue('cpu', priority=5)
+        gpu = self._queue('cuda')
+
+        self.scheduler.submit(self.app, gpu)
+        self._wait_for(2)
+
+        self.assertCountEqual(self.started, [(high_cpu, 'cpu'), (gpu, 0)])
+        self.assertNotIn(low_cpu, self.scheduler.running)
+
+        with self.app.app_context():
+            snapshot = self.scheduler.queue_snapshot()
+        self.assertEqual(snapshot[low_cpu]['queue_position'], 1)
+        self.assertIsNotNone(snapshot[low_cpu]['estimated_start_at'])
+
+    def test_freed_slot_dispatches_next_training(self):
+        first = self._queue('cpu')
+        second = self._queue('cpu')
+
+        self.scheduler.submit(self.app, first)
+        self._wait_for(1)
+        self.assertEqual(self.started, [(first, 'cpu')])
+
+        self.release.set()
+        self._wait_for(2)
+
+        self.assertEqual(self.started[1], (second, 'cpu'))
+
+    def test_zero_max_concurrent_pauses_dispatch_without_etas(self):
+        scheduler = TrainingScheduler(lambda *args: None, pools=['cpu'], max_concurrent=0)
+        first, second = self._queue(), self._queue()
+
+        scheduler.resume(self.app)
+        with self.app.app_context():
+            snapshot = scheduler.queue_snapshot()
+
+        self.assertEqual(scheduler.running, {})
+        self.assertEqual(snapshot, {first: {'queue_position': 1, 'estimated_start_at': None},
+                                    second: {'queue_position': 2, 'estimated_start_at': None}})
+
+    def test_cpu_fallback_without_gpus(self):
+        scheduler = TrainingScheduler(lambda *args: None, pools=['cpu'])
+        self.assertEqual(scheduler.candidate_pools('cuda'), ['cpu'])
+        self.assertEqual(scheduler.candidate_pools('auto'), ['cpu'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import runpy
+import unittest
+from unittest import mock
+
+import app as app_package
+
+RUN_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'run.py')
+
+
+class TestServerStartup(unittest.TestCase):
+    """run.py under the werkzeug reloader: only the serving child may start background work"""
+
+    def setUp(self):
+        self.services = mock.MagicMock()
+        patches = [
+            mock.patch.object(app_package, 'create_app', return_value=mock.MagicMock()),
+            mock.patch.object(app_package.socketio, 'run', self.services.socketio_run),
+            mock.patch('app.routes.trainings.trainer', self.services.trainer),
+            mock.patch('app.routes.datasets.ingestor', self.services.ingestor),
+            mock.patch('app.routes.datasets.stats_reconciler', self.services.stats_reconciler),
+            mock.patch('app.routes.tests.inference_queue', self.services.inference_queue),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _main(self, **env):
+        env = {'DEBUG': 'True', **env}
+        with mock.patch.dict(os.environ, env):
+            if 'WERKZEUG_RUN_MAIN' not in env:
+                os.environ.pop('WERKZEUG_RUN_MAIN', None)
+            runpy.run_path(RUN_PATH, run_name='__main__')
+
+    def _startup_calls(self):
+        return [name for name, _, _ in self.services.mock_calls if name != 'socketio_run']
+
+    def test_reloader_watcher_starts_nothing(self):
+        self._main()
+
+        self.assertEqual(self._startup_calls(), [])
+        self.assertTrue(self.services.socketio_run.call_args.kwargs['use_reloader'])
+
+    def test_reloader_child_reconciles_trainings_before_dispatching(self):
+        self._main(WERKZEUG_RUN_MAIN='true')
+
+        calls = self._startup_calls()
+        self.assertEqual(calls.count('trainer.recover_interrupted'), 1)
+        self.assertLess(calls.index('trainer.recover_interrupted'), calls.index('trainer.scheduler.resume'))
+        self.assertEqual(calls[-1], 'stats_reconciler.start')
+
+    def test_queued_tests_are_resubmitted_by_one_process_only(self):
+        self._main()
+        self.services.inference_queue.recover_interrupted.assert_not_called()
+
+        self._main(WERKZEUG_RUN_MAIN='true')
+        self.services.inference_queue.recover_interrupted.assert_called_once_with()
+
+    def test_without_debug_the_only_process_starts_services(self):
+        self._main(DEBUG='False')
+
+        self.assertIn('trainer.scheduler.resume', self._startup_calls())
+        self.assertFalse(self.services.socketio_run.call_args.kwargs['use_reloader'])
+
+
+if __name__ == '__main__':
+    unittest.main()
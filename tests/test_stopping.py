@@ -0,0 +1,42 @@
+import unittest
+
+from app.services.stopping import StoppingRules, parse_rules
+
+
+class TestStoppingRules(unittest.TestCase):
+    def test_parse_rules(self):
+        rules = parse_rules({'target_map50': '0.85', 'plateau_window': '10', 'max_epoch_seconds': ''})
+        self.assertEqual(rules, {'target_map50': 0.85, 'plateau_window': 10})
+
+        with self.assertRaises(ValueError):
+            parse_rules({'max_loss': 1})
+        with self.assertRaises(ValueError):
+            parse_rules({'plateau_window': 0})
+        with self.assertRaises(ValueError):
+            parse_rules({'plateau_min_delta': 0.01})
+
+    def test_target_map50(self):
+        rules = StoppingRules({'target_map50': 0.8})
+        self.assertIsNone(rules.check(1, 0.5, 0.3))
+        self.assertEqual(rules.check(2, 0.81, 0.4), 'target_map50')
+
+    def test_plateau_on_map(self):
+        rules = StoppingRules({'plateau_window': 3, 'plateau_min_delta': 0.01})
+        history = [0.30, 0.35, 0.355, 0.352, 0.359]
+        reasons = [rules.check(epoch, 0.0, value) for epoch, value in enumerate(history, start=1)]
+        # Best improvement above the delta was epoch 2; three epochs later the run stops
+        self.assertEqual(reasons, [None, None, None, None, 'plateau'])
+
+    def test_time_budgets(self):
+        rules = StoppingRules({'max_epoch_seconds': 60}, deadline=1000.0)
+        self.assertIsNone(rules.check(1, 0.1, 0.1, epoch_seconds=30, now=900.0))
+        self.assertEqual(rules.check(2, 0.1, 0.1, epoch_seconds=90, now=900.0), 'epoch_time_budget')
+        self.assertEqual(rules.check(3, 0.1, 0.1, epoch_seconds=30, now=1000.0), 'time_budget')
+
+    def test_no_rules_never_stop(self):
+        rules = StoppingRules(None)
+        self.assertIsNone(rules.check(100, 1.0, 1.0, epoch_seconds=10_000))
+
+
+if __name__ == '__main__':
+    unittest.main()
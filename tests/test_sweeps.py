@@ -0,0 +1,141 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+
+from app import create_app, db
+from app.models import Dataset, Training, TrainingMetric
+from app.services.scheduler import TrainingScheduler
+from app.services.sweeps import SweepService, expand_search_space, halving_keeps, halving_rungs
+
+
+class TestSearchSpace(unittest.TestCase):
+    def test_grid_is_cartesian_product(self):
+        trials = expand_search_space('grid', {'learning_rate': [0.01, 0.001], 'batch_size': [8, 16, 32]})
+
+        self.assertEqual(len(trials), 6)
+        self.assertIn({'batch_size': 32, 'learning_rate': 0.001}, trials)
+        self.assertEqual(len(expand_search_space('grid', {'batch_size': [8, 16, 32]}, max_trials=2)), 2)
+
+    def test_random_samples_ranges_and_choices(self):
+        space = {'learning_rate': {'min': 1e-4, 'max': 1e-1, 'log': True}, 'img_size': [320, 640]}
+        trials = expand_search_space('random', space, max_trials=10, seed=1)
+
+        self.assertEqual(len(trials), 10)
+        self.assertEqual(trials, expand_search_space('random', space, max_trials=10, seed=1))
+        for trial in trials:
+            self.assertTrue(1e-4 <= trial['learning_rate'] <= 1e-1)
+            self.assertIn(trial['img_size'], (320, 640))
+
+    def test_invalid_spaces_are_rejected(self):
+        with self.assertRaises(ValueError):
+            expand_search_space('grid', {'learning_rate': {'min': 0.001, 'max': 0.1}})
+        with self.assertRaises(ValueError):
+            expand_search_space('grid', {'data': ['a.yaml']})
+        with self.assertRaises(ValueError):
+            expand_search_space('bayesian', {'batch_size': [8]})
+
+    def test_successive_halving(self):
+        self.assertEqual(halving_rungs(1, 3, 30), [1, 3, 9, 27])
+        self.assertEqual(halving_rungs(None, 3, 30), [])
+
+        # Top third of six trials survives
+        self.assertTrue(halving_keeps(0.5, [0.4, 0.1, 0.2, 0.3, 0.05], eta=3))
+        self.assertTrue(halving_keeps(0.4, [0.5, 0.1, 0.2, 0.3, 0.05], eta=3))
+        self.assertFalse(halving_keeps(0.3, [0.5, 0.4, 0.2, 0.1, 0.05], eta=3))
+        # Not enough peers at the rung yet
+        self.assertTrue(halving_keeps(0.0, [0.9], eta=3))
+
+
+class TestSweepService(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self._database_url = os.environ.get('DATABASE_URL')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(self.tmpdir.name, 'sweeps.db')
+        self.app = create_app()
+        self.service = SweepService()
+
+        with self.app.app_context():
+            dataset = Dataset(name=f'ds-{uuid.uuid4().hex[:8]}', path=self.tmpdir.name)
+            db.session.add(dataset)
+            db.session.commit()
+            self.dataset_id = dataset.id
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        if self._database_url is None:
+            os.environ.pop('DATABASE_URL', None)
+        else:
+            os.environ['DATABASE_URL'] = self._database_url
+        self.tmpdir.cleanup()
+
+    def test_trials_are_pruned_and_ranked(self):
+        with self.app.app_context():
+            sweep = self.service.create(
+                db.session.get(Dataset, self.dataset_id), name='lr sweep', strategy='grid',
+                search_space={'learning_rate': [0.1, 0.05, 0.01, 0.005, 0.001]},
+                base_config={'epochs': 20, 'model_version': 'n'}, halving_min_epochs=2
+            )
+            db.session.commit()
+
+            trials = sweep.trainings
+            self.assertEqual(len(trials), 5)
+            self.assertEqual(trials[0].epochs, 20)
+            self.assertEqual(trials[0].get_config()['sweep_params'], {'learning_rate': 0.1})
+
+            for training, map50 in zip(trials[:4], (0.1, 0.4, 0.3, 0.2)):
+                db.session.add(TrainingMetric(training_id=training.id, epoch=2, map50=map50))
+            db.session.commit()
+
+            last = trials[4]
+            self.assertFalse(self.service.should_stop(last, 1, 0.0))  # Not a rung
+            self.assertTrue(self.service.should_stop(last, 2, 0.25))
+            self.assertFalse(self.service.should_stop(last, 2, 0.5))
+
+            leaderboard = self.service.leaderboard(sweep)
+            self.assertEqual(leaderboard[0]['training_id'], trials[1].id)
+            self.assertEqual(leaderboard[0]['params'], {'learning_rate': 0.05})
+            self.assertIsNone(leaderboard[-1]['best_map50'])
+
+            for training in trials:
+                training.status = 'pruned'
+            self.assertEqual(self.service.refresh_status(sweep), 'completed')
+
+    def test_scheduler_respects_sweep_concurrency(self):
+        with self.app.app_context():
+            sweep = self.service.create(
+                db.session.get(Dataset, self.dataset_id), name='batch sweep', strategy='grid',
+                search_space={'batch_size': [4, 8, 16]}, max_concurrent=1
+            )
+            db.session.commit()
+            sweep_id = sweep.id
+
+        release = threading.Event()
+        started = []
+
+        def run_job(training_id, device):
+            started.append(training_id)
+            release.wait(5)
+            with self.app.app_context():
+                db.session.get(Training, training_id).status = 'completed'
+                db.session.commit()
+
+        scheduler = TrainingScheduler(run_job, pools=['cpu'], cpu_slots=3, max_concurrent=3)
+        scheduler.resume(self.app)
+        self.assertEqual(scheduler.sweep_running(sweep_id), 1)
+        self.assertEqual(len(scheduler.running), 1)
+
+        # Finished trials are backfilled one at a time
+        release.set()
+        deadline = time.time() + 10
+        while (len(started) < 3 or scheduler.running) and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(started), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
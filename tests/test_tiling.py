@@ -0,0 +1,56 @@
+import unittest
+
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+from app.services.tiling import nms, predict_tiled, tile_origins, tile_views
+
+
+class CornerModel:
+    """Fake model that reports one box at the top-left corner of every tile"""
+
+    names = {0: 'object'}
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, views, **kwargs):
+        self.batches.append(len(views))
+        boxes = torch.tensor([[0, 0, 20, 20, 0.9, 0]], dtype=torch.float32)
+        return [Results(view, path=None, names=self.names, boxes=boxes) for view in views]
+
+
+class TestTiling(unittest.TestCase):
+    def test_tiles_cover_image_with_full_size_tiles(self):
+        self.assertEqual(tile_origins(1000, 400, 0.25), [0, 300, 600])
+        self.assertEqual(tile_origins(300, 400, 0.25), [0])
+
+    def test_tiles_are_views_of_the_decoded_buffer(self):
+        image = np.zeros((900, 1000, 3), dtype=np.uint8)
+        tiles = tile_views(image, 400, 0.25)
+
+        self.assertEqual(len(tiles), 9)
+        for _, _, view in tiles:
+            self.assertEqual(view.shape, (400, 400, 3))
+            self.assertTrue(np.shares_memory(view, image))
+
+    def test_nms_is_class_aware(self):
+        xyxy = np.array([[0, 0, 10, 10], [1, 1, 10, 10], [0, 0, 10, 10]], dtype=np.float32)
+        keep = nms(xyxy, np.array([0.9, 0.8, 0.7]), np.array([0, 0, 1]), 0.5)
+        self.assertEqual(keep.tolist(), [0, 2])
+
+    def test_boxes_are_offset_into_image_coordinates(self):
+        image = np.zeros((400, 1000, 3), dtype=np.uint8)
+        model = CornerModel()
+
+        result, stats = predict_tiled(model, image, 400, overlap=0.25, batch_size=2)
+
+        self.assertEqual(stats['tiles'], 3)
+        self.assertEqual(model.batches, [2, 1])
+        self.assertEqual(sorted(result.boxes.xyxy[:, 0].tolist()), [0.0, 300.0, 600.0])
+        self.assertEqual(result.orig_shape, (400, 1000))
+
+
+if __name__ == '__main__':
+    unittest.main()
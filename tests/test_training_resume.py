@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+import uuid
+
+from app import create_app, db
+from app.models import Checkpoint, Dataset, Training
+from app.services.storage import StorageService
+from app.services.trainer import TrainingService
+
+
+class TestTrainingRecovery(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self._database_url = os.environ.get('DATABASE_URL')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(self.tmpdir.name, 'resume.db')
+        self.app = create_app()
+        self.trainer = TrainingService(StorageService(os.path.join(self.tmpdir.name, 'data')))
+
+        with self.app.app_context():
+            dataset = Dataset(name=f'ds-{uuid.uuid4().hex[:8]}', path=self.tmpdir.name)
+            db.session.add(dataset)
+            db.session.commit()
+            self.dataset_id = dataset.id
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        if self._database_url is None:
+            os.environ.pop('DATABASE_URL', None)
+        else:
+            os.environ['DATABASE_URL'] = self._database_url
+        self.tmpdir.cleanup()
+
+    def _orphan(self, weights=()):
+        training = Training(dataset_id=self.dataset_id, status='running', epochs=30)
+        db.session.add(training)
+        db.session.commit()
+
+        training.model_dir = os.path.join(self.trainer.storage.models_dir, str(training.id))
+        weights_dir = os.path.join(training.model_dir, 'run', 'weights')
+        os.makedirs(weights_dir)
+        for name in weights:
+            with open(os.path.join(weights_dir, name), 'wb') as f:
+                f.write(b'weights')
+        db.session.commit()
+        return training
+
+    def test_orphaned_trainings_are_reconciled(self):
+        with self.app.app_context():
+            resumable = self._orphan(['last.pt', 'epoch10.pt', 'epoch20.pt'])
+            lost = self._orphan()
+
+            self.trainer.recover_interrupted()
+
+            self.assertEqual(db.session.get(Training, resumable.id).status, 'interrupted')
+            self.assertEqual(db.session.get(Training, lost.id).status, 'failed')
+
+            epochs = sorted(c.epoch for c in Checkpoint.query.filter_by(training_id=resumable.id))
+            self.assertEqual(epochs, [11, 21])
+
+            # Registering again does not duplicate rows
+            self.assertEqual(self.trainer._register_checkpoints(resumable), 0)
+
+    def test_prepare_resume_requeues_with_flag(self):
+        with self.app.app_context():
+            training = self._orphan(['last.pt'])
+            self.trainer.recover_interrupted()
+
+            self.trainer.prepare_resume(training)
+            db.session.commit()
+
+            training = db.session.get(Training, training.id)
+            self.assertEqual(training.status, 'queued')
+            self.assertTrue(training.get_config()['resume'])
+            self.assertTrue(self.trainer.last_checkpoint(training).endswith('last.pt'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import os
+import queue
+import tempfile
+import threading
+import types
+import unittest
+import uuid
+from unittest import mock
+
+import torch
+
+from app import create_app, db
+from app.models import Dataset, Training
+from app.services.storage import StorageService
+from app.services.trainer import TrainingService
+from app.services.training_worker import resume_on_device, run_training_process
+
+
+class FakeProcess:
+    """multiprocessing.Process stand-in that exits only when allowed to"""
+
+    def __init__(self, alive=True, exits_on=None, exitcode=None):
+        self.alive = alive
+        self.exits_on = exits_on
+        self.exitcode = exitcode
+        self.calls = []
+
+    def is_alive(self):
+        return self.alive
+
+    def join(self, timeout=None):
+        self.calls.append('join')
+        if self.exits_on == 'join':
+            self.alive = False
+
+    def terminate(self):
+        self.calls.append('terminate')
+        if self.exits_on == 'terminate':
+            self.alive = False
+
+    def kill(self):
+        self.calls.append('kill')
+        self.alive = False
+
+
+class TestTrainingWorker(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self._database_url = os.environ.get('DATABASE_URL')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(self.tmpdir.name, 'worker.db')
+        self.app = create_app()
+        self.trainer = TrainingService(StorageService(os.path.join(self.tmpdir.name, 'data')))
+        self.trainer.metrics = mock.Mock()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        if self._database_url is None:
+            os.environ.pop('DATABASE_URL', None)
+        else:
+            os.environ['DATABASE_URL'] = self._database_url
+        self.tmpdir.cleanup()
+
+    def _training(self):
+        dataset = Dataset(name=f'ds-{uuid.uuid4().hex[:8]}', path=self.tmpdir.name)
+        db.session.add(dataset)
+        db.session.flush()
+        training = Training(dataset_id=dataset.id, status='running', epochs=10)
+        db.session.add(training)
+        db.session.commit()
+        self.trainer.active_trainings[training.id] = {'control': threading.Event(), 'process': None,
+                                                      'canceled': False, 'pruned': False, 'stopped_epoch': None}
+        return training
+
+    def test_worker_events_are_relayed(self):
+        events = queue.Queue()
+        for message in [('started', {}), ('log', {'message': 'cache pronto'}),
+                        ('metric', {'epoch': 1, 'metrics': {'metrics/mAP50(B)': 0.5}}),
+                        ('stop', {'reason': 'target_map50', 'epoch': 1}), ('completed', {})]:
+            events.put(message)
+
+        with self.app.app_context(), mock.patch('app.services.trainer.socketio') as socketio:
+            training = self._training()
+            outcome = self.trainer._follow_training_process(training, FakeProcess(exits_on='join'), events)
+
+            self.assertEqual(outcome, ('completed', {}))
+            self.assertEqual(socketio.emit.call_args.args[1]['status'], 'running')
+            self.trainer.metrics.record_epoch.assert_called_once_with(training, 1, {'metrics/mAP50(B)': 0.5}, None)
+            self.assertEqual(self.trainer.metrics.log.call_args_list[0].args[1], 'cache pronto')
+            self.assertEqual(db.session.get(Training, training.id).stop_reason, 'target_map50')
+            self.assertEqual(self.trainer.active_trainings[training.id]['stopped_epoch'], 1)
+
+    def test_worker_exit_without_outcome_is_a_failure(self):
+        with self.app.app_context():
+            training = self._training()
+            kind, payload = self.trainer._follow_training_process(
+                training, FakeProcess(alive=False, exitcode=-9), queue.Queue()
+            )
+        self.assertEqual(kind, 'failed')
+        self.assertIn('-9', payload['error'])
+
+    def test_stop_process_escalates_after_the_grace_period(self):
+        graceful = FakeProcess(exits_on='join')
+        self.trainer._stop_process(graceful, grace=0)
+        self.assertEqual(graceful.calls, ['join'])
+
+        terminated = FakeProcess(exits_on='terminate')
+        self.trainer._stop_process(terminated, grace=0)
+        self.assertEqual(terminated.calls, ['join', 'terminate', 'join'])
+
+        stuck = FakeProcess()
+        self.trainer._stop_process(stuck, grace=0)
+        self.assertEqual(stuck.calls, ['join', 'terminate', 'join', 'kill'])
+
+    def test_cancel_before_the_spawn_is_kept(self):
+        with self.app.app_context():
+            training = self._training()
+        self.assertTrue(self.trainer.cancel_training(training.id))
+        self.assertTrue(self.trainer.active_trainings[training.id]['control'].is_set())
+        self.assertFalse(self.trainer.cancel_training(12345))
+
+    def _run_worker(self, yolo, control=None):
+        events = queue.Queue()
+        spec = {'training_id': 1, 'model_name': 'yolov8n.pt', 'train_args': {'data': 'data.yaml'}}
+        original_load = torch.load
+        try:
+            with mock.patch('ultralytics.YOLO', yolo):
+                run_training_process(spec, events, control or threading.Event())
+        finally:
+            torch.load = original_load
+        return [events.get_nowait() for _ in range(events.qsize())]
+
+    def test_worker_reports_failures_with_traceback(self):
+        messages = self._run_worker(mock.Mock(side_effect=ValueError('bad weights')))
+
+        self.assertEqual(len(messages), 1)
+        kind, payload = messages[0]
+        self.assertEqual((kind, payload['error'], payload['error_type']), ('failed', 'bad weights', 'ValueError'))
+        self.assertIn('ValueError: bad weights', payload['traceback'])
+
+    def test_worker_does_not_train_when_canceled_before_start(self):
+        control = threading.Event()
+        control.set()
+        yolo = mock.Mock()
+
+        self.assertEqual(self._run_worker(yolo, control), [('canceled', {})])
+        yolo.return_value.train.assert_not_called()
+
+    def test_resume_keeps_the_assigned_device(self):
+        class CheckpointTrainer:
+            def __init__(self, overrides):
+                self.args = types.SimpleNamespace(device='')
+                self.check_resume(overrides)
+
+            def check_resume(self, overrides):
+                # ultralytics replaces args with the ones stored in last.pt
+                self.args = types.SimpleNamespace(device='0,1')
+                self.resume = True
+
+        trainer = resume_on_device(CheckpointTrainer, 'cpu')({'resume': True, 'device': 'cpu'})
+        self.assertEqual(trainer.args.device, 'cpu')
+
+
+if __name__ == '__main__':
+    unittest.main()
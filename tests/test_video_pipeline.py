@@ -0,0 +1,153 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+from app.services.detections_store import DetectionReader
+from app.services.infer import InferenceService
+
+
+class FakeCapture:
+    """VideoCapture stand-in whose frame i is filled with the value i"""
+
+    def __init__(self, frames, delay=0.0):
+        self.frames = frames
+        self.delay = delay
+        self.position = 0
+
+    def isOpened(self):
+        return True
+
+    def get(self, prop):
+        return {cv2.CAP_PROP_FPS: 10, cv2.CAP_PROP_FRAME_WIDTH: 64, cv2.CAP_PROP_FRAME_HEIGHT: 48}.get(prop, 0)
+
+    def grab(self):
+        if self.position >= self.frames:
+            return False
+        self.position += 1
+        return True
+
+    def read(self):
+        time.sleep(self.delay)
+        if self.position >= self.frames:
+            return False, None
+        frame = np.full((48, 64, 3), self.position, dtype=np.uint8)
+        self.position += 1
+        return True, frame
+
+    def release(self):
+        pass
+
+
+class FrameModel:
+    """Fake model reporting one box per frame whose class is the frame's pixel value"""
+
+    names = {i: str(i) for i in range(256)}
+
+    def __init__(self, fail_plot=False, fail_predict=False):
+        self.fail_plot = fail_plot
+        self.fail_predict = fail_predict
+        self.batches = []
+
+    def __call__(self, frames, **kwargs):
+        if self.fail_predict:
+            raise RuntimeError('model failed')
+        self.batches.append(len(frames))
+        results = []
+        for frame in frames:
+            boxes = torch.tensor([[0, 0, 10, 10, 0.9, float(frame[0, 0, 0])]], dtype=torch.float32)
+            result = Results(frame, path=None, names=self.names, boxes=boxes)
+            if self.fail_plot:
+                result.plot = mock.Mock(side_effect=RuntimeError('plot failed'))
+            results.append(result)
+        return results
+
+
+class TestVideoPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.service = InferenceService(models=object(), exporter=object())
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _run(self, model, capture, timeout=10, **kwargs):
+        """Run the pipeline in a thread so a hang fails the test instead of blocking it"""
+        outcome = {}
+
+        def target():
+            try:
+                outcome['result'] = self.service._process_video(
+                    model, 'clip.mp4', self.tmpdir.name, 0.25, 0.45, 64, **kwargs
+                )
+            except Exception as e:
+                outcome['error'] = e
+
+        with mock.patch('cv2.VideoCapture', return_value=capture):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            thread.join(timeout)
+        self.assertFalse(thread.is_alive(), 'video pipeline did not finish')
+        return outcome
+
+    def _stored_frames(self, result):
+        with DetectionReader(result['detections_dir']) as reader:
+            return reader.read(0, 1000, compact=True)
+
+    def test_frames_keep_their_order(self):
+        model = FrameModel()
+        result = self._run(model, FakeCapture(11), batch_size=4)['result']
+
+        self.assertEqual(model.batches, [4, 4, 3])
+        self.assertEqual((result['frame_count'], result['source_frame_count']), (11, 11))
+        frames = self._stored_frames(result)
+        self.assertEqual([frame['frame'] for frame in frames], list(range(11)))
+        self.assertEqual([frame['detections'][0][5] for frame in frames], list(range(11)))
+        self.assertTrue(os.path.getsize(result['output_path']) > 0)
+
+    def test_frame_stride_samples_frames(self):
+        result = self._run(FrameModel(), FakeCapture(10), batch_size=2, frame_stride=3)['result']
+
+        self.assertEqual((result['frame_count'], result['source_frame_count'], result['frame_stride']), (4, 10, 3))
+        self.assertEqual([frame['frame'] for frame in self._stored_frames(result)], [0, 3, 6, 9])
+        self.assertEqual([frame['detections'][0][5] for frame in self._stored_frames(result)], [0, 3, 6, 9])
+
+    def test_detections_only_skips_the_encoder(self):
+        model = FrameModel(fail_plot=True)
+        result = self._run(model, FakeCapture(5), batch_size=2, output_mode='detections_only')['result']
+
+        self.assertIsNone(result['output_path'])
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir.name, 'annotated_video.mp4')))
+        self.assertEqual(result['total_detections'], 5)
+
+    def test_compact_format_is_the_default_page_format(self):
+        result = self._run(FrameModel(), FakeCapture(3), batch_size=2, detection_format='compact',
+                           output_mode='detections_only')['result']
+
+        self.assertEqual(result['detection_format'], 'compact')
+        self.assertEqual(result['class_names'], FrameModel.names)
+        full = self._run(FrameModel(), FakeCapture(3), output_mode='detections_only')['result']
+        self.assertEqual(full['detection_format'], 'full')
+        self.assertNotIn('class_names', full)
+
+    def test_encoder_failure_stops_a_slow_decoder(self):
+        outcome = self._run(FrameModel(fail_plot=True), FakeCapture(200, delay=0.02), batch_size=1)
+
+        self.assertEqual(str(outcome.get('error')), 'plot failed')
+
+    def test_model_failure_stops_every_stage(self):
+        outcome = self._run(FrameModel(fail_predict=True), FakeCapture(200), batch_size=2)
+
+        self.assertEqual(str(outcome.get('error')), 'model failed')
+        self.assertEqual([t.name for t in threading.enumerate() if t.name.startswith('video-')], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
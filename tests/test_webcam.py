@@ -0,0 +1,139 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+
+from app import create_app, db
+from app.routes.tests import handle_open_webcam_session
+from app.services.webcam import WebcamStreamService
+
+
+class DeferredSocketIO:
+    """Socket.IO stand-in that records emits and runs background tasks only when asked"""
+
+    async_mode = 'threading'
+
+    def __init__(self):
+        self.tasks = []
+        self.emitted = []
+
+    def start_background_task(self, target, *args):
+        self.tasks.append((target, args))
+
+    def emit(self, event, payload, **kwargs):
+        self.emitted.append((event, payload))
+
+    def run_tasks(self):
+        tasks, self.tasks = self.tasks, []
+        for target, args in tasks:
+            target(*args)
+
+
+class EchoInference:
+    """Fake InferenceService that records the frames it was given"""
+
+    def __init__(self):
+        self.models = self
+        self.frames = []
+
+    def get(self, model_path, device=None):
+        return None
+
+    def infer_frame(self, model_path, frame, *args, **kwargs):
+        self.frames.append(int(frame[0, 0, 0]))
+        return [], None
+
+
+def encoded(shade):
+    return cv2.imencode('.png', np.full((8, 8, 3), shade, dtype=np.uint8))[1].tobytes()
+
+
+class TestWebcamStreams(unittest.TestCase):
+    def setUp(self):
+        self.socketio = DeferredSocketIO()
+        self.inference = EchoInference()
+        self.streams = WebcamStreamService(self.inference, self.socketio)
+        self.streams.open('sid', 'model.pt', {})
+
+    def test_latest_frame_wins_while_the_server_is_busy(self):
+        for seq, shade in enumerate((10, 20, 30)):
+            self.assertTrue(self.streams.submit('sid', encoded(shade), seq))
+
+        # One drain worker for the burst; it only sees the newest frame
+        self.assertEqual(len(self.socketio.tasks), 1)
+        self.socketio.run_tasks()
+
+        self.assertEqual(self.inference.frames, [30])
+        self.assertEqual([payload['seq'] for event, payload in self.socketio.emitted], [2])
+        stats = self.streams.get('sid').stats()
+        self.assertEqual((stats['received'], stats['processed'], stats['dropped']), (3, 1, 2))
+
+        # Once idle, the next frame starts a new worker
+        self.streams.submit('sid', encoded(40), 3)
+        self.socketio.run_tasks()
+        self.assertEqual(self.inference.frames, [30, 40])
+
+    def test_bad_frames_are_reported_and_the_stream_continues(self):
+        self.streams.submit('sid', b'not an image', 0)
+        self.socketio.run_tasks()
+        self.streams.submit('sid', encoded(50), 1)
+        self.socketio.run_tasks()
+
+        self.assertEqual([event for event, _ in self.socketio.emitted], ['frame_error', 'frame_result'])
+        self.assertEqual(self.streams.get('sid').stats()['errors'], 1)
+
+    def test_errors_are_counted_under_the_session_lock(self):
+        session = self.streams.get('sid')
+        with session._lock:
+            worker = threading.Thread(target=session.record_error)
+            worker.start()
+            worker.join(0.05)
+            self.assertEqual(session.errors, 0)  # Waits for stats() readers to finish
+        worker.join(5)
+        self.assertEqual(session.stats()['errors'], 1)
+
+    def test_closed_sessions_reject_frames(self):
+        self.assertEqual(self.streams.close('sid')['received'], 0)
+        self.assertFalse(self.streams.submit('sid', encoded(10)))
+
+
+class TestWebcamNamespace(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self._database_url = os.environ.get('DATABASE_URL')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(self.tmpdir.name, 'webcam.db')
+        self.app = create_app()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        if self._database_url is None:
+            os.environ.pop('DATABASE_URL', None)
+        else:
+            os.environ['DATABASE_URL'] = self._database_url
+        self.tmpdir.cleanup()
+
+    def test_invalid_options_are_rejected_with_an_error_event(self):
+        for payload, message in [
+            ({'model_path': 'm.pt', 'conf_threshold': 'high'}, 'conf_threshold must be a number'),
+            ({'model_path': 'm.pt', 'img_size': 0}, 'img_size must be between'),
+            ({'model_path': 'm.pt', 'jpeg_quality': [80]}, 'jpeg_quality must be a number'),
+            ({'model_path': 'm.pt', 'iou_threshold': 'nan'}, 'iou_threshold must be between'),
+            ('m.pt', 'expects an object'),
+        ]:
+            with self.app.test_request_context(), mock.patch('app.routes.tests.emit') as emit, \
+                    mock.patch('app.routes.tests.webcam_streams') as streams:
+                handle_open_webcam_session(payload)
+            emit.assert_called_once()
+            self.assertEqual(emit.call_args.args[0], 'session_error', payload)
+            self.assertIn(message, emit.call_args.args[1]['error'])
+            streams.open.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()